@@ -0,0 +1,74 @@
+"""
+find_ready_tasks 基准脚本
+构造一条合成 trace（根节点 + N 个子节点，按链式/扇出混合依赖），
+统计一次调度查询发出的 SQL 条数与耗时，验证查询条数不随节点数增长。
+
+用法: python benchmark_find_ready_tasks.py [节点数...]
+"""
+import asyncio
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from external.db.models import Base, EventInstanceDB
+from external.db.impl.sqlite_impl import SQLiteEventInstanceRepository
+from common.enums import EventInstanceStatus, ActorType
+
+
+def build_trace(node_count: int, trace_id: str) -> list:
+    """生成一条 trace：约一半节点已成功，其余 PENDING 节点依赖 0~3 个前序节点"""
+    now = datetime.now(timezone.utc)
+    root_id = str(uuid.uuid4())
+    rows = [EventInstanceDB(
+        id=root_id, task_id=f"root_{trace_id}", trace_id=trace_id, parent_id=None,
+        node_path="/", depth=0, actor_type=ActorType.AGENT, user_id="bench",
+        status=EventInstanceStatus.RUNNING, created_at=now,
+    )]
+    ids = []
+    for i in range(node_count):
+        node_id = str(uuid.uuid4())
+        done = random.random() < 0.5
+        deps = random.sample(ids, min(len(ids), random.randint(0, 3))) if ids else []
+        rows.append(EventInstanceDB(
+            id=node_id, task_id=f"task_{i}", trace_id=trace_id, parent_id=root_id,
+            node_path=f"/{root_id}/", depth=1, actor_type=ActorType.AGENT, user_id="bench",
+            status=EventInstanceStatus.SUCCESS if done else EventInstanceStatus.PENDING,
+            depends_on=None if done else deps, created_at=now,
+        ))
+        ids.append(node_id)
+    return rows
+
+
+async def run(node_count: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+    async with session_factory() as session:
+        session.add_all(build_trace(node_count, str(uuid.uuid4())))
+        await session.commit()
+
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, stmt, *args: statements.append(stmt))
+
+    async with session_factory() as session:
+        start = time.perf_counter()
+        ready = await SQLiteEventInstanceRepository(session).find_ready_tasks()
+        elapsed = (time.perf_counter() - start) * 1000
+
+    print(f"nodes={node_count:>6}  ready={len(ready):>5}  queries={len(statements)}  {elapsed:.1f}ms")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    random.seed(42)
+    sizes = [int(arg) for arg in sys.argv[1:]] or [500, 5000]
+    for size in sizes:
+        asyncio.run(run(size))
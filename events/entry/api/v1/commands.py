@@ -16,7 +16,8 @@ from ...schemas.request import (
     StartTraceRequest, 
     SplitTaskRequest, 
     ControlNodeRequest,
-    ExecutionEventRequest  # 新增：执行事件请求模型
+    ExecutionEventRequest,  # 新增：执行事件请求模型
+    BatchExecutionEventRequest
 )
 
 
@@ -66,11 +67,17 @@ async def report_execution_event(
     try:
         # 1. 处理数据上报 (Write)
         # model_dump() 会将 Pydantic 对象转为纯 Dict，完美适配 Service 签名
+        # 缓存更新与事件推送延后到 commit 之后，失败回滚时不会留下脏缓存或错误通知
+        side_effects = []
         await lifecycle_svc.sync_execution_state(
             session=session,
-            execution_args=request.model_dump()
+            execution_args=request.model_dump(),
+            side_effects=side_effects
         )
         
+        await session.commit()
+        await lifecycle_svc.run_side_effects(side_effects)
+
         # 2. 检查是否有控制信号 (Read) - 顺便捎带回去
         # 优先查 Trace 级信号，再查 Node 级信号 (如果你的业务支持单节点控制)
         command = "CONTINUE"
@@ -92,6 +99,46 @@ async def report_execution_event(
         raise HTTPException(status_code=500, detail=f"Event sync failed: {str(e)}")
 
 
+@router.post("/events/batch", status_code=status.HTTP_200_OK)
+async def report_execution_events_batch(
+    request: BatchExecutionEventRequest,
+    lifecycle_svc: LifecycleService = Depends(get_lifecycle_service),
+    session: AsyncSession = Depends(get_db_session),
+    signal_svc: SignalService = Depends(get_signal_service),
+):
+    """
+    Worker 批量汇报接口。
+    事件按数组顺序依次应用，全部成功后统一 commit；任一失败则整体回滚，Worker 可原样重发。
+    Redis 缓存更新与事件推送在 commit 之后按序执行，回滚时一并丢弃。
+    Response 按 trace_id 捎带控制指令。
+    """
+    side_effects = []
+    try:
+        for event in request.events:
+            await lifecycle_svc.sync_execution_state(
+                session=session,
+                execution_args=event.model_dump(),
+                side_effects=side_effects
+            )
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        logger.error(f"Batch event sync failed: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Batch event sync failed: {str(e)}")
+
+    await lifecycle_svc.run_side_effects(side_effects)
+
+    commands = {}
+    for trace_id in dict.fromkeys(event.trace_id for event in request.events):
+        signal = await signal_svc.check_signal(trace_id, session=session)
+        commands[trace_id] = signal or "CONTINUE"
+
+    return {
+        "received": len(request.events),
+        "commands": commands
+    }
+
+
 @router.post("/{trace_id}/control/trace")
 async def control_whole_trace(
     trace_id: str,
@@ -1,5 +1,7 @@
+import base64
+import json
 import logging
-from fastapi import APIRouter, Query, HTTPException, Depends, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Query, HTTPException, Depends, Response, WebSocket, WebSocketDisconnect
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
@@ -13,6 +15,8 @@ from services.observer_service import ObserverService
 from services.agent_monitor_service import AgentMonitorService
 from services.websocket_manager import ConnectionManager
 from common.event_instance import EventInstance
+from common.enums import ActorType, EventInstanceStatus
+from external.db.models import EVENT_INSTANCE_LIST_SORT_KEYS
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
@@ -54,6 +58,11 @@ class TraceByUserResponse(BaseModel):
     trace_id: str
     created_at: datetime
     status: str
+    root_id: Optional[str] = None
+    root_task_id: Optional[str] = None
+    root_name: Optional[str] = None
+    total_tasks: int = 0
+    status_counts: Dict[str, int] = {}
 
 
 class TraceListByUserResponse(BaseModel):
@@ -61,25 +70,84 @@ class TraceListByUserResponse(BaseModel):
     user_id: str
     count: int
     traces: List[TraceByUserResponse]
+    # 下一页游标；为空表示没有更多数据
+    next_before: Optional[datetime] = None
+    next_before_trace_id: Optional[str] = None
 
 
-@router.get("/{trace_id}/tasks", response_model=List[EventInstance])
+class TaskListItem(BaseModel):
+    """任务列表视图的投影（不含输入参数、运行时快照等大字段）"""
+    id: str
+    task_id: str
+    trace_id: str
+    parent_id: Optional[str] = None
+    name: Optional[str] = None
+    node_path: Optional[str] = None
+    depth: int = 0
+    actor_type: Optional[ActorType] = None
+    role: Optional[str] = None
+    layer: Optional[int] = 0
+    status: Optional[EventInstanceStatus] = None
+    progress: Optional[int] = 0
+    control_signal: Optional[str] = None
+    worker_id: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+def _encode_cursor(item: Dict[str, Any], sort_by: str) -> str:
+    """把最后一条记录编码为不透明游标"""
+    value = item[sort_by]
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, item["id"]], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str, sort_by: str) -> tuple:
+    """解析游标为 (排序字段值, id)"""
+    value, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+    if sort_by in ("created_at", "updated_at") and value is not None:
+        value = datetime.fromisoformat(value)
+    return value, item_id
+
+
+@router.get("/{trace_id}/tasks", response_model=List[TaskListItem])
 async def list_tasks_in_trace(
     trace_id: str,
-    status: Optional[str] = Query(None),
-    actor_type: Optional[str] = Query(None),
+    response: Response,
+    status: Optional[EventInstanceStatus] = Query(None),
+    actor_type: Optional[ActorType] = Query(None),
     layer: Optional[int] = Query(None),
     depth: Optional[int] = Query(None),  # 新增：适配新的拓扑深度
     role: Optional[str] = Query(None),
+    path_prefix: Optional[str] = Query(None, description="只返回该 node_path 前缀下的节点（子树）"),
+    sort_by: str = Query("created_at", description="排序字段: created_at / updated_at / depth / node_path"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
     limit: int = Query(100, le=1000),
     offset: int = Query(0),
+    cursor: Optional[str] = Query(None, description="游标分页：上一页响应头 X-Next-Cursor 的值"),
+    with_total: bool = Query(True, description="是否统计总数（结果在响应头 X-Total-Count）"),
     observer_svc: ObserverService = Depends(get_observer_service),
     session: AsyncSession = Depends(get_db_session)
 ):
     """
     多维筛选 trace 内的事件节点。
-    支持组合过滤：status + layer + depth + actor_type + role
+    支持组合过滤：status + layer + depth + actor_type + role + 子树
+    过滤、排序、分页与计数都在数据库完成；总数与下一页游标通过响应头返回
     """
+    if sort_by not in EVENT_INSTANCE_LIST_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"Unsupported sort_by: {sort_by}")
+
+    after = None
+    if cursor:
+        try:
+            after = _decode_cursor(cursor, sort_by)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
     try:
         filters = {}
         if status: 
@@ -93,24 +161,24 @@ async def list_tasks_in_trace(
         if role is not None: 
             filters["role"] = role
 
-        # 使用观察者服务获取事件列表
-        trace_instances = await observer_svc.get_trace_instances(session, trace_id)
-        
-        # 在内存中进行过滤
-        filtered_events = []
-        for event in trace_instances:
-            match = True
-            for key, value in filters.items():
-                # 注意：getattr 需要确保 EventInstance 模型上有这些字段
-                if getattr(event, key, None) != value:
-                    match = False
-                    break
-            if match:
-                filtered_events.append(event)
-        
-        # 分页
-        paginated_events = filtered_events[offset:offset+limit]
-        return paginated_events
+        items, total = await observer_svc.list_trace_tasks(
+            session,
+            trace_id,
+            filters=filters,
+            path_prefix=path_prefix,
+            sort_by=sort_by,
+            descending=order == "desc",
+            limit=limit,
+            offset=offset,
+            after=after,
+            with_total=with_total
+        )
+
+        if total is not None:
+            response.headers["X-Total-Count"] = str(total)
+        if len(items) == limit and items:
+            response.headers["X-Next-Cursor"] = _encode_cursor(items[-1], sort_by)
+        return items
     except Exception as e:
         logger.error(f"Failed to list tasks in trace {trace_id}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to list tasks: {str(e)}")
@@ -119,6 +187,8 @@ async def list_tasks_in_trace(
 @router.get("/{trace_id}/graph", response_model=TraceGraphResponse)
 async def get_trace_topology(
     trace_id: str,
+    root_task_id: Optional[str] = Query(None, description="只返回以该任务为根的子树"),
+    max_depth: Optional[int] = Query(None, ge=0, description="相对根节点的最大层数"),
     observer_svc: ObserverService = Depends(get_observer_service),
     session: AsyncSession = Depends(get_db_session)
 ):
@@ -127,7 +197,9 @@ async def get_trace_topology(
     用于前端渲染任务执行流图。
     """
     try:
-        graph_data = await observer_svc.get_trace_graph(session, trace_id)
+        graph_data = await observer_svc.get_trace_graph(
+            session, trace_id, root_task_id=root_task_id, max_depth=max_depth
+        )
         if not graph_data:
              raise HTTPException(status_code=404, detail="Trace not found")
         return graph_data
@@ -216,11 +288,14 @@ async def get_traces_by_user_id(
     end_time: Optional[datetime] = Query(None, description="结束时间"),
     limit: int = Query(100, le=1000, description="每页数量"),
     offset: int = Query(0, description="偏移量"),
+    before: Optional[datetime] = Query(None, description="游标：上一页最后一条的 created_at"),
+    before_trace_id: Optional[str] = Query(None, description="游标：上一页最后一条的 trace_id"),
     observer_svc: ObserverService = Depends(get_observer_service),
     session: AsyncSession = Depends(get_db_session)
 ):
     """
     根据user_id查询所有trace_id及其状态，支持时间范围过滤和分页
+    翻页建议使用游标：把响应中的 next_before / next_before_trace_id 原样传回
     """
     try:
         traces = await observer_svc.find_traces_by_user_id(
@@ -229,13 +304,18 @@ async def get_traces_by_user_id(
             start_time=start_time,
             end_time=end_time,
             limit=limit,
-            offset=offset
+            offset=offset,
+            before_created_at=before,
+            before_trace_id=before_trace_id
         )
         
+        has_more = len(traces) == limit
         return {
             "user_id": user_id,
             "count": len(traces),
-            "traces": traces
+            "traces": traces,
+            "next_before": traces[-1]["created_at"] if has_more else None,
+            "next_before_trace_id": traces[-1]["trace_id"] if has_more else None
         }
     except Exception as e:
         logger.error(f"Failed to get traces by user {user_id}: {str(e)}", exc_info=True)
@@ -71,6 +71,13 @@ class ExecutionEventRequest(BaseModel):
     # 额外信息
     realtime_info: Optional[Dict[str, Any]] = Field(None, description="实时信息，如当前的 step")
 
+
+class BatchExecutionEventRequest(BaseModel):
+    """
+    批量上报的执行事件，按数组顺序依次应用，整体在同一事务中提交
+    """
+    events: List[ExecutionEventRequest] = Field(..., min_length=1, max_length=1000, description="按发生顺序排列的事件列表")
+
 # ==========================================
 # 4. 控制信号请求
 # ==========================================
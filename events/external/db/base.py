@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from common.event_definition import EventDefinition
 from common.event_instance import EventInstance
 from common.event_log import EventLog
@@ -32,6 +32,10 @@ class EventInstanceRepository(ABC):
     @abstractmethod
     async def find_by_trace_id_with_filters(self, trace_id: str, filters: dict, limit: int = 100, offset: int = 0) -> List[EventInstance]: ...
     @abstractmethod
+    async def find_tree_nodes(self, trace_id: str, path_prefix: Optional[str] = None, max_depth: Optional[int] = None) -> List[dict]: ...
+    @abstractmethod
+    async def find_by_trace_id_paged(self, trace_id: str, filters: Optional[Dict[str, Any]] = None, path_prefix: Optional[str] = None, sort_by: str = "created_at", descending: bool = False, limit: int = 100, offset: int = 0, after: Optional[Tuple[Any, str]] = None, with_total: bool = True) -> Tuple[List[dict], Optional[int]]: ...
+    @abstractmethod
     async def lock_for_execution(self, instance_id: str, worker_id: str) -> bool: ...
     @abstractmethod
     async def update_status(self, instance_id: str, status: EventInstanceStatus, **kwargs) -> None: ...
@@ -50,7 +54,7 @@ class EventInstanceRepository(ABC):
     @abstractmethod
     async def update_signal_by_trace(self, trace_id: str, signal: str) -> None: ...
     @abstractmethod
-    async def find_traces_by_user_id(self, user_id: str, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None, limit: int = 100, offset: int = 0) -> List[dict]: ...
+    async def find_traces_by_user_id(self, user_id: str, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None, limit: int = 100, offset: int = 0, before_created_at: Optional[datetime] = None, before_trace_id: Optional[str] = None) -> List[dict]: ...
     @abstractmethod
     async def upsert_by_task_id(self, task_id: str, trace_id: str, **fields) -> str: ...
 
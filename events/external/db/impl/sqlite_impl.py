@@ -1,51 +1,56 @@
-from sqlalchemy import select, update, and_, func
+from sqlalchemy import select, update, and_, or_, case, exists, literal, func, DateTime
+from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 import logging
 
 from ..base import EventInstanceRepository, EventDefinitionRepository, EventLogRepository, AgentTaskHistoryRepository, AgentDailyMetricRepository
-from ..models import EventInstanceDB, EventDefinitionDB, EventLogDB, AgentTaskHistory, AgentDailyMetric
+from ..models import EVENT_INSTANCE_LIST_COLUMNS, EVENT_INSTANCE_LIST_SORT_KEYS, EventInstanceDB, node_path_upper_bound, EventDefinitionDB, EventLogDB, AgentTaskHistory, AgentDailyMetric
 from common.event_instance import EventInstance
 from common.event_definition import EventDefinition
 from common.event_log import EventLog
 from common.enums import EventInstanceStatus, ActorType
 
 logger = logging.getLogger(__name__)
+
+
+def _node_path_in_subtree(path_prefix: str):
+    """node_path 前缀匹配写成区间比较（BINARY 排序），可以用上 idx_trace_node_path；LIKE 在 SQLite 默认不区分大小写，用不上该索引"""
+    return and_(
+        EventInstanceDB.node_path >= path_prefix,
+        EventInstanceDB.node_path < node_path_upper_bound(path_prefix),
+    )
+
+
 class SQLiteEventInstanceRepository(EventInstanceRepository):
     def __init__(self, session: AsyncSession):
         self.session = session
 
     async def find_ready_tasks(self) -> List[EventInstance]:
-        # SQLite 不支持复杂的 array 函数和 JOIN 查询，使用 N+1 查询方式
-        # 先查所有 PENDING 状态的事件
-        stmt = select(EventInstanceDB).where(EventInstanceDB.status == EventInstanceStatus.PENDING)
+        """
+        单条 SQL 查出依赖已全部满足的 PENDING 实例
+        depends_on 为 JSON 数组，用 json_each 展开后做反连接：
+        只要存在一个依赖「找不到」或「未 SUCCESS」，该实例就不就绪
+        """
+        dep = func.json_each(
+            case(
+                (func.json_type(EventInstanceDB.depends_on) == "array", EventInstanceDB.depends_on),
+                else_="[]",
+            )
+        ).table_valued("value").alias("dep")
+        dep_inst = aliased(EventInstanceDB)
+        unresolved = (
+            select(literal(1))
+            .select_from(dep.outerjoin(dep_inst, dep_inst.id == dep.c.value))
+            .where(or_(dep_inst.id.is_(None), dep_inst.status != EventInstanceStatus.SUCCESS))
+        )
+        stmt = select(EventInstanceDB).where(
+            EventInstanceDB.status == EventInstanceStatus.PENDING,
+            ~exists(unresolved),
+        )
         result = await self.session.execute(stmt)
-        pending_tasks = result.scalars().all()
-        ready = []
-
-        for task_db in pending_tasks:
-            deps = task_db.depends_on or []
-            if not deps:
-                # 无依赖，直接就绪
-                ready.append(self._to_domain(task_db))
-            else:
-                # 查依赖事件状态
-                dep_ids = [d for d in deps]  # 假设 depends_on 是 list[str]
-                dep_stmt = select(EventInstanceDB).where(EventInstanceDB.id.in_(dep_ids))
-                dep_result = await self.session.execute(dep_stmt)
-                dep_map = {d.id: d.status for d in dep_result.scalars()}
-                
-                # 检查所有依赖是否都已成功
-                all_deps_success = True
-                for dep_id in deps:
-                    if dep_map.get(dep_id) != EventInstanceStatus.SUCCESS:
-                        all_deps_success = False
-                        break
-                
-                if all_deps_success:
-                    ready.append(self._to_domain(task_db))
-        return ready
+        return [self._to_domain(row) for row in result.scalars().all()]
 
     async def find_pending_with_deps_satisfied(self) -> List[EventInstance]:
         # 该方法与 find_ready_tasks 功能相同，复用实现
@@ -198,7 +203,8 @@ class SQLiteEventInstanceRepository(EventInstanceRepository):
         )
         
         self.session.add(new_instance)
-        await self.session.commit()
+        # 不在此处 commit：与流水记录同属外层事务，由调用方统一提交
+        await self.session.flush()
         return new_id
 
     def _to_domain(self, db: EventInstanceDB) -> EventInstance:
@@ -356,6 +362,113 @@ class SQLiteEventInstanceRepository(EventInstanceRepository):
         rows = result.scalars().all()
         return [self._to_domain(row) for row in rows]
     
+    async def find_by_trace_id_paged(
+        self,
+        trace_id: str,
+        filters: Optional[Dict[str, Any]] = None,
+        path_prefix: Optional[str] = None,
+        sort_by: str = "created_at",
+        descending: bool = False,
+        limit: int = 100,
+        offset: int = 0,
+        after: Optional[Tuple[Any, str]] = None,
+        with_total: bool = True,
+    ) -> Tuple[List[dict], Optional[int]]:
+        """
+        任务列表分页查询：过滤、排序、分页与总数都在数据库完成，只投影列表视图需要的列
+
+        Args:
+            trace_id: 链路ID
+            filters: 等值过滤 {列名: 值}，未知列名忽略
+            path_prefix: 只返回 node_path 以此开头的节点（子树）
+            sort_by: 排序字段，取值见 EVENT_INSTANCE_LIST_SORT_KEYS
+            descending: 是否倒序
+            limit: 每页数量
+            offset: 偏移量（使用游标时一般为 0）
+            after: 游标 (上一页最后一条的排序字段值, id)；排序字段值为 None 时按替代值比较
+            with_total: 是否同时统计满足过滤条件的总数
+
+        Returns:
+            Tuple[List[dict], Optional[int]]: (当前页, 总数)；with_total 为 False 时总数为 None
+        """
+        if sort_by not in EVENT_INSTANCE_LIST_SORT_KEYS:
+            raise ValueError(f"Unsupported sort key: {sort_by}")
+
+        conditions = [EventInstanceDB.trace_id == trace_id]
+        for key, value in (filters or {}).items():
+            column = getattr(EventInstanceDB, key, None)
+            if column is not None:
+                conditions.append(column == value)
+        if path_prefix:
+            conditions.append(_node_path_in_subtree(path_prefix))
+
+        total = None
+        if with_total:
+            count_stmt = select(func.count()).select_from(EventInstanceDB).where(*conditions)
+            total = (await self.session.execute(count_stmt)).scalar_one()
+
+        null_value = EVENT_INSTANCE_LIST_SORT_KEYS[sort_by]
+        sort_column = func.coalesce(getattr(EventInstanceDB, sort_by), null_value)
+        is_time = isinstance(null_value, datetime)
+        if is_time:
+            # SQLite 以字符串存时间：func.now() 写入的不带小数秒，ORM 写入的带微秒，比较前统一格式
+            sort_column = func.strftime("%Y-%m-%d %H:%M:%f", sort_column)
+        if after is not None:
+            after_value, after_id = after
+            if after_value is None:
+                after_value = null_value
+            if is_time:
+                after_value = func.strftime("%Y-%m-%d %H:%M:%f", literal(after_value, DateTime()))
+            if descending:
+                conditions.append(or_(
+                    sort_column < after_value,
+                    and_(sort_column == after_value, EventInstanceDB.id < after_id),
+                ))
+            else:
+                conditions.append(or_(
+                    sort_column > after_value,
+                    and_(sort_column == after_value, EventInstanceDB.id > after_id),
+                ))
+
+        order = (sort_column.desc(), EventInstanceDB.id.desc()) if descending else (sort_column, EventInstanceDB.id)
+        stmt = (
+            select(*[getattr(EventInstanceDB, name) for name in EVENT_INSTANCE_LIST_COLUMNS])
+            .where(*conditions)
+            .order_by(*order)
+            .offset(offset)
+            .limit(limit)
+        )
+        result = await self.session.execute(stmt)
+        return [dict(row) for row in result.mappings()], total
+
+    async def find_tree_nodes(
+        self,
+        trace_id: str,
+        path_prefix: Optional[str] = None,
+        max_depth: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        拓扑图取数：按 node_path 前缀取子树、按 depth 截断，只投影列表视图需要的列
+
+        Args:
+            trace_id: 链路ID
+            path_prefix: 子树前缀（父节点 node_path + 父节点 task_id + "/"），为空取整棵树
+            max_depth: 绝对深度上限（含）
+
+        Returns:
+            List[dict]: 实例行，按 depth、created_at 排序
+        """
+        stmt = select(*[getattr(EventInstanceDB, name) for name in EVENT_INSTANCE_LIST_COLUMNS]).where(
+            EventInstanceDB.trace_id == trace_id
+        )
+        if path_prefix:
+            stmt = stmt.where(_node_path_in_subtree(path_prefix))
+        if max_depth is not None:
+            stmt = stmt.where(EventInstanceDB.depth <= max_depth)
+        stmt = stmt.order_by(EventInstanceDB.depth, EventInstanceDB.created_at)
+        result = await self.session.execute(stmt)
+        return [dict(row) for row in result.mappings()]
+
     async def lock_for_execution(self, instance_id: str, worker_id: str) -> bool: 
         # SQLite 不支持 SELECT ... FOR UPDATE SKIP LOCKED，直接更新状态
         stmt = (
@@ -397,57 +510,120 @@ class SQLiteEventInstanceRepository(EventInstanceRepository):
         await self.session.execute(stmt)
         await self.session.commit()
     
-    async def find_traces_by_user_id(self, user_id: str, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None, limit: int = 100, offset: int = 0) -> List[dict]:
+    async def find_traces_by_user_id(
+        self,
+        user_id: str,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        limit: int = 100,
+        offset: int = 0,
+        before_created_at: Optional[datetime] = None,
+        before_trace_id: Optional[str] = None,
+    ) -> List[dict]:
         """
-        根据user_id查询所有trace_id及其状态
-        
+        根据user_id查询所有trace及其根节点、状态统计（单条 SQL）
+
+        先对该用户的根节点（parent_id 为空，每个 trace 一个）做游标分页，
+        再只针对本页的 trace 统计各状态数量、取最近更新实例的状态作为 trace 状态，
+        不随用户历史 trace 总量增长。
+        结果按 (根节点 created_at, trace_id) 倒序，支持游标分页：
+        传入上一页最后一条的 created_at 与 trace_id，即可取下一页，无需 offset 扫描
+
         Args:
             user_id: 用户ID
-            start_time: 开始时间
-            end_time: 结束时间
+            start_time: 开始时间（按 trace 创建时间过滤）
+            end_time: 结束时间（按 trace 创建时间过滤）
             limit: 每页数量
-            offset: 偏移量
-            
+            offset: 偏移量（兼容旧调用，使用游标时一般为 0）
+            before_created_at: 游标，上一页最后一条的 created_at
+            before_trace_id: 游标，上一页最后一条的 trace_id
+
         Returns:
-            List[dict]: trace_id列表及其状态信息
+            List[dict]: trace 列表，包含 trace_id、created_at、status、根节点信息及 status_counts
         """
-        # 使用SQLite兼容的查询方式
-        # 1. 首先获取所有唯一的trace_id
-        stmt = select(EventInstanceDB.trace_id).distinct().where(EventInstanceDB.user_id == user_id)
-        
-        # 添加时间范围过滤
+        # SQLite 以字符串存时间：func.now() 写入的不带小数秒，ORM 写入的带微秒，比较前统一格式
+        created_key = func.strftime("%Y-%m-%d %H:%M:%f", EventInstanceDB.created_at)
+        before_key = (
+            func.strftime("%Y-%m-%d %H:%M:%f", literal(before_created_at, DateTime()))
+            if before_created_at is not None else None
+        )
+        # 1. 本页的根节点
+        root_conditions = [EventInstanceDB.user_id == user_id, EventInstanceDB.parent_id.is_(None)]
         if start_time:
-            stmt = stmt.where(EventInstanceDB.created_at >= start_time)
+            root_conditions.append(EventInstanceDB.created_at >= start_time)
         if end_time:
-            stmt = stmt.where(EventInstanceDB.created_at <= end_time)
-        
-        # 排序并分页
-        stmt = stmt.order_by(EventInstanceDB.created_at.desc()).limit(limit).offset(offset)
-        
+            root_conditions.append(EventInstanceDB.created_at <= end_time)
+        if before_key is not None:
+            if before_trace_id is not None:
+                root_conditions.append(or_(
+                    created_key < before_key,
+                    and_(created_key == before_key, EventInstanceDB.trace_id < before_trace_id),
+                ))
+            else:
+                root_conditions.append(created_key < before_key)
+        page = (
+            select(
+                EventInstanceDB.trace_id,
+                EventInstanceDB.id.label("root_id"),
+                EventInstanceDB.task_id.label("root_task_id"),
+                EventInstanceDB.name.label("root_name"),
+                EventInstanceDB.created_at,
+                created_key.label("created_key"),
+            )
+            .where(*root_conditions)
+            .order_by(created_key.desc(), EventInstanceDB.trace_id.desc())
+            .limit(limit)
+            .offset(offset)
+            .cte("trace_page")
+        )
+
+        # 2. 只统计本页 trace 的实例
+        stats = (
+            select(
+                EventInstanceDB.trace_id,
+                func.count().label("total_tasks"),
+                *[
+                    func.sum(case((EventInstanceDB.status == s, 1), else_=0)).label(f"count_{s.value.lower()}")
+                    for s in EventInstanceStatus
+                ],
+            )
+            .where(EventInstanceDB.trace_id.in_(select(page.c.trace_id)), EventInstanceDB.user_id == user_id)
+            .group_by(EventInstanceDB.trace_id)
+            .subquery()
+        )
+        latest = aliased(EventInstanceDB)
+        latest_status = (
+            select(latest.status)
+            .where(latest.trace_id == page.c.trace_id, latest.user_id == user_id)
+            .order_by(latest.updated_at.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+
+        stmt = (
+            select(
+                page,
+                latest_status.label("latest_status"),
+                *[column for column in stats.c if column.name != "trace_id"],
+            )
+            .outerjoin(stats, stats.c.trace_id == page.c.trace_id)
+            .order_by(page.c.created_key.desc(), page.c.trace_id.desc())
+        )
         result = await self.session.execute(stmt)
-        trace_ids = [row.trace_id for row in result.all()]
-        
+
         traces = []
-        for trace_id in trace_ids:
-            # 2. 对于每个trace_id，获取最新状态
-            # 查询该trace下的所有实例
-            trace_stmt = select(EventInstanceDB).where(
-                EventInstanceDB.trace_id == trace_id,
-                EventInstanceDB.user_id == user_id
-            ).order_by(EventInstanceDB.updated_at.desc())
-            
-            trace_result = await self.session.execute(trace_stmt)
-            instances = trace_result.scalars().all()
-            
-            if instances:
-                # 获取最新状态
-                latest_instance = instances[0]
-                traces.append({
-                    "trace_id": trace_id,
-                    "created_at": latest_instance.created_at,
-                    "status": latest_instance.status
-                })
-        
+        for row in result.mappings():
+            latest_status = row["latest_status"]
+            traces.append({
+                "trace_id": row["trace_id"],
+                "created_at": row["created_at"],
+                "status": latest_status.value if isinstance(latest_status, EventInstanceStatus) else latest_status,
+                "root_id": row["root_id"],
+                "root_task_id": row["root_task_id"],
+                "root_name": row["root_name"],
+                "total_tasks": row["total_tasks"] or 0,
+                "status_counts": {s.value: row[f"count_{s.value.lower()}"] or 0 for s in EventInstanceStatus},
+            })
         return traces
 
 
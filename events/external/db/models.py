@@ -3,6 +3,7 @@ from sqlalchemy.ext.declarative import declarative_base
 
 from sqlalchemy.sql import func
 import uuid
+from datetime import datetime
 from common.enums import ActorType, NodeType, EventInstanceStatus
 
 Base = declarative_base()
@@ -105,9 +106,52 @@ class EventInstanceDB(Base):
     __table_args__ = (
         Index("idx_trace_status", "trace_id", "status"),
         Index("idx_request_root", "request_id", "parent_id"),  # 支持高效查询某个请求下的根节点
+        # 按用户列出 trace：只索引根节点，按创建时间游标分页
+        Index(
+            "idx_user_roots", "user_id", "created_at", "trace_id",
+            sqlite_where=text("parent_id IS NULL"),
+            postgresql_where=text("parent_id IS NULL"),
+        ),
+        # 子树查询按 node_path 前缀做区间扫描；Postgres 用 pattern_ops 按字节序比较，与 SQLite 的 BINARY 排序一致
+        Index(
+            "idx_trace_node_path", "trace_id", "node_path",
+            postgresql_ops={"node_path": "varchar_pattern_ops"},
+        ),
+        # find_ready_tasks 的外层扫描只看 PENDING 行，部分索引只包含这些行
+        Index(
+            "idx_pending_instances", "status", "id",
+            sqlite_where=text("status = 'PENDING'"),
+            postgresql_where=text("status = 'PENDING'"),
+        ),
     )
 
 
+# 任务列表视图只需要的列（不含 input_params / runtime_state_snapshot 等大字段）
+EVENT_INSTANCE_LIST_COLUMNS = (
+    "id", "task_id", "trace_id", "parent_id", "name", "node_path", "depth",
+    "actor_type", "role", "layer", "status", "progress", "control_signal",
+    "worker_id", "started_at", "finished_at", "created_at", "updated_at",
+)
+
+# 任务列表允许的排序字段 -> 列为 NULL 时的替代值。
+# 这些列都可能为 NULL，排序和游标比较统一使用 COALESCE(列, 替代值)，NULL 行排在最前（倒序时最后），不会被游标跳过
+EVENT_INSTANCE_LIST_SORT_KEYS = {
+    "created_at": datetime(1970, 1, 1),
+    "updated_at": datetime(1970, 1, 1),
+    "depth": 0,
+    "node_path": "",
+}
+
+
+
+def node_path_upper_bound(prefix: str) -> str:
+    """
+    node_path 前缀区间的上界（不含）：把前缀最后一个字符加一。
+    按字节序比较时，[prefix, 上界) 恰好是所有以 prefix 开头的值，可以直接走 node_path 索引的区间扫描
+    """
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
 class EventLogDB(Base):
     __tablename__ = "event_logs"
 
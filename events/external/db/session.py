@@ -87,4 +87,9 @@ async def create_tables():
                         await conn.execute(text(alter_sql))
                         print(f"✅ 已添加列: {table_name}.{column_name}")
                     except Exception as e:
-                        print(f"❌ 添加列失败: {alter_sql} | 错误: {e}")
\ No newline at end of file
+                        print(f"❌ 添加列失败: {alter_sql} | 错误: {e}")
+
+        # 3. 补建缺失的索引（create_all 不会给已存在的表加新索引）
+        for table in Base.metadata.tables.values():
+            for index in table.indexes:
+                await conn.run_sync(lambda sync_conn, index=index: index.create(sync_conn, checkfirst=True))
\ No newline at end of file
@@ -167,6 +167,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # 允许所有方法（包括 OPTIONS）
     allow_headers=["*"],  # 允许所有 headers
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],  # 任务列表分页信息，浏览器端需显式暴露才能读取
 )
 
 @app.get("/")
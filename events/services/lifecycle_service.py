@@ -57,11 +57,38 @@ class LifecycleService:
             # 如果某些字段不需要序列化（比如 updated_at 不用于缓存），可加 exclude={"updated_at"}
         )
 
-    async def _get_instance_with_cache(self, session: AsyncSession, task_id: str) -> Optional[dict]:
+    async def _run_or_defer(self, side_effects: Optional[list], func, *args, **kwargs):
+        """
+        执行副作用（Redis 写入 / 事件推送）；传入 side_effects 列表时只登记，由调用方在 commit 之后执行
+        """
+        if side_effects is None:
+            await func(*args, **kwargs)
+        else:
+            side_effects.append((func, args, kwargs))
+
+    async def run_side_effects(self, side_effects: list):
+        """
+        按登记顺序执行延后的副作用（应在事务 commit 之后调用）。
+        此时数据库已提交，单个副作用失败只记录日志，不再向上抛出，避免 Worker 重发导致重复应用。
+        """
+        for func, args, kwargs in side_effects:
+            try:
+                await func(*args, **kwargs)
+            except Exception as e:
+                print(f"WARNING: side effect {getattr(func, '__name__', func)} failed after commit: {e}")
+        side_effects.clear()
+
+    async def _get_instance_with_cache(
+        self,
+        session: AsyncSession,
+        task_id: str,
+        side_effects: Optional[list] = None
+    ) -> Optional[dict]:
         """
         【读优先】：Redis -> DB -> Redis
         返回的是 Dict（如果来自 Redis）或 Object 转成的 Dict
         【修正 2】使用仓库层的 get_by_task_id 方法查询 DB
+        传入 side_effects 时，回写 Redis 延后到 commit 之后（避免把未提交的数据写进缓存）
         """
         key = self._cache_key(task_id)
 
@@ -82,21 +109,32 @@ class LifecycleService:
         # 3. 回写 Redis (Read Repair)
         data_dict = self._serialize(instance)
         # 异步写入，不阻塞主流程太多
-        await self.cache.set(key, json.dumps(data_dict), ex=self.CACHE_TTL)
+        await self._run_or_defer(side_effects, self.cache.set, key, json.dumps(data_dict), ex=self.CACHE_TTL)
 
         return data_dict
 
-    async def _update_instance_cache(self, task_id: str, update_fields: dict, original_data: dict = None):
+    async def _update_instance_cache(
+        self,
+        task_id: str,
+        update_fields: dict,
+        original_data: dict = None,
+        prefer_cached: bool = False
+    ):
         """
         【写辅助】：更新 Redis 中的状态
         【修正 3】如果缓存完全丢失，这里不应该初始化为空字典，
         最好是触发一次 DB 重载，或者只记录 update_fields（风险是丢失旧字段）
         这里的策略是：如果没有 original，且缓存也没了，暂时仅存储更新字段，
         但实际上 _get_instance_with_cache 应该在 update 前被调用过。
+        prefer_cached=True 时优先合并到 Redis 中的当前值（延后执行时，同一批次前面的更新已写入缓存）。
         """
         key = self._cache_key(task_id)
         
         current_data = original_data
+        if prefer_cached:
+            raw = await self.cache.get(key)
+            if raw:
+                current_data = json.loads(raw) if isinstance(raw, str) else raw
         if not current_data:
              raw = await self.cache.get(key)
              if raw:
@@ -397,11 +435,14 @@ class LifecycleService:
     async def sync_execution_state(
         self,
         session: AsyncSession,
-        execution_args: dict
+        execution_args: dict,
+        side_effects: Optional[list] = None
     ):
         """
         【核心方法】接收 Worker 汇报 -> 记流水 -> 更新状态
         execution_args 包含: task_id, event_type, data, error, worker_id, agent_id...
+        本方法不 commit。Redis 缓存更新与事件推送不受事务保护：传入 side_effects 列表时它们只被登记，
+        调用方应在 commit 成功后调用 run_side_effects 执行，回滚时直接丢弃；不传时立即执行。
         """
         task_id = execution_args.get("task_id")
         event_type = execution_args.get("event_type")
@@ -412,7 +453,7 @@ class LifecycleService:
         # =========================================
         if not trace_id:
             # 尝试最后一次努力：查缓存（虽然此时还没创建，但万一有其他并发？）
-            instance_cache = await self._get_instance_with_cache(session, task_id)
+            instance_cache = await self._get_instance_with_cache(session, task_id, side_effects)
             trace_id = instance_cache.get('trace_id') if instance_cache else None
             if not trace_id:
                 print(f"CRITICAL: Task {task_id} has no trace_id and not found in DB.")
@@ -470,7 +511,7 @@ class LifecycleService:
         )
         await session.flush()
         # 确保 instance_cache 有值（用于后续日志和缓存更新）
-        instance_cache = await self._get_instance_with_cache(session, task_id)
+        instance_cache = await self._get_instance_with_cache(session, task_id, side_effects)
         if not instance_cache:
             # 如果缓存没命中，说明是新建的实例，需要手动构建缓存数据
             # 使用仓库层的 get 方法获取实例
@@ -525,7 +566,10 @@ class LifecycleService:
         # =========================================
 
         # 1. 更新 Redis 缓存
-        await self._update_instance_cache(task_id, update_fields, original_data=instance_cache)
+        await self._run_or_defer(
+            side_effects, self._update_instance_cache, task_id, update_fields,
+            original_data=instance_cache, prefer_cached=side_effects is not None
+        )
 
         # -------------------------------------------------------
         # [通用准备] 提前准备好通用数据 (时间、名称)，供心跳和事件使用
@@ -556,6 +600,12 @@ class LifecycleService:
         if not start_time_obj and update_fields.get("started_at"):
             start_time_obj = update_fields["started_at"]
 
+        # 批量上报时缓存要等 commit 后才写，同批次更早的 STARTED 只在已 flush 的 DB 行里
+        if not start_time_obj:
+            instance_row = await inst_repo.get(instance_uuid)
+            if instance_row and instance_row.started_at:
+                start_time_obj = instance_row.started_at
+
         # 计算耗时
         duration_ms = 0
         if start_time_obj:
@@ -568,7 +618,9 @@ class LifecycleService:
         # -------------------------------------------------------
         # 只有这些状态才代表 Agent 在忙，需要心跳
         if execution_args.get("agent_id") and event_type in ["STARTED", "RUNNING", "PROGRESS"]:
-             await self.event_bus.publish(
+             await self._run_or_defer(
+                side_effects,
+                self.event_bus.publish,
                 topic=self.topic_name,
                 event_type="AGENT_HEARTBEAT",
                 key=execution_args["agent_id"],
@@ -606,7 +658,9 @@ class LifecycleService:
             "error_msg": execution_args.get("error")
         }
 
-        await self.event_bus.publish(
+        await self._run_or_defer(
+            side_effects,
+            self.event_bus.publish,
             topic=self.topic_name,
             event_type=f"TASK_{event_type}",
             key=trace_id,
@@ -1,7 +1,7 @@
 import asyncio
 import logging
 from datetime import datetime, timezone
-from typing import List, Optional, Dict, Any, Set
+from typing import List, Optional, Dict, Any, Set, Tuple
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -13,9 +13,11 @@ from common.enums import EventInstanceStatus
 from external.cache.base import CacheClient
 from external.db.session import dialect
 from external.db.impl import create_event_instance_repo
+from external.db.models import EVENT_INSTANCE_LIST_COLUMNS
 from external.events.bus import EventBus
 # 导入WebSocket管理器
 from .websocket_manager import ConnectionManager
+from .trace_graph import TraceGraph, TraceGraphCache, trace_graph_cache
 
 logger = logging.getLogger(__name__)
 
@@ -25,75 +27,77 @@ class ObserverService:
         event_bus: EventBus,
         connection_manager: ConnectionManager,
         cache: Optional[CacheClient] = None,
-        webhook_registry: Optional[Any] = None
+        webhook_registry: Optional[Any] = None,
+        graph_cache: Optional[TraceGraphCache] = None
     ):
         self.event_bus = event_bus
         self.connection_manager = connection_manager
         self.cache = cache
         self.webhook_registry = webhook_registry
+        # 默认使用进程级共享缓存，事件监听任务与各请求看到的是同一份
+        self.graph_cache = graph_cache or trace_graph_cache
         self.topic_name = "job_event_stream"
 
     # ==========================================
     # 1. 核心：对外查询服务 (Query API)
     # ==========================================
 
-    async def get_trace_graph(self, session: AsyncSession, trace_id: str) -> Dict[str, Any]:
+    async def get_trace_graph(
+        self,
+        session: AsyncSession,
+        trace_id: str,
+        root_task_id: Optional[str] = None,
+        max_depth: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
         【核心】获取 Trace 的 DAG 结构树 (供前端 ReactFlow/X6 渲染)
         
         关键逻辑：
-        数据库中 parent_id 存储的是父节点的【内部 UUID】，
-        但前端展示通常需要【业务 task_id】作为节点的 ID。
-        这里需要做一次映射。
+        数据库中 parent_id 可能存父节点的【业务 task_id】或【内部 UUID】，
+        前端展示需要【业务 task_id】作为节点的 ID，TraceGraph 用字典一次性完成映射（O(n)）。
+
+        - 整图：优先读进程内缓存（由事件流增量维护），未命中时加载并缓存
+        - 子树 / 限深：缓存命中时直接裁剪；未命中时只按 node_path 前缀与 depth 取需要的节点
+
+        Args:
+            session: 数据库会话
+            trace_id: 链路ID
+            root_task_id: 只返回以该任务为根的子树
+            max_depth: 相对根节点的最大层数（未指定根时为绝对深度）
+
+        Returns:
+            Dict[str, Any]: {"trace_id", "nodes", "edges"}
         """
+        graph = self.graph_cache.get(trace_id)
+        if graph is not None:
+            return graph.render(root_task_id, max_depth)
+
         inst_repo = create_event_instance_repo(session, dialect)
-        instances = await inst_repo.find_by_trace_id(trace_id)
-        
-        if not instances:
-            return {"trace_id": trace_id, "nodes": [], "edges": []}
+        if root_task_id is None and max_depth is None:
+            version = self.graph_cache.begin_load(trace_id)
+            try:
+                rows = await inst_repo.find_tree_nodes(trace_id)
+                if not rows:
+                    return {"trace_id": trace_id, "nodes": [], "edges": []}
+                graph = TraceGraph(trace_id, rows)
+                # 读库期间若有事件到达，这份结果可能已过时，不写入缓存
+                self.graph_cache.put(graph, version)
+            finally:
+                self.graph_cache.end_load(trace_id)
+            return graph.render()
 
-        # 1. 建立 内部UUID -> 外部TaskID 的映射表
-        uuid_to_task_id = {inst.id: inst.task_id for inst in instances} # 假设 inst.id 是PK
-        
-        nodes = []
-        edges = []
-        
-        for inst in instances:
-            # --- 节点信息 ---
-            node_data = {
-                "id": inst.task_id,      # 前端通过 task_id 索引
-                "type": "customNode",    # 前端组件类型
-                
-                "label": inst.name or inst.task_id,
-                "status": inst.status.value,
-                "actor_type": inst.actor_type,
-                "worker_id": inst.worker_id,
-                "depth": inst.depth,
-                # 将控制信号透传给前端，前端可显示"暂停"图标
-                "signal": inst.control_signal if hasattr(inst, 'control_signal') else None,
-                "created_at": inst.created_at.isoformat() if inst.created_at else None
-                
-            }
-            nodes.append(node_data)
-            
-            # --- 边信息 (构建树状关系) ---
-            if inst.parent_id:
-                # 只有当父节点也在本次查询结果中时，才画边
-                if inst.parent_id in uuid_to_task_id.values():
-                    # parent_task_id = uuid_to_task_id[inst.parent_id]
-                    parent_task_id = inst.parent_id
-                    edges.append({
-                        "id": f"e-{parent_task_id}-{inst.task_id}",
-                        "source": parent_task_id,  # 必须是 task_id
-                        "target": inst.task_id,    # 必须是 task_id
-                        "animated": inst.status == EventInstanceStatus.RUNNING
-                    })
-        
-        return {
-            "trace_id": trace_id,
-            "nodes": nodes,
-            "edges": edges
-        }
+        rows = []
+        path_prefix = None
+        depth_limit = max_depth
+        if root_task_id is not None:
+            root = await inst_repo.get_by_task_id(root_task_id)
+            if root is None or root.trace_id != trace_id:
+                return {"trace_id": trace_id, "nodes": [], "edges": []}
+            rows.append({name: getattr(root, name, None) for name in EVENT_INSTANCE_LIST_COLUMNS})
+            path_prefix = f"{root.node_path}{root.task_id}/"
+            depth_limit = root.depth + max_depth if max_depth is not None else None
+        rows.extend(await inst_repo.find_tree_nodes(trace_id, path_prefix=path_prefix, max_depth=depth_limit))
+        return TraceGraph(trace_id, rows).render(root_task_id, max_depth)
 
     async def get_trace_summary(self, session: AsyncSession, trace_id: str) -> Dict[str, Any]:
         """
@@ -185,6 +189,49 @@ class ObserverService:
             
         return results
 
+    async def list_trace_tasks(
+        self,
+        session: AsyncSession,
+        trace_id: str,
+        filters: Optional[Dict[str, Any]] = None,
+        path_prefix: Optional[str] = None,
+        sort_by: str = "created_at",
+        descending: bool = False,
+        limit: int = 100,
+        offset: int = 0,
+        after: Optional[Tuple[Any, str]] = None,
+        with_total: bool = True
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        任务列表视图：过滤 / 排序 / 分页 / 计数全部下推到仓库层
+
+        Args:
+            trace_id: 链路ID
+            filters: 等值过滤条件（status / actor_type / layer / depth / role）
+            path_prefix: 子树过滤（node_path 前缀）
+            sort_by: 排序字段
+            descending: 是否倒序
+            limit: 每页数量
+            offset: 偏移量
+            after: 游标 (排序字段值, id)
+            with_total: 是否返回总数
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[int]]: (当前页, 总数)
+        """
+        inst_repo = create_event_instance_repo(session, dialect)
+        return await inst_repo.find_by_trace_id_paged(
+            trace_id,
+            filters=filters,
+            path_prefix=path_prefix,
+            sort_by=sort_by,
+            descending=descending,
+            limit=limit,
+            offset=offset,
+            after=after,
+            with_total=with_total
+        )
+
     async def find_traces_by_user_id(
         self,
         session: AsyncSession,
@@ -192,10 +239,12 @@ class ObserverService:
         start_time: Optional[datetime] = None,
         end_time: Optional[datetime] = None,
         limit: int = 100,
-        offset: int = 0
+        offset: int = 0,
+        before_created_at: Optional[datetime] = None,
+        before_trace_id: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
-        根据user_id查询所有trace_id及其状态，支持时间范围过滤
+        根据user_id查询所有trace_id及其状态，支持时间范围过滤与游标分页
         
         Args:
             user_id: 用户ID
@@ -203,12 +252,18 @@ class ObserverService:
             end_time: 结束时间，可选
             limit: 每页数量，默认100
             offset: 偏移量，默认0
+            before_created_at: 游标，上一页最后一条的 created_at
+            before_trace_id: 游标，上一页最后一条的 trace_id
             
         Returns:
-            List[Dict[str, Any]]: trace列表，包含trace_id、创建时间和最新状态
+            List[Dict[str, Any]]: trace列表，包含trace_id、创建时间、最新状态、根节点与状态统计
         """
         inst_repo = create_event_instance_repo(session, dialect)
-        return await inst_repo.find_traces_by_user_id(user_id, start_time, end_time, limit, offset)
+        return await inst_repo.find_traces_by_user_id(
+            user_id, start_time, end_time, limit, offset,
+            before_created_at=before_created_at,
+            before_trace_id=before_trace_id
+        )
     
     # ==========================================
     # 2. 核心：WebSocket 消息泵 (Event Pump)
@@ -231,6 +286,9 @@ class ObserverService:
                 if not trace_id:
                     continue
 
+                # 增量维护拓扑图缓存（状态变化就地更新，拓扑变化直接失效）
+                self.graph_cache.apply_event(event_type, trace_id, payload)
+
                 socket_msg = None
 
                 # -----------------------------------------------
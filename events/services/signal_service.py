@@ -4,6 +4,7 @@ from external.cache.base import CacheClient
 from external.db.session import dialect
 from external.db.impl import create_event_instance_repo
 from common.signal import SignalStatus
+from .trace_graph import trace_graph_cache
 
 
 class SignalService:
@@ -72,6 +73,8 @@ class SignalService:
         # 4. 同时发送缓存信号
         cache_key = self._get_cache_key(trace_id)
         await self.cache.set(cache_key, signal.value, ttl=3600)
+        # 拓扑图节点带有 signal 字段，信号不经过事件流，需要主动失效
+        trace_graph_cache.invalidate(trace_id)
     
     # 兼容旧接口
     async def cancel_trace(self, session: AsyncSession, trace_id: str):
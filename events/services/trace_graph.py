@@ -0,0 +1,235 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from common.enums import EventInstanceStatus
+
+
+def _status_value(status: Any) -> Optional[str]:
+    return status.value if hasattr(status, "value") else status
+
+
+class TraceGraph:
+    """
+    单个 Trace 的拓扑图（按 task_id 索引）
+
+    - 构建为 O(n)：父节点解析用字典查找，不再在循环里扫描 values()
+    - parent_id 可能存的是父节点的 task_id，也可能是内部 UUID，两种都能解析
+    - 支持按事件增量更新节点状态，以及按子树 / 深度裁剪输出
+    """
+
+    def __init__(self, trace_id: str, rows: Iterable[Dict[str, Any]]):
+        """
+        Args:
+            trace_id: 链路ID
+            rows: 实例行（至少包含 EVENT_INSTANCE_LIST_COLUMNS 中的字段）
+        """
+        self.trace_id = trace_id
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        # task_id -> (node_path, depth)，用于子树/深度裁剪
+        self._positions: Dict[str, tuple] = {}
+        # task_id -> 父节点 task_id
+        self._parents: Dict[str, str] = {}
+
+        rows = list(rows)
+        uuid_to_task_id = {row["id"]: row["task_id"] for row in rows}
+        for row in rows:
+            task_id = row["task_id"]
+            self.nodes[task_id] = self._build_node(row)
+            self._positions[task_id] = (row.get("node_path") or "/", row.get("depth") or 0)
+
+        for row in rows:
+            parent_id = row.get("parent_id")
+            if not parent_id:
+                continue
+            # 只有当父节点也在本次结果中时，才画边
+            if parent_id in self.nodes:
+                self._parents[row["task_id"]] = parent_id
+            elif parent_id in uuid_to_task_id:
+                self._parents[row["task_id"]] = uuid_to_task_id[parent_id]
+
+    @staticmethod
+    def _build_node(row: Dict[str, Any]) -> Dict[str, Any]:
+        created_at = row.get("created_at")
+        return {
+            "id": row["task_id"],      # 前端通过 task_id 索引
+            "type": "customNode",      # 前端组件类型
+            "label": row.get("name") or row["task_id"],
+            "status": _status_value(row.get("status")),
+            "actor_type": _status_value(row.get("actor_type")),
+            "worker_id": row.get("worker_id"),
+            "depth": row.get("depth") or 0,
+            # 将控制信号透传给前端，前端可显示"暂停"图标
+            "signal": row.get("control_signal"),
+            "created_at": created_at.isoformat() if hasattr(created_at, "isoformat") else created_at,
+        }
+
+    def update_node(self, task_id: str, **fields) -> bool:
+        """
+        增量更新节点字段
+
+        Returns:
+            bool: 节点存在并已更新返回 True；图中没有该节点返回 False（调用方应使缓存失效）
+        """
+        node = self.nodes.get(task_id)
+        if node is None:
+            return False
+        for key, value in fields.items():
+            if value is not None:
+                node[key] = value
+        return True
+
+    def render(self, root_task_id: Optional[str] = None, max_depth: Optional[int] = None) -> Dict[str, Any]:
+        """
+        输出前端需要的 nodes / edges
+
+        Args:
+            root_task_id: 只输出以该节点为根的子树
+            max_depth: 相对根（未指定根时相对整棵树）的最大层数
+
+        Returns:
+            Dict[str, Any]: {"trace_id", "nodes", "edges"}
+        """
+        if root_task_id is None and max_depth is None:
+            selected = list(self.nodes)
+        elif root_task_id is not None and root_task_id not in self.nodes:
+            selected = []
+        else:
+            prefix, base_depth = None, 0
+            if root_task_id is not None:
+                root_path, base_depth = self._positions[root_task_id]
+                prefix = f"{root_path}{root_task_id}/"
+            depth_limit = base_depth + max_depth if max_depth is not None else None
+            selected = [
+                task_id for task_id, (path, depth) in self._positions.items()
+                if (prefix is None or task_id == root_task_id or path.startswith(prefix))
+                and (depth_limit is None or depth <= depth_limit)
+            ]
+
+        members = set(selected)
+        nodes = [dict(self.nodes[task_id]) for task_id in selected]
+        edges = []
+        for task_id in selected:
+            parent_task_id = self._parents.get(task_id)
+            if parent_task_id is None or parent_task_id not in members:
+                continue
+            edges.append({
+                "id": f"e-{parent_task_id}-{task_id}",
+                "source": parent_task_id,  # 必须是 task_id
+                "target": task_id,         # 必须是 task_id
+                "animated": self.nodes[task_id]["status"] == EventInstanceStatus.RUNNING.value
+            })
+        return {"trace_id": self.trace_id, "nodes": nodes, "edges": edges}
+
+
+class TraceGraphCache:
+    """
+    进程内的 Trace 拓扑图缓存（LRU + TTL）
+
+    - 首次查询整图时加载并缓存，之后由事件流增量更新节点状态
+    - 拓扑变化（新增节点）或事件里出现未知节点时直接失效，下次查询重新加载
+    - 控制信号由 SignalService 写入后主动失效；TTL 兜底其余不经过事件流的变更
+    - 加载期间（读库到 put 之间）收到的事件会让这次加载结果作废，避免缓存漏掉这些事件
+    """
+
+    def __init__(self, max_traces: int = 128, ttl: float = 60.0):
+        """
+        Args:
+            max_traces: 最多缓存的 trace 数
+            ttl: 每个 trace 图的有效期（秒）
+        """
+        self.max_traces = max_traces
+        self.ttl = ttl
+        self._graphs: "OrderedDict[str, tuple]" = OrderedDict()
+        # 正在加载的 trace -> [变更版本, 加载中的请求数]
+        self._loading: Dict[str, list] = {}
+
+    def get(self, trace_id: str) -> Optional[TraceGraph]:
+        entry = self._graphs.get(trace_id)
+        if entry is None:
+            return None
+        graph, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._graphs[trace_id]
+            return None
+        self._graphs.move_to_end(trace_id)
+        return graph
+
+    def begin_load(self, trace_id: str) -> int:
+        """
+        登记一次整图加载，返回当前变更版本；须与 end_load 成对调用
+
+        Returns:
+            int: 传给 put 的版本号，加载期间该 trace 有事件或失效时版本会变化
+        """
+        entry = self._loading.setdefault(trace_id, [0, 0])
+        entry[1] += 1
+        return entry[0]
+
+    def end_load(self, trace_id: str) -> None:
+        entry = self._loading.get(trace_id)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._loading[trace_id]
+
+    def put(self, graph: TraceGraph, version: Optional[int] = None) -> None:
+        """
+        缓存整图
+
+        Args:
+            graph: 拓扑图
+            version: begin_load 返回的版本；加载期间版本已变化时丢弃这份结果
+        """
+        if version is not None:
+            entry = self._loading.get(graph.trace_id)
+            if entry is None or entry[0] != version:
+                return
+        self._graphs[graph.trace_id] = (graph, time.monotonic() + self.ttl)
+        self._graphs.move_to_end(graph.trace_id)
+        while len(self._graphs) > self.max_traces:
+            self._graphs.popitem(last=False)
+
+    def invalidate(self, trace_id: str) -> None:
+        self._graphs.pop(trace_id, None)
+        self._mark_changed(trace_id)
+
+    def _mark_changed(self, trace_id: str) -> None:
+        entry = self._loading.get(trace_id)
+        if entry is not None:
+            entry[0] += 1
+
+    def apply_event(self, event_type: str, trace_id: str, payload: Dict[str, Any]) -> None:
+        """
+        根据事件流更新缓存
+
+        Args:
+            event_type: 事件类型（TOPOLOGY_EXPANDED / TASK_* 等）
+            trace_id: 链路ID
+            payload: 事件内容
+        """
+        if event_type != "TOPOLOGY_EXPANDED" and not (event_type or "").startswith("TASK_"):
+            return
+        # 正在加载的图可能已经错过这条事件
+        self._mark_changed(trace_id)
+        if trace_id not in self._graphs:
+            return
+        if event_type == "TOPOLOGY_EXPANDED":
+            self.invalidate(trace_id)
+            return
+
+        graph = self._graphs[trace_id][0]
+        status = {
+            "TASK_STARTED": EventInstanceStatus.RUNNING.value,
+            "TASK_RUNNING": EventInstanceStatus.RUNNING.value,
+            "TASK_COMPLETED": EventInstanceStatus.SUCCESS.value,
+            "TASK_FAILED": EventInstanceStatus.FAILED.value,
+        }.get(event_type, _status_value(payload.get("status")))
+        if not graph.update_node(payload.get("task_id"), status=status, worker_id=payload.get("worker_id")):
+            # 事件里出现了图中没有的节点（如 upsert 新建），整图重新加载
+            self.invalidate(trace_id)
+
+
+# 进程级共享：ObserverService 按请求创建，缓存需要跨请求与事件监听任务共享
+trace_graph_cache = TraceGraphCache()
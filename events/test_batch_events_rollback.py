@@ -0,0 +1,146 @@
+import asyncio
+import sys
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from common.enums import EventInstanceStatus, ActorType
+from external.db.models import Base, EventInstanceDB
+from services.lifecycle_service import LifecycleService
+from entry.api.v1.commands import report_execution_events_batch
+from entry.schemas.request import BatchExecutionEventRequest
+
+
+class RecordingCache:
+    """记录写入的内存缓存；读取 fail_key 时模拟 Redis 故障"""
+
+    def __init__(self, fail_key=None):
+        self.fail_key = fail_key
+        self.data = {}
+        self.writes = []
+
+    async def get(self, key):
+        if key == self.fail_key:
+            raise ConnectionError("redis unavailable")
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, ttl=None):
+        self.writes.append(key)
+        self.data[key] = value
+
+
+class RecordingEventBus:
+    def __init__(self):
+        self.published = []
+        self.payloads = []
+
+    async def publish(self, topic, event_type, key, payload):
+        self.published.append(event_type)
+        self.payloads.append((event_type, payload))
+
+
+class NoSignal:
+    async def check_signal(self, trace_id, session=None):
+        return None
+
+
+def build_request(task_ids, event_type="STARTED"):
+    return BatchExecutionEventRequest(events=[
+        {"task_id": task_id, "trace_id": "trace_rollback", "event_type": event_type, "agent_id": "agent_1"}
+        for task_id in task_ids
+    ])
+
+
+async def run_batch(session_factory, cache, bus, task_ids, request=None):
+    svc = LifecycleService(event_bus=bus, cache=cache)
+    async with session_factory() as session:
+        try:
+            await report_execution_events_batch(request or build_request(task_ids), svc, session, NoSignal())
+            return True
+        except HTTPException:
+            return False
+
+
+async def count_instances(session_factory):
+    async with session_factory() as session:
+        return await session.scalar(
+            select(func.count()).select_from(EventInstanceDB).where(EventInstanceDB.parent_id != None)
+        )
+
+
+async def create_trace():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    async with session_factory() as session:
+        session.add(EventInstanceDB(
+            id="root_rollback", task_id="root_rollback", trace_id="trace_rollback", parent_id=None,
+            node_path="/", depth=0, actor_type=ActorType.AGENT, user_id="tester",
+            status=EventInstanceStatus.RUNNING,
+        ))
+        await session.commit()
+    return engine, session_factory
+
+
+async def test_batch_rollback_discards_side_effects():
+    """测试批量上报失败回滚时，Redis 缓存与事件推送都不会发生"""
+    engine, session_factory = await create_trace()
+
+    try:
+        # 第二条事件读缓存时出错 -> 整批回滚
+        cache, bus = RecordingCache(fail_key="ev:inst:task_2"), RecordingEventBus()
+        ok = await run_batch(session_factory, cache, bus, ["task_1", "task_2"])
+        assert not ok, "批量上报应当失败"
+        assert await count_instances(session_factory) == 0, "回滚后不应留下实例"
+        assert cache.writes == [], f"回滚后不应写缓存: {cache.writes}"
+        assert bus.published == [], f"回滚后不应推送事件: {bus.published}"
+        print("✓ 测试通过: 批量上报回滚时不写缓存、不推送事件")
+
+        # 正常批次：commit 之后才执行副作用
+        cache, bus = RecordingCache(), RecordingEventBus()
+        ok = await run_batch(session_factory, cache, bus, ["task_1", "task_2"])
+        assert ok, "批量上报应当成功"
+        assert await count_instances(session_factory) == 2
+        assert "ev:inst:task_1" in cache.data and "ev:inst:task_2" in cache.data
+        assert bus.published.count("TASK_STARTED") == 2 and bus.published.count("AGENT_HEARTBEAT") == 2
+        print("✓ 测试通过: 批量上报提交后写缓存并推送事件")
+    finally:
+        await engine.dispose()
+
+
+async def test_batch_completed_reads_start_time_from_same_batch():
+    """测试同一批次先 STARTED 后 COMPLETED 时，完成事件能拿到本批次写入的开始时间"""
+    engine, session_factory = await create_trace()
+
+    try:
+        # 缓存里只有批次之前的旧数据（没有 started_at）
+        cache, bus = RecordingCache(), RecordingEventBus()
+        cache.data["ev:inst:task_1"] = {"task_id": "task_1", "trace_id": "trace_rollback", "name": "task_1"}
+        request = BatchExecutionEventRequest(events=[
+            {"task_id": "task_1", "trace_id": "trace_rollback", "event_type": "STARTED", "agent_id": "agent_1"},
+            {"task_id": "task_1", "trace_id": "trace_rollback", "event_type": "COMPLETED", "agent_id": "agent_1"},
+        ])
+        ok = await run_batch(session_factory, cache, bus, [], request=request)
+        assert ok, "批量上报应当成功"
+        completed = [payload for event_type, payload in bus.payloads if event_type == "TASK_COMPLETED"]
+        assert len(completed) == 1
+        assert completed[0]["start_time"] is not None, "完成事件应带上同批次 STARTED 的开始时间"
+        print("✓ 测试通过: 同批次 COMPLETED 使用已 flush 的开始时间")
+    finally:
+        await engine.dispose()
+
+
+def main():
+    try:
+        asyncio.run(test_batch_rollback_discards_side_effects())
+        asyncio.run(test_batch_completed_reads_start_time_from_same_batch())
+    except AssertionError as e:
+        print(f"✗ 测试失败: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
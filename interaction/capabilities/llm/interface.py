@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import List, Union, Dict, Any, Optional
+from typing import List, Union, Dict, Any, Optional, Iterator
 from ..capability_base import CapabilityBase
 
 
@@ -17,6 +17,12 @@ class ILLMCapability(CapabilityBase):
         """统一生成接口，支持纯文本或多模态"""
         pass
 
+    def generate_stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """流式生成接口，逐段产出文本；不支持流式的实现一次性产出完整结果"""
+        result = self.generate(prompt, **kwargs)
+        if result:
+            yield result if isinstance(result, str) else str(result)
+
     @abstractmethod
     def generate_chat(self, messages: List[Dict[str, str]]) -> str:
         """多轮对话接口"""
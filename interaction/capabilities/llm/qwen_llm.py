@@ -1,5 +1,5 @@
 """Qwen LLM适配器（基于 DashScope SDK）"""
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Union, Iterator
 import json5 as json
 from .interface import ILLMCapability
 import logging
@@ -86,6 +86,44 @@ class QwenLLM(ILLMCapability):
         else:
             return self._call_text_model(prompt, parse_json, json_schema, max_retries, **kwargs)
 
+    def generate_stream(
+        self,
+        prompt: Optional[str] = None,
+        messages: Optional[List[Dict[str, str]]] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """
+        流式生成（仅文本）：使用 DashScope 增量输出，每收到一段新文本就产出一次
+
+        Args:
+            prompt: 提示词（与 messages 二选一）
+            messages: 多轮对话消息
+            **kwargs: 透传给 DashScope 的参数
+
+        Yields:
+            str: 增量文本片段
+        """
+        logger.info(f"开始流式生成，model={self.model_name}")
+        call_args = {"messages": messages} if messages is not None else {"prompt": prompt}
+        responses = self.dashscope.Generation.call(
+            model=self.model_name,
+            stream=True,
+            incremental_output=True,
+            **call_args,
+            **kwargs
+        )
+        for response in responses:
+            status_code = getattr(response, 'status_code', 200)
+            if status_code != 200:
+                raise RuntimeError(
+                    f"DashScope stream error {status_code}: "
+                    f"{getattr(response, 'code', '')} {getattr(response, 'message', '')}"
+                )
+            output = getattr(response, 'output', None)
+            delta = getattr(output, 'text', None) if output else None
+            if delta:
+                yield delta
+
     def _call_text_model(
         self,
         prompt: str,
@@ -2,7 +2,10 @@
 
 import dashscope
 from dashscope import TextEmbedding
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .embedding_cache import EmbeddingCache
 
 class QwenEmbedding:
     """
@@ -10,11 +13,24 @@ class QwenEmbedding:
     支持 DashScope 的 text-embedding-v1 / v2 模型
     """
 
-    def __init__(self, model: str = "text-embedding-v2", api_key: Optional[str] = None):
+    # DashScope text-embedding-v1/v2 单次请求最多 25 条文本
+    MAX_BATCH_SIZE = 25
+
+    def __init__(
+        self,
+        model: str = "text-embedding-v2",
+        api_key: Optional[str] = None,
+        batch_size: int = MAX_BATCH_SIZE,
+        max_workers: int = 4,
+        cache_path: Optional[str] = None
+    ):
         self.model = model
         if api_key:
             dashscope.api_key = api_key
         # 否则自动使用环境变量 DASHSCOPE_API_KEY
+        self.batch_size = max(1, min(batch_size, self.MAX_BATCH_SIZE))
+        self.max_workers = max(1, max_workers)
+        self.cache = EmbeddingCache(cache_path) if cache_path else None
 
     def embed(self, text: str, purpose: str = "search") -> List[float]:
         """
@@ -23,16 +39,54 @@ class QwenEmbedding:
         :param purpose: 用途（Mem0 会传，但 DashScope 不需要）
         :return: embedding 向量 (list of float)
         """
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """
+        批量生成 embedding 向量
+        - 相同文本只请求一次，命中持久化缓存的文本不再请求
+        - 按单次上限分批，最多 max_workers 批并发
+        :param texts: 输入文本列表
+        :return: 与 texts 顺序一致的向量列表
+        """
+        unique = list(dict.fromkeys(texts))
+        vectors: Dict[str, List[float]] = {}
+        if self.cache is not None:
+            vectors.update(self.cache.get_many(self.model, unique))
+
+        pending = [text for text in unique if text not in vectors]
+        if pending:
+            chunks = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+            workers = min(self.max_workers, len(chunks))
+            if workers == 1:
+                results = [self._embed_batch(chunk) for chunk in chunks]
+            else:
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qwen-embed") as executor:
+                    results = list(executor.map(self._embed_batch, chunks))
+
+            fetched = {}
+            for result in results:
+                fetched.update(result)
+            vectors.update(fetched)
+            if self.cache is not None:
+                self.cache.set_many(self.model, fetched)
+
+        return [vectors[text] for text in texts]
+
+    def _embed_batch(self, texts: List[str]) -> Dict[str, List[float]]:
+        """请求一批文本的向量"""
         try:
             response = TextEmbedding.call(
                 model=self.model,
-                input=text
+                input=texts
             )
             if response.status_code == 200:
-                # DashScope 返回格式: {"output": {"embeddings": [{"embedding": [...]}]}}
-                embedding = response.output["embeddings"][0]["embedding"]
-                return embedding
+                # DashScope 返回格式: {"output": {"embeddings": [{"text_index": 0, "embedding": [...]}, ...]}}
+                return {
+                    texts[item["text_index"]]: item["embedding"]
+                    for item in response.output["embeddings"]
+                }
             else:
                 raise RuntimeError(f"DashScope API error: {response.code} - {response.message}")
         except Exception as e:
-            raise RuntimeError(f"Failed to get embedding from Qwen (DashScope): {e}")
\ No newline at end of file
+            raise RuntimeError(f"Failed to get embedding from Qwen (DashScope): {e}")
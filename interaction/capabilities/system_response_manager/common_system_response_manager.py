@@ -1,4 +1,4 @@
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterator
 from .interface import ISystemResponseManagerCapability
 from common import (
     SystemResponseDTO,
@@ -64,6 +64,28 @@ class CommonSystemResponse(ISystemResponseManagerCapability):
             display_data=display_data
         )
     
+    def stream_response_text(self, prompt: str, fallback_text: str = "") -> Iterator[str]:
+        """流式生成响应文本
+        
+        Args:
+            prompt: 提示词
+            fallback_text: LLM 不可用或未产出任何内容时的兜底文本
+            
+        Yields:
+            增量文本片段
+        """
+        produced = False
+        try:
+            if self.llm:
+                for chunk in self.llm.generate_stream(prompt):
+                    produced = True
+                    yield chunk
+        except Exception as e:
+            # 已经输出的片段无法撤回，只在尚未输出时回退
+            self.logger.warning(f"流式生成失败: {e}")
+        if not produced and fallback_text:
+            yield fallback_text
+    
     def generate_task_creation_response(self, session_id: str, task_id: str, task_title: str) -> SystemResponseDTO:
         """生成任务创建成功的响应
         
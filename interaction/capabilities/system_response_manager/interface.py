@@ -1,4 +1,4 @@
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterator
 from abc import abstractmethod
 from ..base import BaseManager
 from common import (
@@ -34,6 +34,19 @@ class ISystemResponseManagerCapability(BaseManager):
         """
         pass
     
+    @abstractmethod
+    def stream_response_text(self, prompt: str, fallback_text: str = "") -> Iterator[str]:
+        """流式生成响应文本
+        
+        Args:
+            prompt: 提示词
+            fallback_text: LLM 不可用或未产出任何内容时的兜底文本
+            
+        Yields:
+            增量文本片段
+        """
+        pass
+    
     @abstractmethod
     def generate_task_creation_response(self, session_id: str, task_id: str, task_title: str) -> SystemResponseDTO:
         """生成任务创建成功的响应
@@ -803,11 +803,8 @@ class InteractionHandler:
                             return
                     
                     case IntentType.IDLE_CHAT:
-                        from capabilities.llm.interface import ILLMCapability
                         from capabilities.context_manager.interface import IContextManagerCapability
                         
-                        llm_capability = self.registry.get_capability("llm", ILLMCapability)
-                        
                         try:
                             context_manager = self.registry.get_capability("context_manager", IContextManagerCapability)
                             # 获取最近 5-10 轮对话 (根据 Token 限制调整)
@@ -860,9 +857,8 @@ class InteractionHandler:
                             请回复用户：
                             """
 
-                        # 调用 LLM
-                        idle_content = llm_capability.generate(prompt)
-                        result_data = {"response_text": idle_content}
+                        # 回复在生成响应阶段流式输出，这里只准备 Prompt
+                        result_data = {"response_prompt": prompt}
                         yield "thought", {"message": "闲聊意图处理完成(已携带历史记忆)"}
                     
                     case _:
@@ -1051,6 +1047,25 @@ class InteractionHandler:
         # === 7. 生成响应 & 持久化状态 ===
         try:
             system_response_manager = self.registry.get_capability("system_response", ISystemResponseManagerCapability)
+
+            # 需要 LLM 生成的回复：边生成边推送，首个片段到达即可输出
+            streamed = False
+            if result_data.get("response_prompt"):
+                chunks = system_response_manager.stream_response_text(
+                    result_data["response_prompt"],
+                    fallback_text=result_data.get("response_text") or "抱歉，我暂时无法回复，请稍后再试。"
+                )
+                streamed_text = ""
+                while True:
+                    # 同步迭代器放到线程中推进，避免阻塞事件循环
+                    chunk = await asyncio.to_thread(next, chunks, None)
+                    if chunk is None:
+                        break
+                    streamed_text += chunk
+                    yield "message", {"content": chunk}
+                result_data["response_text"] = streamed_text
+                streamed = True
+
             response = system_response_manager.generate_response(
                 input.session_id,
                 result_data.get("response_text", ""),
@@ -1063,7 +1078,7 @@ class InteractionHandler:
             dialog_state_manager.update_dialog_state(dialog_state)
 
             # 流式返回
-            if response.response_text:
+            if response.response_text and not streamed:
                 for char in response.response_text:
                     yield "message", {"content": char}
                     # 模拟延迟，实际项目中可以移除
@@ -9,6 +9,10 @@ from .relationship_service import (RelationshipService)
 
 from .tree_manager import (TreeManager)
 
+from .tree_snapshot import (TreeSnapshot)
+
+from .closure_index import (TreeClosureIndex)
+
 __all__ = [
     # 节点服务
     'NodeService',
@@ -17,7 +21,13 @@ __all__ = [
     'RelationshipService',
     
     # 树管理器
-    'TreeManager'
+    'TreeManager',
+    
+    # 树结构快照
+    'TreeSnapshot',
+    
+    # 祖先/后代闭包索引
+    'TreeClosureIndex'
 ]
 
 __version__ = '1.0.0'
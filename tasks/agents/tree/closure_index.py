@@ -0,0 +1,192 @@
+"""祖先/后代闭包索引"""
+from typing import Dict, Optional, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .tree_snapshot import TreeSnapshot
+
+
+class TreeClosureIndex:
+    """
+    祖先/后代闭包索引
+    基于先序遍历（Euler tour）为每个节点标注区间 [tin, tout)：
+    - 祖先判断：tin[u] <= tin[v] < tout[u]，O(1)
+    - 后代枚举：先序序列的切片
+    - 最近公共祖先：倍增（binary lifting），O(log n)
+    索引随快照构建，快照替换后自动失效
+    """
+
+    def __init__(self, snapshot: 'TreeSnapshot'):
+        """
+        根据树结构快照构建索引
+
+        Args:
+            snapshot: 树结构快照
+        """
+        self._order: List[str] = []
+        self._tin: Dict[str, int] = {}
+        self._tout: Dict[str, int] = {}
+        self._depth: List[int] = []
+        # _up[k][i]：先序编号为 i 的节点向上 2^k 步的祖先编号（根节点指向自身）
+        self._up: List[List[int]] = []
+
+        node_ids = set(snapshot.get_all_node_ids())
+        for parent_id, child_id in snapshot.get_edges():
+            node_ids.add(parent_id)
+            node_ids.add(child_id)
+
+        parents: List[int] = []
+        starts = snapshot.get_root_agents() + sorted(
+            node_id for node_id in node_ids
+            if snapshot.get_parent(node_id) is None and node_id not in snapshot
+        )
+        for root_id in starts:
+            if root_id in self._tin:
+                continue
+            # 迭代式先序遍历，避免深树递归溢出
+            stack = [(root_id, -1, 0, False)]
+            while stack:
+                node_id, parent_index, depth, exiting = stack.pop()
+                if exiting:
+                    self._tout[node_id] = len(self._order)
+                    continue
+                if node_id in self._tin:
+                    continue
+                index = len(self._order)
+                self._tin[node_id] = index
+                self._order.append(node_id)
+                self._depth.append(depth)
+                parents.append(parent_index if parent_index >= 0 else index)
+
+                stack.append((node_id, parent_index, depth, True))
+                for child_id in reversed(snapshot.get_children(node_id)):
+                    # 多父节点时只沿快照认定的父节点展开，保持与 get_parent 一致
+                    if child_id not in self._tin and snapshot.get_parent(child_id) == node_id:
+                        stack.append((child_id, index, depth + 1, False))
+
+        self._up.append(parents)
+        size = len(self._order)
+        level = 1
+        while (1 << level) <= size:
+            prev = self._up[level - 1]
+            self._up.append([prev[prev[i]] for i in range(size)])
+            level += 1
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self._tin
+
+    def is_ancestor(self, ancestor_id: str, node_id: str) -> Optional[bool]:
+        """
+        判断 ancestor_id 是否是 node_id 的真祖先
+
+        Args:
+            ancestor_id: 祖先节点ID
+            node_id: 节点ID
+
+        Returns:
+            bool: 是否为祖先关系；任一节点不在索引中时返回None
+        """
+        if ancestor_id not in self._tin or node_id not in self._tin:
+            return None
+        if ancestor_id == node_id:
+            return False
+        return self._tin[ancestor_id] <= self._tin[node_id] < self._tout[ancestor_id]
+
+    def get_descendants(self, node_id: str) -> Optional[List[str]]:
+        """
+        获取所有后代节点（先序）
+
+        Args:
+            node_id: 节点ID
+
+        Returns:
+            List[str]: 后代节点ID列表；节点不在索引中时返回None
+        """
+        if node_id not in self._tin:
+            return None
+        return self._order[self._tin[node_id] + 1:self._tout[node_id]]
+
+    def get_ancestors(self, node_id: str) -> Optional[List[str]]:
+        """
+        获取所有祖先节点（从父节点到根节点）
+
+        Args:
+            node_id: 节点ID
+
+        Returns:
+            List[str]: 祖先节点ID列表；节点不在索引中时返回None
+        """
+        if node_id not in self._tin:
+            return None
+        parents = self._up[0]
+        ancestors = []
+        index = self._tin[node_id]
+        while parents[index] != index:
+            index = parents[index]
+            ancestors.append(self._order[index])
+        return ancestors
+
+    def _lift(self, index: int, steps: int) -> int:
+        """
+        从先序编号 index 的节点向上走 steps 步
+        """
+        level = 0
+        while steps:
+            if steps & 1:
+                index = self._up[level][index]
+            steps >>= 1
+            level += 1
+        return index
+
+    def get_lca(self, first_id: str, second_id: str) -> Optional[str]:
+        """
+        获取两个节点的最近公共祖先（节点本身也可以是公共祖先）
+
+        Args:
+            first_id: 节点ID
+            second_id: 节点ID
+
+        Returns:
+            str: 最近公共祖先ID；不在同一棵树或不在索引中时返回None
+        """
+        if first_id not in self._tin or second_id not in self._tin:
+            return None
+
+        u = self._tin[first_id]
+        v = self._tin[second_id]
+        if self._depth[u] < self._depth[v]:
+            u, v = v, u
+        u = self._lift(u, self._depth[u] - self._depth[v])
+        if u == v:
+            return self._order[u]
+
+        for level in range(len(self._up) - 1, -1, -1):
+            if self._up[level][u] != self._up[level][v]:
+                u = self._up[level][u]
+                v = self._up[level][v]
+
+        u = self._up[0][u]
+        v = self._up[0][v]
+        # 两个节点位于不同的树中
+        if u != v:
+            return None
+        return self._order[u]
+
+    def get_path_up(self, node_id: str, ancestor_id: str) -> List[str]:
+        """
+        获取从节点向上到祖先的路径（包含两端）
+
+        Args:
+            node_id: 起始节点ID
+            ancestor_id: 祖先节点ID（调用方保证祖先关系成立）
+
+        Returns:
+            List[str]: 路径节点ID列表
+        """
+        parents = self._up[0]
+        path = [node_id]
+        index = self._tin[node_id]
+        target = self._tin[ancestor_id]
+        while index != target:
+            index = parents[index]
+            path.append(self._order[index])
+        return path
@@ -143,24 +143,37 @@ class NodeService:
         """
         node = self.load_node(agent_id)
         if node:
-            # 提取元数据信息
-            meta = {
-                "agent_id": node.get("agent_id"),
-                "name": node.get("name", ""),
-                "description": node.get("description", ""),
-                "datascope": node.get("datascope", {}),
-                "capability": node.get("capability", []),
-                "is_leaf": node.get("is_leaf", False),
-                "code": node.get("code", ""),
-                "config": node.get("config", {}),
-                "dify": node.get("dify", {}),
-                "seq": node.get("seq", 100),
-                "database": node.get("database", ""),
-                "http": node.get("http", {}),
-            }
-            return meta
+            return self.build_agent_meta(node)
         return None
     
+    @staticmethod
+    def build_agent_meta(node: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        从节点数据中提取Agent元数据
+        
+        Args:
+            node: 节点数据
+            
+        Returns:
+            Dict[str, Any]: Agent元数据
+        """
+        # 提取元数据信息
+        meta = {
+            "agent_id": node.get("agent_id"),
+            "name": node.get("name", ""),
+            "description": node.get("description", ""),
+            "datascope": node.get("datascope", {}),
+            "capability": node.get("capability", []),
+            "is_leaf": node.get("is_leaf", False),
+            "code": node.get("code", ""),
+            "config": node.get("config", {}),
+            "dify": node.get("dify", {}),
+            "seq": node.get("seq", 100),
+            "database": node.get("database", ""),
+            "http": node.get("http", {}),
+        }
+        return meta
+    
     def update_node(self, node_id: str, updates: Dict[str, Any]) -> bool:
         """
         更新节点信息
@@ -328,14 +341,27 @@ class NodeService:
         
         def refresh_cache():
             while True:
-                time.sleep(60)  # 每隔60秒刷新一次缓存
-                self.refresh_cache()
+                time.sleep(60)  # 每隔60秒清理一次过期缓存
+                self._evict_expired()
                 # self.logger.info("节点缓存已自动刷新")
         
         # 使用守护线程运行，避免影响主程序退出
         thread = threading.Thread(target=refresh_cache, daemon=True)
         thread.start()
     
+    def _evict_expired(self):
+        """
+        只清理已过期的缓存项，未过期的缓存继续保留，避免整体清空后集中冷加载
+        """
+        now = datetime.now()
+        expired_keys = [
+            key for key, cached in list(self.node_cache.items())
+            if not isinstance(cached, dict) or 'timestamp' not in cached
+            or now - cached['timestamp'] >= self.cache_ttl
+        ]
+        for key in expired_keys:
+            self.node_cache.pop(key, None)
+    
     def refresh_cache(self):
         """
         刷新节点缓存
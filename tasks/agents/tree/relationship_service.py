@@ -1,5 +1,5 @@
 """关系管理服务"""
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable
 import logging
 from datetime import datetime, timedelta
 from external.repositories.agent_structure_repo import AgentStructureRepository
@@ -25,8 +25,36 @@ class RelationshipService:
         self._initialize_structure()
         self.relationship_cache = {}  # 缓存格式: {node_id: {'data': ..., 'timestamp': ...}}
         self.cache_ttl = timedelta(seconds=60)  # 缓存有效期60秒
+        # 树结构快照提供者（由TreeManager注入），用于闭包索引查询
+        self._snapshot_provider: Optional[Callable[[], Any]] = None
         self._start_auto_refresh()
     
+    def set_snapshot_provider(self, provider: Callable[[], Any]) -> None:
+        """
+        注入树结构快照提供者
+        祖先/后代相关查询优先使用快照上的闭包索引，快照不可用时回退到逐节点查询
+        
+        Args:
+            provider: 返回当前 TreeSnapshot 的可调用对象
+        """
+        self._snapshot_provider = provider
+    
+    def _get_closure_index(self):
+        """
+        获取当前快照的闭包索引
+        
+        Returns:
+            TreeClosureIndex: 闭包索引，不可用时返回None
+        """
+        if not self._snapshot_provider:
+            return None
+        try:
+            snapshot = self._snapshot_provider()
+        except Exception as e:
+            self.logger.error(f"获取树结构快照失败: {e}")
+            return None
+        return snapshot.closure_index if snapshot is not None else None
+    
     def _initialize_structure(self):
         """
         初始化结构管理器
@@ -278,6 +306,10 @@ class RelationshipService:
         Returns:
             List[str]: 祖先节点ID列表（从父节点到根节点）
         """
+        index = self._get_closure_index()
+        if index is not None and node_id in index:
+            return index.get_ancestors(node_id)
+        
         ancestors = []
         current = self.get_parent(node_id)
         
@@ -297,6 +329,10 @@ class RelationshipService:
         Returns:
             List[str]: 后代节点ID列表
         """
+        index = self._get_closure_index()
+        if index is not None and node_id in index:
+            return index.get_descendants(node_id)
+        
         descendants = []
         children = self.get_children(node_id)
         
@@ -321,6 +357,12 @@ class RelationshipService:
         if ancestor_id == descendant_id:
             return False  # 自己不是自己的后代
         
+        index = self._get_closure_index()
+        if index is not None:
+            is_ancestor = index.is_ancestor(ancestor_id, descendant_id)
+            if is_ancestor is not None:
+                return is_ancestor
+        
         descendants = self.get_descendants(ancestor_id)
         return descendant_id in descendants
     
@@ -337,6 +379,28 @@ class RelationshipService:
         """
         return self.is_descendant(ancestor_id, descendant_id)
     
+    def get_lowest_common_ancestor(self, first_id: str, second_id: str) -> Optional[str]:
+        """
+        获取两个节点的最近公共祖先
+        
+        Args:
+            first_id: 节点ID
+            second_id: 节点ID
+            
+        Returns:
+            str: 最近公共祖先ID（节点本身也可以是公共祖先），不存在则返回None
+        """
+        index = self._get_closure_index()
+        if index is not None and first_id in index and second_id in index:
+            return index.get_lca(first_id, second_id)
+        
+        first_chain = [first_id] + self.get_ancestors(first_id)
+        second_chain = set([second_id] + self.get_ancestors(second_id))
+        for node_id in first_chain:
+            if node_id in second_chain:
+                return node_id
+        return None
+    
     def get_path_between(self, start_id: str, end_id: str) -> Optional[List[str]]:
         """
         获取两个节点之间的路径
@@ -348,6 +412,17 @@ class RelationshipService:
         Returns:
             List[str]: 路径节点ID列表，如果不存在路径则返回None
         """
+        index = self._get_closure_index()
+        if index is not None and start_id in index and end_id in index:
+            lca = index.get_lca(start_id, end_id)
+            if not lca:
+                return None
+            # 路径：start -> lca -> end
+            start_to_lca = index.get_path_up(start_id, lca)
+            end_to_lca = index.get_path_up(end_id, lca)
+            end_to_lca.reverse()
+            return start_to_lca + end_to_lca[1:]  # 避免重复的lca
+        
         # 检查是否有祖先关系
         if self.is_ancestor(start_id, end_id):
             # 从start到end是向上的路径
@@ -426,14 +501,27 @@ class RelationshipService:
         
         def refresh_cache():
             while True:
-                time.sleep(60)  # 每隔60秒刷新一次缓存
-                self.refresh_cache()
+                time.sleep(60)  # 每隔60秒清理一次过期缓存
+                self._evict_expired()
                 # self.logger.info("关系缓存已自动刷新")
         
         # 使用守护线程运行，避免影响主程序退出
         thread = threading.Thread(target=refresh_cache, daemon=True)
         thread.start()
     
+    def _evict_expired(self):
+        """
+        只清理已过期的缓存项，未过期的缓存继续保留，避免整体清空后集中冷加载
+        """
+        now = datetime.now()
+        expired_keys = [
+            key for key, cached in list(self.relationship_cache.items())
+            if not isinstance(cached, dict) or 'timestamp' not in cached
+            or now - cached['timestamp'] >= self.cache_ttl
+        ]
+        for key in expired_keys:
+            self.relationship_cache.pop(key, None)
+    
     def refresh_cache(self):
         """
         刷新关系缓存
@@ -1,8 +1,10 @@
 """树形结构管理器"""
 from typing import Dict, Any, Optional, List
 import logging
+import threading
 from .node_service import NodeService
 from .relationship_service import RelationshipService
+from .tree_snapshot import TreeSnapshot
 from external.repositories.agent_structure_repo import AgentStructureRepository
 
 
@@ -14,12 +16,13 @@ class TreeManager:
     负责管理Agent的树形结构和关系
     """
     
-    def __init__(self):
+    def __init__(self, snapshot_refresh_interval: float = 60.0, full_refresh_interval: float = 600.0):
         """
         初始化树形结构管理器
         
         Args:
-            structure: Agent结构管理器实例，如果为None则自动创建
+            snapshot_refresh_interval: 树结构快照增量刷新间隔（秒）
+            full_refresh_interval: 树结构快照全量重建间隔（秒），用于同步物理删除
         """
         self.logger = logging.getLogger(__name__)
         
@@ -32,8 +35,249 @@ class TreeManager:
         # Actor引用管理
         self.actor_refs = {}
         
+        # 树结构快照：读路径只访问快照，刷新时整体替换
+        self._snapshot: Optional[TreeSnapshot] = None
+        self._snapshot_version = 0
+        self._snapshot_lock = threading.Lock()
+        # 增量刷新水位线：已加载数据中最大的 updated_at
+        self._watermark: Any = None
+        # updated_at 恰好等于水位线、且已应用过的记录；查询用 >= 避免漏掉同一时刻的写入，
+        # 这些记录会被再次返回，需要跳过
+        self._watermark_keys: set = set()
+        self._last_full_refresh = 0.0
+        self.snapshot_refresh_interval = snapshot_refresh_interval
+        self.full_refresh_interval = full_refresh_interval
+        self.relationship_service.set_snapshot_provider(self.get_snapshot)
+        self._start_snapshot_refresh()
+        
         self.logger.info("树形结构管理器初始化成功")
     
+    @staticmethod
+    def _max_watermark(current: Any, records: List[Dict[str, Any]]) -> Any:
+        """
+        计算新的水位线（取 updated_at 最大值，忽略缺失或类型不可比较的值）
+        
+        Args:
+            current: 当前水位线
+            records: 带 updated_at 字段的记录列表
+            
+        Returns:
+            Any: 新水位线
+        """
+        watermark = current
+        for record in records:
+            updated_at = record.get("updated_at")
+            if updated_at is None:
+                continue
+            try:
+                if watermark is None or updated_at > watermark:
+                    watermark = updated_at
+            except TypeError:
+                continue
+        return watermark
+    
+    @staticmethod
+    def _record_key(record: Dict[str, Any]) -> tuple:
+        """增量记录的去重键：节点按 agent_id，关系按 (parent, child, hidden)"""
+        if "agent_id" in record:
+            return ("node", record.get("agent_id"))
+        return ("edge", record.get("parent_id"), record.get("child_id"), bool(record.get("hidden")))
+    
+    def _advance_watermark(self, current: Any, records: List[Dict[str, Any]]) -> None:
+        """
+        推进水位线，并记录 updated_at 等于新水位线的记录键
+        
+        Args:
+            current: 当前水位线
+            records: 本次已应用的记录（节点与关系）
+        """
+        watermark = self._max_watermark(current, records)
+        keys = set(self._watermark_keys) if watermark == current else set()
+        for record in records:
+            try:
+                if record.get("updated_at") is not None and record.get("updated_at") == watermark:
+                    keys.add(self._record_key(record))
+            except TypeError:
+                continue
+        self._watermark = watermark
+        self._watermark_keys = keys
+    
+    def _is_applied(self, record: Dict[str, Any]) -> bool:
+        """记录是否为水位线上已应用过的那一条"""
+        try:
+            at_watermark = record.get("updated_at") == self._watermark
+        except TypeError:
+            return False
+        return at_watermark and self._record_key(record) in self._watermark_keys
+    
+    def _build_snapshot(self) -> TreeSnapshot:
+        """
+        从Neo4j一次性加载所有节点和关系，构建新的快照
+        
+        Returns:
+            TreeSnapshot: 新快照
+        """
+        import time
+        
+        nodes = self.agent_structure_repo.load_all_agents()
+        relationships = self.agent_structure_repo.load_all_relationships()
+        edges = [(rel.get("parent_id"), rel.get("child_id")) for rel in relationships]
+        
+        self._advance_watermark(None, list(nodes) + list(relationships))
+        self._last_full_refresh = time.time()
+        snapshot = TreeSnapshot(nodes, edges, version=self._snapshot_version + 1)
+        if snapshot.same_content(self._snapshot):
+            # 内容没有变化时沿用旧快照，版本号不变，下游按版本号缓存的索引不会失效
+            return self._snapshot
+        self._snapshot_version += 1
+        return snapshot
+    
+    def rebuild_snapshot(self) -> bool:
+        """
+        全量重建树结构快照并原子替换；构建失败时保留旧快照
+        
+        Returns:
+            bool: 是否重建成功
+        """
+        with self._snapshot_lock:
+            try:
+                snapshot = self._build_snapshot()
+            except Exception as e:
+                self.logger.error(f"构建树结构快照失败: {e}")
+                return False
+            self._snapshot = snapshot
+        self.logger.debug(f"树结构快照已更新: version={snapshot.version}, nodes={len(snapshot)}")
+        return True
+    
+    def refresh_snapshot_incremental(self) -> bool:
+        """
+        增量刷新：只查询 updated_at 不早于水位线的节点和关系，并在当前快照上打补丁
+        
+        水位线上已应用过的记录、与当前快照一致的节点和关系会被跳过，只有真正发生变化时才递增版本号。
+        通过 updated_at 无法感知被物理删除的节点和关系，这部分由定期全量重建兜底。
+        
+        Returns:
+            bool: 快照是否发生变化
+        """
+        with self._snapshot_lock:
+            if self._snapshot is None or self._watermark is None:
+                # 尚未加载过或数据中没有 updated_at，无法增量刷新
+                return False
+            
+            try:
+                since = self._watermark
+                nodes = self.agent_structure_repo.load_agents_updated_since(since)
+                relationships = self.agent_structure_repo.load_relationships_updated_since(since)
+            except Exception as e:
+                self.logger.error(f"增量刷新树结构失败: {e}")
+                return False
+            
+            fresh_nodes = [node for node in nodes if not self._is_applied(node)]
+            fresh_relationships = [rel for rel in relationships if not self._is_applied(rel)]
+            self._advance_watermark(since, fresh_nodes + fresh_relationships)
+            
+            current = self._snapshot
+            # 只保留真正改变快照的变更
+            changed_nodes = [
+                node for node in fresh_nodes
+                if node.get("agent_id") and current.get_node(node.get("agent_id")) != node
+            ]
+            existing_edges = set(current.get_edges())
+            added_edges = []
+            removed_edges = []
+            # 按 updated_at 排序，同一子节点的多次变更以最新的为准
+            for rel in sorted(fresh_relationships, key=lambda r: str(r.get("updated_at") or "")):
+                edge = (rel.get("parent_id"), rel.get("child_id"))
+                if rel.get("hidden"):
+                    if edge in existing_edges:
+                        removed_edges.append(edge)
+                elif edge not in existing_edges:
+                    added_edges.append(edge)
+            
+            if not changed_nodes and not added_edges and not removed_edges:
+                return False
+            
+            self._snapshot_version += 1
+            self._snapshot = current.apply_changes(
+                self._snapshot_version,
+                upserted_nodes=changed_nodes,
+                added_edges=added_edges,
+                removed_edges=removed_edges
+            )
+            snapshot = self._snapshot
+        
+        self.logger.debug(
+            f"树结构快照增量更新: version={snapshot.version}, "
+            f"nodes={len(changed_nodes)}, relationships={len(added_edges) + len(removed_edges)}"
+        )
+        return True
+    
+    def get_snapshot(self) -> Optional[TreeSnapshot]:
+        """
+        获取当前树结构快照，首次访问时同步构建
+        
+        Returns:
+            TreeSnapshot: 当前快照，如果无法构建则返回None
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        
+        with self._snapshot_lock:
+            if self._snapshot is None:
+                try:
+                    self._snapshot = self._build_snapshot()
+                except Exception as e:
+                    self.logger.error(f"构建树结构快照失败，回退到逐节点查询: {e}")
+                    return None
+            return self._snapshot
+    
+    @property
+    def snapshot_version(self) -> int:
+        """
+        当前快照版本号，树结构每次刷新后递增
+        """
+        snapshot = self.get_snapshot()
+        return snapshot.version if snapshot is not None else 0
+    
+    def _patch_snapshot(self, **changes) -> None:
+        """
+        写操作后立即在快照上应用变更，不等待后台刷新
+        
+        Args:
+            **changes: 透传给 TreeSnapshot.apply_changes 的变更
+        """
+        with self._snapshot_lock:
+            if self._snapshot is None:
+                # 快照尚未构建，下一次读取时会全量加载
+                return
+            self._snapshot_version += 1
+            self._snapshot = self._snapshot.apply_changes(self._snapshot_version, **changes)
+    
+    def _start_snapshot_refresh(self):
+        """
+        启动后台刷新快照的定时任务
+        常规周期只做增量刷新，超过全量间隔才全量重建；
+        刷新间隔带随机抖动，避免多个实例在同一时刻访问Neo4j
+        """
+        import random
+        import time
+        
+        def refresh_snapshot():
+            while True:
+                time.sleep(self.snapshot_refresh_interval * random.uniform(0.8, 1.2))
+                if self._snapshot is None:
+                    continue
+                # 数据中没有 updated_at（无水位线）时无法增量刷新，每个周期都全量重建
+                if self._watermark is None or time.time() - self._last_full_refresh >= self.full_refresh_interval:
+                    self.rebuild_snapshot()
+                else:
+                    self.refresh_snapshot_incremental()
+        
+        # 使用守护线程运行，避免影响主程序退出
+        thread = threading.Thread(target=refresh_snapshot, daemon=True)
+        thread.start()
+    
     def get_agent_meta(self, agent_id: str) -> Optional[Dict[str, Any]]:
         """
         获取Agent元数据
@@ -45,7 +289,24 @@ class TreeManager:
         Returns:
             Dict[str, Any]: Agent元数据
         """
-        return self.node_service.get_agent_meta(agent_id)
+        snapshot = self.get_snapshot()
+        if snapshot is None:
+            return self.node_service.get_agent_meta(agent_id)
+        
+        node = snapshot.get_node(agent_id)
+        return NodeService.build_agent_meta(node) if node else None
+    
+    def get_all_nodes(self) -> List[Dict[str, Any]]:
+        """
+        获取所有Agent节点
+        
+        Returns:
+            List[Dict[str, Any]]: 所有节点列表
+        """
+        snapshot = self.get_snapshot()
+        if snapshot is None:
+            return self.node_service.get_all_nodes()
+        return snapshot.get_all_nodes()
     
     def get_children(self, agent_id: str) -> List[str]:
         """
@@ -58,7 +319,10 @@ class TreeManager:
         Returns:
             List[str]: 子节点ID列表
         """
-        return self.relationship_service.get_children(agent_id)
+        snapshot = self.get_snapshot()
+        if snapshot is None:
+            return self.relationship_service.get_children(agent_id)
+        return snapshot.get_children(agent_id)
     
     def get_parent(self, agent_id: str) -> Optional[str]:
         """
@@ -70,7 +334,10 @@ class TreeManager:
         Returns:
             str: 父节点ID
         """
-        return self.relationship_service.get_parent(agent_id)
+        snapshot = self.get_snapshot()
+        if snapshot is None:
+            return self.relationship_service.get_parent(agent_id)
+        return snapshot.get_parent(agent_id)
     
     def get_actor_ref(self, agent_id: str) -> Optional[Any]:
         """
@@ -111,6 +378,10 @@ class TreeManager:
         Returns:
             List[str]: 根节点Agent ID列表
         """
+        snapshot = self.get_snapshot()
+        if snapshot is not None:
+            return snapshot.get_root_agents()
+        
         root_agents = []
         all_agents = self.node_service.get_all_nodes()
         
@@ -131,6 +402,13 @@ class TreeManager:
         Returns:
             bool: 是否是叶子节点
         """
+        snapshot = self.get_snapshot()
+        if snapshot is not None:
+            node = snapshot.get_node(agent_id)
+            if node:
+                return node.get("is_leaf", False)
+            return not snapshot.has_children(agent_id)
+        
         meta = self.get_agent_meta(agent_id)
         if meta:
             return meta.get("is_leaf", False)
@@ -149,6 +427,10 @@ class TreeManager:
         Returns:
             List[str]: 路径节点ID列表
         """
+        snapshot = self.get_snapshot()
+        if snapshot is not None:
+            return snapshot.get_full_path(agent_id)
+        
         path = [agent_id]
         current = agent_id
         
@@ -262,6 +544,11 @@ class TreeManager:
                 self.node_service.delete_node(agent_id)
                 return None
         
+        # 立即更新快照，无需等待后台刷新
+        self._patch_snapshot(
+            upserted_nodes=[agent_data],
+            added_edges=[(parent_id, agent_id)] if parent_id else []
+        )
         self.logger.info(f"Agent {agent_id} 添加成功")
         return agent_id
     
@@ -276,7 +563,15 @@ class TreeManager:
         Returns:
             bool: 是否更新成功
         """
-        return self.node_service.update_node(agent_id, updates)
+        success = self.node_service.update_node(agent_id, updates)
+        if success:
+            snapshot = self._snapshot
+            node = snapshot.get_node(agent_id) if snapshot is not None else None
+            if node is not None:
+                updated_node = dict(node)
+                updated_node.update(updates)
+                self._patch_snapshot(upserted_nodes=[updated_node])
+        return success
     
     def delete_agent(self, agent_id: str) -> bool:
         """
@@ -285,6 +580,25 @@ class TreeManager:
         Args:
             agent_id: Agent ID
             
+        Returns:
+            bool: 是否删除成功
+        """
+        deleted_ids: List[str] = []
+        try:
+            return self._delete_agent_recursive(agent_id, deleted_ids)
+        finally:
+            # 部分删除失败时，也要把已删除的节点从快照中移除
+            if deleted_ids:
+                self._patch_snapshot(removed_node_ids=deleted_ids)
+    
+    def _delete_agent_recursive(self, agent_id: str, deleted_ids: List[str]) -> bool:
+        """
+        递归删除Agent及其子树，快照在整个删除完成后统一更新
+        
+        Args:
+            agent_id: Agent ID
+            deleted_ids: 已删除的Agent ID，用于更新快照
+            
         Returns:
             bool: 是否删除成功
         """
@@ -293,7 +607,7 @@ class TreeManager:
         
         # 递归删除所有子节点
         for child_id in children:
-            if not self.delete_agent(child_id):
+            if not self._delete_agent_recursive(child_id, deleted_ids):
                 self.logger.error(f"删除子Agent {child_id} 失败")
                 return False
         
@@ -310,6 +624,7 @@ class TreeManager:
         
         # 移除Actor引用
         self.remove_actor_ref(agent_id)
+        deleted_ids.append(agent_id)
         
         self.logger.info(f"Agent {agent_id} 删除成功")
         return True
@@ -324,6 +639,10 @@ class TreeManager:
         Returns:
             int: 深度
         """
+        snapshot = self.get_snapshot()
+        if snapshot is not None:
+            return snapshot.get_depth(agent_id)
+        
         depth = 0
         current = agent_id
         
@@ -346,6 +665,10 @@ class TreeManager:
         Returns:
             List[str]: Agent ID列表
         """
+        snapshot = self.get_snapshot()
+        if snapshot is not None:
+            return snapshot.get_level_agents(level)
+        
         level_agents = []
         all_agents = self.node_service.get_all_nodes()
         
@@ -362,6 +685,7 @@ class TreeManager:
         """
         self.node_service.refresh_cache()
         self.relationship_service.refresh_cache()
+        self.rebuild_snapshot()
         self.logger.info("树形结构缓存已刷新")
     
     def close(self):
@@ -371,6 +695,7 @@ class TreeManager:
         self.node_service.close()
         self.relationship_service.close()
         self.actor_refs.clear()
+        self._snapshot = None
         self.logger.info("树形结构管理器已关闭")
     
     def get_influenced_subgraph(
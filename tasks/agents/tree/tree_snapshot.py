@@ -0,0 +1,320 @@
+"""树结构快照"""
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+import time
+import logging
+
+from .closure_index import TreeClosureIndex
+
+
+class TreeSnapshot:
+    """
+    树结构快照
+    一次性加载整棵Agent树并建立索引（元数据、父节点、子节点、深度、根节点集合），
+    构建完成后只读，刷新时由TreeManager整体替换
+    """
+
+    def __init__(
+        self,
+        nodes: Iterable[Dict[str, Any]],
+        edges: Iterable[Tuple[str, str]],
+        version: int = 0
+    ):
+        """
+        构建树结构快照
+
+        Args:
+            nodes: 节点列表，格式同 AgentStructureRepository.load_all_agents
+            edges: 父子关系列表，格式为 (parent_id, child_id)
+            version: 快照版本号，每次刷新递增
+        """
+        self.logger = logging.getLogger(__name__)
+        self.version = version
+        self.built_at = time.time()
+
+        self._nodes: Dict[str, Dict[str, Any]] = {}
+        self._parent: Dict[str, str] = {}
+        self._children: Dict[str, Tuple[str, ...]] = {}
+        self._depth: Dict[str, int] = {}
+
+        for node in nodes:
+            agent_id = node.get("agent_id")
+            if agent_id:
+                self._nodes[agent_id] = node
+
+        children: Dict[str, List[str]] = {}
+        for parent_id, child_id in edges:
+            if not parent_id or not child_id:
+                continue
+            siblings = children.setdefault(parent_id, [])
+            if child_id not in siblings:
+                siblings.append(child_id)
+            # 与 get_agent_relationship 的 LIMIT 1 保持一致：只保留第一个父节点
+            self._parent.setdefault(child_id, parent_id)
+        self._children = {pid: tuple(cids) for pid, cids in children.items()}
+
+        # 根节点：没有父节点的Agent，保持加载顺序
+        self._roots: Tuple[str, ...] = tuple(
+            agent_id for agent_id in self._nodes if agent_id not in self._parent
+        )
+
+        for agent_id in self._nodes:
+            self._compute_depth(agent_id)
+
+        # 闭包索引按需构建，快照不可变，构建一次即可
+        self._closure_index: Optional['TreeClosureIndex'] = None
+
+    def _compute_depth(self, agent_id: str) -> int:
+        """
+        计算节点深度（根节点深度为0），沿父链回溯并缓存中间结果
+
+        Args:
+            agent_id: Agent ID
+
+        Returns:
+            int: 深度
+        """
+        if agent_id in self._depth:
+            return self._depth[agent_id]
+
+        chain = []
+        seen = set()
+        current = agent_id
+        while current is not None and current not in self._depth:
+            if current in seen:
+                # 出现环：以环上节点作为起点，防止死循环
+                self.logger.warning(f"检测到环状父子关系: {current}")
+                self._depth[current] = 0
+                chain.remove(current)
+                break
+            seen.add(current)
+            chain.append(current)
+            current = self._parent.get(current)
+
+        base = self._depth[current] + 1 if current is not None else 0
+        for offset, node_id in enumerate(reversed(chain)):
+            self._depth[node_id] = base + offset
+        return self._depth[agent_id]
+
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self._nodes
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def get_node(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取节点原始数据
+
+        Args:
+            agent_id: Agent ID
+
+        Returns:
+            Dict[str, Any]: 节点数据，不存在则返回None
+        """
+        return self._nodes.get(agent_id)
+
+    def get_all_nodes(self) -> List[Dict[str, Any]]:
+        """
+        获取所有节点
+
+        Returns:
+            List[Dict[str, Any]]: 所有节点列表
+        """
+        return list(self._nodes.values())
+
+    def get_all_node_ids(self) -> List[str]:
+        """
+        获取所有节点ID
+
+        Returns:
+            List[str]: 节点ID列表
+        """
+        return list(self._nodes)
+
+    @property
+    def closure_index(self) -> 'TreeClosureIndex':
+        """
+        祖先/后代闭包索引，首次访问时构建
+        """
+        if self._closure_index is None:
+            self._closure_index = TreeClosureIndex(self)
+        return self._closure_index
+
+    def get_children(self, agent_id: str) -> List[str]:
+        """
+        获取子节点
+
+        Args:
+            agent_id: Agent ID
+
+        Returns:
+            List[str]: 子节点ID列表
+        """
+        return list(self._children.get(agent_id, ()))
+
+    def get_parent(self, agent_id: str) -> Optional[str]:
+        """
+        获取父节点
+
+        Args:
+            agent_id: Agent ID
+
+        Returns:
+            str: 父节点ID，没有则返回None
+        """
+        return self._parent.get(agent_id)
+
+    def get_depth(self, agent_id: str) -> int:
+        """
+        获取节点深度（根节点深度为0）
+
+        Args:
+            agent_id: Agent ID
+
+        Returns:
+            int: 深度
+        """
+        if agent_id in self._depth:
+            return self._depth[agent_id]
+        # 不在Agent集合中的节点（例如仅出现在关系中的节点）
+        parent_id = self._parent.get(agent_id)
+        return self.get_depth(parent_id) + 1 if parent_id else 0
+
+    def get_root_agents(self) -> List[str]:
+        """
+        获取所有根节点
+
+        Returns:
+            List[str]: 根节点ID列表
+        """
+        return list(self._roots)
+
+    def get_full_path(self, agent_id: str) -> List[str]:
+        """
+        获取从根节点到当前节点的路径
+
+        Args:
+            agent_id: Agent ID
+
+        Returns:
+            List[str]: 路径节点ID列表
+        """
+        path = [agent_id]
+        seen = {agent_id}
+        current = self._parent.get(agent_id)
+        while current and current not in seen:
+            path.append(current)
+            seen.add(current)
+            current = self._parent.get(current)
+        path.reverse()
+        return path
+
+    def get_level_agents(self, level: int) -> List[str]:
+        """
+        获取指定层级的所有节点
+
+        Args:
+            level: 层级（从0开始）
+
+        Returns:
+            List[str]: Agent ID列表
+        """
+        return [agent_id for agent_id in self._nodes if self._depth.get(agent_id) == level]
+
+    def get_edges(self) -> List[Tuple[str, str]]:
+        """
+        获取所有父子关系
+
+        Returns:
+            List[Tuple[str, str]]: (parent_id, child_id) 列表
+        """
+        return [
+            (parent_id, child_id)
+            for parent_id, child_ids in self._children.items()
+            for child_id in child_ids
+        ]
+
+    def same_content(self, other: Optional['TreeSnapshot']) -> bool:
+        """
+        判断两个快照的节点与父子关系是否完全一致（用于避免无变化时递增版本号）
+
+        Args:
+            other: 另一个快照
+
+        Returns:
+            bool: 内容是否一致
+        """
+        return other is not None and self._nodes == other._nodes and self.get_edges() == other.get_edges()
+
+    def apply_changes(
+        self,
+        version: int,
+        upserted_nodes: Iterable[Dict[str, Any]] = (),
+        removed_node_ids: Iterable[str] = (),
+        added_edges: Iterable[Tuple[str, str]] = (),
+        removed_edges: Iterable[Tuple[str, str]] = ()
+    ) -> 'TreeSnapshot':
+        """
+        在当前快照基础上应用增量变更，生成新的快照（当前快照保持不变）
+
+        新增的父子关系视为子节点的重新挂载：子节点原有的父关系会被替换。
+
+        Args:
+            version: 新快照版本号
+            upserted_nodes: 新增或更新的节点
+            removed_node_ids: 删除的节点ID
+            added_edges: 新增的父子关系 (parent_id, child_id)
+            removed_edges: 删除或隐藏的父子关系 (parent_id, child_id)
+
+        Returns:
+            TreeSnapshot: 新快照
+        """
+        nodes = dict(self._nodes)
+        for node in upserted_nodes:
+            agent_id = node.get("agent_id")
+            if agent_id:
+                nodes[agent_id] = node
+
+        removed_ids = set(removed_node_ids)
+        for agent_id in removed_ids:
+            nodes.pop(agent_id, None)
+
+        # 同一子节点出现多条新增关系时，以最后一条为准
+        latest_parent: Dict[str, str] = {}
+        for parent_id, child_id in added_edges:
+            if parent_id and child_id:
+                latest_parent.pop(child_id, None)
+                latest_parent[child_id] = parent_id
+        added_edges = [(parent_id, child_id) for child_id, parent_id in latest_parent.items()]
+        reparented = set(latest_parent)
+        dropped = set(removed_edges)
+
+        edges = [
+            (parent_id, child_id)
+            for parent_id, child_id in self.get_edges()
+            if (parent_id, child_id) not in dropped
+            and child_id not in reparented
+            and parent_id not in removed_ids
+            and child_id not in removed_ids
+        ]
+        edges.extend(
+            (parent_id, child_id)
+            for parent_id, child_id in added_edges
+            if (parent_id, child_id) not in dropped
+            and parent_id not in removed_ids
+            and child_id not in removed_ids
+        )
+
+        return TreeSnapshot(nodes.values(), edges, version=version)
+
+    def has_children(self, agent_id: str) -> bool:
+        """
+        检查节点是否有子节点
+
+        Args:
+            agent_id: Agent ID
+
+        Returns:
+            bool: 是否有子节点
+        """
+        return bool(self._children.get(agent_id))
@@ -0,0 +1,188 @@
+"""Agent元数据向量索引，用于层级语义搜索的候选预筛选"""
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from collections import OrderedDict
+import hashlib
+import logging
+import threading
+
+import numpy as np
+
+
+class AgentVectorIndex:
+    """
+    Agent元数据的本地向量索引
+    - 以节点的数据范围、能力声明、描述拼接文本作为向量化内容
+    - 随树结构快照版本重建，只对文本发生变化的节点重新向量化
+    - 对某一层的候选节点按余弦相似度排序，供 LLM 匹配前预筛选
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], List[float]],
+        embed_many_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        query_cache_size: int = 512
+    ):
+        """
+        初始化向量索引
+
+        Args:
+            embed_fn: 单条文本向量化函数
+            embed_many_fn: 批量向量化函数（可选），提供时优先使用
+            query_cache_size: 查询向量缓存条数
+        """
+        self.logger = logging.getLogger(__name__)
+        self.embed_fn = embed_fn
+        self.embed_many_fn = embed_many_fn
+        self.query_cache_size = query_cache_size
+
+        self.version: Optional[int] = None
+        self._vectors: Dict[str, np.ndarray] = {}
+        # 文本哈希 -> 向量，跨版本复用，避免重复向量化未变化的节点
+        self._text_vectors: Dict[str, np.ndarray] = {}
+        self._query_vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    @staticmethod
+    def build_node_text(meta: Dict[str, Any]) -> str:
+        """
+        构造节点的向量化文本，字段与语义匹配 Prompt 中的候选描述保持一致
+
+        Args:
+            meta: Agent元数据
+
+        Returns:
+            str: 向量化文本
+        """
+        ds = meta.get("datascope") or meta.get("data_scope") or ""
+        caps = meta.get("capability") or meta.get("capabilities") or []
+        cap_str = ", ".join(caps) if isinstance(caps, list) else str(caps)
+        parts = [
+            str(meta.get("name") or ""),
+            str(ds),
+            cap_str,
+            str(meta.get("description") or ""),
+        ]
+        return "\n".join(p for p in parts if p)
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> Optional[np.ndarray]:
+        """
+        归一化向量，使点积即为余弦相似度
+        """
+        if not vector:
+            return None
+        arr = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(arr)
+        if norm == 0:
+            return None
+        return arr / norm
+
+    def _embed_texts(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        批量向量化文本（若未提供批量函数则逐条调用）
+        """
+        if not texts:
+            return []
+        if self.embed_many_fn:
+            raw = self.embed_many_fn(texts)
+        else:
+            raw = [self.embed_fn(text) for text in texts]
+        return [self._normalize(vector) for vector in raw]
+
+    def rebuild(self, nodes: List[Dict[str, Any]], version: Optional[int]) -> None:
+        """
+        根据节点列表重建索引；构建期间旧索引继续对外提供查询
+
+        Args:
+            nodes: 节点元数据列表（需包含 agent_id）
+            version: 对应的树结构快照版本
+        """
+        with self._build_lock:
+            if version is not None and version == self.version:
+                return
+
+            # agent_id -> (文本哈希, 文本)
+            texts: Dict[str, Tuple[str, str]] = {}
+            for node in nodes:
+                agent_id = node.get("agent_id")
+                text = self.build_node_text(node)
+                if agent_id and text:
+                    texts[agent_id] = (hashlib.sha1(text.encode("utf-8")).hexdigest(), text)
+
+            missing: Dict[str, str] = {}
+            for digest, text in texts.values():
+                if digest not in self._text_vectors:
+                    missing[digest] = text
+
+            text_vectors = dict(self._text_vectors)
+            if missing:
+                digests = list(missing)
+                try:
+                    vectors = self._embed_texts([missing[d] for d in digests])
+                except Exception as e:
+                    self.logger.warning(f"Agent metadata embedding failed, unindexed nodes go straight to LLM: {e}")
+                    vectors = []
+                for digest, vector in zip(digests, vectors):
+                    if vector is not None:
+                        text_vectors[digest] = vector
+
+            live = {digest for digest, _ in texts.values()}
+            # 丢弃已不再被任何节点引用的文本向量
+            self._text_vectors = {d: v for d, v in text_vectors.items() if d in live}
+            self._vectors = {
+                agent_id: self._text_vectors[digest]
+                for agent_id, (digest, _) in texts.items()
+                if digest in self._text_vectors
+            }
+            self.version = version
+            self.logger.info(
+                f"Agent vector index rebuilt: version={version}, indexed={len(self._vectors)}, "
+                f"embedded={len(missing)}"
+            )
+
+    def _embed_query(self, query: str) -> Optional[np.ndarray]:
+        """
+        向量化查询文本，带 LRU 缓存
+        """
+        with self._lock:
+            cached = self._query_vectors.get(query)
+            if cached is not None:
+                self._query_vectors.move_to_end(query)
+                return cached
+
+        vector = self._normalize(self.embed_fn(query))
+        if vector is None:
+            return None
+
+        with self._lock:
+            self._query_vectors[query] = vector
+            if len(self._query_vectors) > self.query_cache_size:
+                self._query_vectors.popitem(last=False)
+        return vector
+
+    def rank(self, query: str, candidate_ids: List[str]) -> Tuple[List[Tuple[str, float]], List[str]]:
+        """
+        对候选节点按与查询的相似度排序
+
+        Args:
+            query: 查询文本
+            candidate_ids: 候选节点ID列表
+
+        Returns:
+            (已索引候选的 [(node_id, score)] 降序列表, 未被索引的候选ID列表)
+        """
+        vectors = self._vectors
+        indexed = [nid for nid in candidate_ids if nid in vectors]
+        unindexed = [nid for nid in candidate_ids if nid not in vectors]
+        if not indexed:
+            return [], unindexed
+
+        query_vector = self._embed_query(query)
+        if query_vector is None:
+            return [], candidate_ids
+
+        matrix = np.stack([vectors[nid] for nid in indexed])
+        scores = matrix @ query_vector
+        order = np.argsort(-scores)
+        return [(indexed[i], float(scores[i])) for i in order], unindexed
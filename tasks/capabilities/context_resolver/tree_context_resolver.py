@@ -1,10 +1,14 @@
 """上下文解析器实现"""
 from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait
 from ..capability_base import CapabilityBase
 import logging
 import json
 import re
+import time
 from .interface import IContextResolverCapbility 
+from .agent_vector_index import AgentVectorIndex
+from common.utils.cache import LRUCache
 import logging
 logger = logging.getLogger(__name__)
 
@@ -25,16 +29,49 @@ class TreeContextResolver(IContextResolverCapbility):
         self.variable_pattern = re.compile(r'\$\{([^}]+)\}')
         self.context_templates = {}
 
+        # 向量预筛选：在调用 LLM 之前按元数据相似度缩小候选范围
+        self.vector_index: Optional[AgentVectorIndex] = None
+        self.prefilter_enabled = True
+        self.prefilter_top_k = 5          # 送入 LLM 的候选上限
+        self.prefilter_min_score = 0.80   # 直接命中所需的最低相似度
+        self.prefilter_margin = 0.10      # 直接命中所需的领先第二名的幅度
+
+        # 定位结果缓存：(树快照版本, 起始Agent, 归一化查询) -> 叶子节点ID
+        self.resolution_cache_ttl = 3600.0
+        self.resolution_negative_ttl = 300.0  # 未定位结果的缓存时间
+        self.resolution_cache = LRUCache(name='context_resolution', max_size=2048)
+
+        # 多个上下文键的并发解析
+        self.resolve_max_workers = 4
+        self.resolve_deadline: Optional[float] = 60.0  # 单次 resolve_context 的总超时（秒）
+        self.locate_deadline_share = 0.5  # 定位阶段最多占用总超时的比例，其余留给数据查询
+
     def get_capability_type(self) -> str:
         return 'tree_context_resolver'
 
     def initialize(self, config: Dict[str, Any]) -> None:
         self.config = config
+        prefilter = config.get("embedding_prefilter", {}) or {}
+        self.prefilter_enabled = prefilter.get("enabled", self.prefilter_enabled)
+        self.prefilter_top_k = prefilter.get("top_k", self.prefilter_top_k)
+        self.prefilter_min_score = prefilter.get("min_score", self.prefilter_min_score)
+        self.prefilter_margin = prefilter.get("margin", self.prefilter_margin)
+        resolution_cache = config.get("resolution_cache", {}) or {}
+        self.resolution_cache_ttl = resolution_cache.get("ttl", self.resolution_cache_ttl)
+        self.resolution_negative_ttl = resolution_cache.get("negative_ttl", self.resolution_negative_ttl)
+        if "max_size" in resolution_cache:
+            self.resolution_cache = LRUCache(name='context_resolution', max_size=resolution_cache["max_size"])
+        parallel = config.get("parallel_resolution", {}) or {}
+        self.resolve_max_workers = parallel.get("max_workers", self.resolve_max_workers)
+        self.resolve_deadline = parallel.get("deadline", self.resolve_deadline)
+        self.locate_deadline_share = parallel.get("locate_share", self.locate_deadline_share)
         self.logger.info("TreeContextResolver initialized with config.")
 
     def shutdown(self) -> None:
         self.context_templates.clear()
         self.tree_manager = None
+        self.vector_index = None
+        self.resolution_cache.clear()
         self.logger.info("TreeContextResolver shutdown.")
 
     def set_dependencies(self, tree_manager: Any=None, llm_client: Any = None) -> None:
@@ -59,16 +96,35 @@ class TreeContextResolver(IContextResolverCapbility):
     # 核心逻辑：基于 TreeManager 的寻址
     # ----------------------------------------------------------
 
-    def resolve_context(self, context_requirements: Dict[str, str], agent_id: str) -> Dict[str, Any]:
+    def resolve_context(
+        self,
+        context_requirements: Dict[str, str],
+        agent_id: str,
+        max_workers: Optional[int] = None,
+        deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
         """
         解析上下文需求：
         1. 先通过 _resolve_kv_via_layered_search 定位数据所在位置（库/表/列）；
         2. 若定位成功，则使用 VannaTextToSQL 执行真实查询，返回实际数据。
+
+        所有键先一起定位（同层的键合并为一次 LLM 匹配），之后各键的数据查询相互独立。
+        max_workers > 1 时定位阶段不同层的匹配、以及各键的数据查询都在同一个线程池中并发执行；
+        deadline 覆盖定位与查询两个阶段，定位最多占用其中 locate_deadline_share 的比例，
+        超时仍未定位或未查询完成的键返回 None，已完成的键照常返回。结果按 context_requirements 的键顺序组装。
+
+        Args:
+            context_requirements: 键 -> 业务描述
+            agent_id: 发起解析的 Agent ID
+            max_workers: 本次请求的最大并发数，默认取配置 parallel_resolution.max_workers
+            deadline: 本次请求的总超时（秒），默认取配置 parallel_resolution.deadline
+
+        Returns:
+            Dict[str, Any]: 键 -> 解析出的值（未解析为 None）
         """
         if not self.tree_manager or not self.llm_client:
             self.set_dependencies()
 
-        result = {}
         try:
             path = self.tree_manager.get_full_path(agent_id)
             path_str = " -> ".join(path)
@@ -84,92 +140,262 @@ class TreeContextResolver(IContextResolverCapbility):
         except Exception as e:
             self.logger.warning(f"Could not retrieve base agent meta for {agent_id}: {e}")
 
-        for key, value_desc in context_requirements.items():
+        if max_workers is None:
+            max_workers = self.resolve_max_workers
+        if deadline is None:
+            deadline = self.resolve_deadline
+        workers = min(max(int(max_workers or 1), 1), len(context_requirements))
+
+        # Step 1: 定位数据位置（库、表、列等）；所有键一起搜索，同层的键合并为一次 LLM 匹配
+        queries = {
+            key: f"需查找数据: '{key}', 业务描述: '{value_desc}'"
+            for key, value_desc in context_requirements.items()
+        }
+
+        if workers <= 1:
             try:
-                query = f"需查找数据: '{key}', 业务描述: '{value_desc}'"
-                
-                # Step 1: 定位数据位置（库、表、列等）
-                leaf_meta = self._resolve_kv_via_layered_search(agent_id, query, key)
-                if not leaf_meta:
-                    leaf_meta = self._resolve_kv_globally(query)
+                locations = self._locate_data_nodes(agent_id, queries)
+            except Exception as e:
+                self.logger.error(f"Error locating context keys {list(queries)}: {str(e)}", exc_info=True)
+                locations = {}
+            return {
+                key: self._resolve_single_key(key, value_desc, locations.get(key), agent_id, base_agent_meta)
+                for key, value_desc in context_requirements.items()
+            }
 
-                
-                if not leaf_meta:
-                    self.logger.warning(f"❌ Unresolved '{key}' (Desc: {value_desc}) – no location found")
-                    result[key] = None
-                    continue
+        started_at = time.monotonic()
+        deadline_at = started_at + deadline if deadline is not None else None
+        # 定位阶段的截止时间：超过后未定位的键放弃，保证查询阶段至少还有剩余的预算
+        locate_deadline_at = (
+            started_at + deadline * self.locate_deadline_share if deadline is not None else None
+        )
 
-                # Step 2: 如果定位成功，尝试用 Vanna 查询真实数据
-                self.logger.info(f"📍 Located '{key}' at: {leaf_meta}")
-                
-                # 构造 Vanna 所需的 agent_meta 格式：database = "db.table"
-                db_name = leaf_meta.get("database") or leaf_meta.get("db")
-                table_name = leaf_meta.get("table") or leaf_meta.get("tbl")
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="context-resolve")
+        try:
+            try:
+                locations = self._locate_data_nodes(
+                    agent_id, queries, executor=executor, deadline_at=locate_deadline_at
+                )
+            except Exception as e:
+                self.logger.error(f"Error locating context keys {list(queries)}: {str(e)}", exc_info=True)
+                locations = {}
 
-                # Some nodes store "db.table" in database field.
-                if db_name and not table_name and "." in str(db_name):
-                    parts = str(db_name).split(".", 1)
-                    db_name = parts[0].strip() or None
-                    table_name = parts[1].strip() or None
+            futures = {
+                key: executor.submit(
+                    self._resolve_single_key, key, value_desc, locations.get(key),
+                    agent_id, base_agent_meta, True
+                )
+                for key, value_desc in context_requirements.items()
+            }
+            remaining = max(deadline_at - time.monotonic(), 0.0) if deadline_at is not None else None
+            _, pending = wait(futures.values(), timeout=remaining)
+        finally:
+            # 超时的键不再等待，尚未开始的任务直接取消
+            executor.shutdown(wait=False, cancel_futures=True)
 
-                if not db_name or not table_name:
-                    db_name, table_name = self._extract_db_table_from_meta(leaf_meta)
-                
-                if not db_name or not table_name:
-                    self.logger.warning(f"⚠️ Incomplete location info for '{key}': {leaf_meta}, skip Vanna query")
-                    result[key] = None
-                    continue
+        result = {}
+        for key, future in futures.items():
+            if future in pending:
+                self.logger.warning(f"⏱️ Context key '{key}' not resolved within the resolve deadline")
+                result[key] = None
+            else:
+                result[key] = future.result()
+        return result
 
-                vanna_agent_meta = {
-                    "database": f"{db_name}.{table_name}",
-                    "database_type": leaf_meta.get("database_type", base_agent_meta.get("database_type", "mysql"))
-                }
+    def _resolve_single_key(
+        self,
+        key: str,
+        value_desc: str,
+        leaf_meta: Optional[Dict[str, Any]],
+        agent_id: str,
+        base_agent_meta: Dict[str, Any],
+        private_text_to_sql: bool = False
+    ) -> Any:
+        """
+        解析单个上下文键：在已定位的数据节点上通过 Text-to-SQL 查询真实数据
 
-                # 初始化 Vanna 能力
-                from .. import get_capability
-                from ..text_to_sql.text_to_sql import ITextToSQLCapability
-                try:
-                    text_to_sql_cap: ITextToSQLCapability = get_capability(
-                        "text_to_sql", ITextToSQLCapability
-                    )
-                except Exception as e:
-                    self.logger.warning(f"Text-to-SQL capability unavailable: {e}")
-                    result[key] = None
-                    continue
+        Args:
+            key: 上下文键
+            value_desc: 业务描述
+            leaf_meta: 已定位的叶子节点元数据，未定位为 None
+            agent_id: 发起解析的 Agent ID
+            base_agent_meta: 发起 Agent 的元信息
+            private_text_to_sql: 是否使用独立的 Text-to-SQL 实例（并发解析时需要）
 
-                text_to_sql_cap.initialize({
-                    "agent_id": agent_id,
-                    "agent_meta": vanna_agent_meta
-                })
+        Returns:
+            Any: 解析出的值，失败时返回None
+        """
+        try:
+            if not leaf_meta:
+                self.logger.warning(f"❌ Unresolved '{key}' (Desc: {value_desc}) – no location found")
+                return None
 
-                try:
-                    # 使用原始业务描述作为查询语句
-                    response = text_to_sql_cap.execute_query(user_query=value_desc, context=None)
-                    records = response.get("result", [])
-                    
-                    if records:
-                        # 使用 LLM 从查询结果中提取符合业务需求的值
-                        resolved_value = self._extract_value_from_records(
-                            key=key,
-                            value_desc=value_desc,
-                            records=records
-                        )
-                        result[key] = resolved_value
-                        self.logger.info(f"✅ Resolved '{key}' with real data (rows: {len(records)}, extracted: {type(resolved_value).__name__})")
-                    else:
-                        self.logger.warning(f"🔍 Located but no data returned for '{key}'")
-                        result[key] = None  # 或保留 leaf_meta，视业务而定
-                        
-                finally:
-                    # 确保释放资源
-                    text_to_sql_cap.shutdown()
+            # Step 2: 如果定位成功，尝试用 Vanna 查询真实数据
+            self.logger.info(f"📍 Located '{key}' at: {leaf_meta}")
+            
+            # 构造 Vanna 所需的 agent_meta 格式：database = "db.table"
+            db_name = leaf_meta.get("database") or leaf_meta.get("db")
+            table_name = leaf_meta.get("table") or leaf_meta.get("tbl")
+
+            # Some nodes store "db.table" in database field.
+            if db_name and not table_name and "." in str(db_name):
+                parts = str(db_name).split(".", 1)
+                db_name = parts[0].strip() or None
+                table_name = parts[1].strip() or None
 
+            if not db_name or not table_name:
+                db_name, table_name = self._extract_db_table_from_meta(leaf_meta)
+            
+            if not db_name or not table_name:
+                self.logger.warning(f"⚠️ Incomplete location info for '{key}': {leaf_meta}, skip Vanna query")
+                return None
+
+            vanna_agent_meta = {
+                "database": f"{db_name}.{table_name}",
+                "database_type": leaf_meta.get("database_type", base_agent_meta.get("database_type", "mysql"))
+            }
+
+            # 初始化 Vanna 能力
+            from .. import get_capability
+            from ..text_to_sql.text_to_sql import ITextToSQLCapability
+            try:
+                text_to_sql_cap: ITextToSQLCapability = get_capability(
+                    "text_to_sql", ITextToSQLCapability
+                )
+                if private_text_to_sql:
+                    # 注册的能力是共享单例且 initialize/shutdown 有状态，并发时每个键使用独立实例
+                    text_to_sql_cap = type(text_to_sql_cap)()
             except Exception as e:
-                self.logger.error(f"Error resolving key '{key}': {str(e)}", exc_info=True)
-                result[key] = None
+                self.logger.warning(f"Text-to-SQL capability unavailable: {e}")
+                return None
+
+            text_to_sql_cap.initialize({
+                "agent_id": agent_id,
+                "agent_meta": vanna_agent_meta
+            })
+
+            try:
+                # 使用原始业务描述作为查询语句
+                response = text_to_sql_cap.execute_query(user_query=value_desc, context=None)
+                records = response.get("result", [])
+                
+                if records:
+                    # 使用 LLM 从查询结果中提取符合业务需求的值
+                    resolved_value = self._extract_value_from_records(
+                        key=key,
+                        value_desc=value_desc,
+                        records=records
+                    )
+                    self.logger.info(f"✅ Resolved '{key}' with real data (rows: {len(records)}, extracted: {type(resolved_value).__name__})")
+                    return resolved_value
+
+                self.logger.warning(f"🔍 Located but no data returned for '{key}'")
+                return None  # 或保留 leaf_meta，视业务而定
+
+            finally:
+                # 确保释放资源
+                text_to_sql_cap.shutdown()
+
+
+        except Exception as e:
+            self.logger.error(f"Error resolving key '{key}': {str(e)}", exc_info=True)
+            return None
+
+    # 缓存中表示“已搜索但未定位到”的标记
+    _UNRESOLVED = ""
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """
+        归一化查询文本作为缓存键：去除首尾空白、合并连续空白、统一小写
+        """
+        return re.sub(r"\s+", " ", query.strip()).lower()
+
+    def _locate_data_node(self, agent_id: str, query: str, key: str) -> Optional[Dict]:
+        """
+        定位单个键的数据所在叶子节点，见 _locate_data_nodes
+        """
+        return self._locate_data_nodes(agent_id, {key: query}).get(key)
+
+    def _locate_data_nodes(
+        self,
+        agent_id: str,
+        queries: Dict[str, str],
+        executor: Optional[ThreadPoolExecutor] = None,
+        deadline_at: Optional[float] = None
+    ) -> Dict[str, Optional[Dict]]:
+        """
+        定位各个键的数据所在的叶子节点，结果按 (树快照版本, 起始Agent, 归一化查询) 缓存
 
+        未命中缓存的键一起做层级搜索，同一层上的多个键合并为一次 LLM 匹配。
+        树结构刷新后版本号变化，旧缓存自然失效；未定位到的结果使用较短的 TTL。
+        因超时而未定位的键不写入缓存。
+
+        Args:
+            agent_id: 起始 Agent ID
+            queries: 上下文变量名 -> 自然语言查询
+            executor: 用于并发执行各层匹配的线程池，None 时串行执行
+            deadline_at: 定位的截止时间（time.monotonic()），None 表示不限时
+
+        Returns:
+            Dict[str, Optional[Dict]]: 上下文变量名 -> 叶子节点元数据（未定位到为 None）
+        """
+        version = getattr(self.tree_manager, "snapshot_version", None)
+        result: Dict[str, Optional[Dict]] = {}
+        cache_keys = {}
+        misses: Dict[str, str] = {}
+
+        for key, query in queries.items():
+            cache_key = (version, agent_id, self._normalize_query(query)) if version else None
+            cache_keys[key] = cache_key
+            if cache_key is not None:
+                cached_node_id = self.resolution_cache.get(cache_key)
+                if cached_node_id is not None:
+                    if cached_node_id == self._UNRESOLVED:
+                        result[key] = None
+                        continue
+                    leaf_meta = self.tree_manager.get_agent_meta(cached_node_id)
+                    if leaf_meta:
+                        self.logger.debug(f"Resolution cache hit for '{key}': {cached_node_id}")
+                        result[key] = leaf_meta
+                        continue
+            misses[key] = query
+
+        if not misses:
+            return result
+
+        located = self._batch_layered_search(agent_id, misses, executor=executor, deadline_at=deadline_at)
+        unresolved = {key: query for key, query in misses.items() if not located.get(key)}
+        timed_out = deadline_at is not None and time.monotonic() >= deadline_at
+        if unresolved and not timed_out:
+            located.update(self._batch_resolve_kv_globally(unresolved))
+
+        for key in misses:
+            leaf_meta = located.get(key)
+            result[key] = leaf_meta
+            cache_key = cache_keys[key]
+            if cache_key is None:
+                continue
+            node_id = leaf_meta.get("agent_id") if leaf_meta else None
+            if node_id:
+                self.resolution_cache.set(cache_key, node_id, ttl=self.resolution_cache_ttl)
+            elif not leaf_meta and not timed_out:
+                self.resolution_cache.set(cache_key, self._UNRESOLVED, ttl=self.resolution_negative_ttl)
         return result
 
+    def get_resolution_cache_stats(self) -> Dict[str, Any]:
+        """
+        获取定位结果缓存的统计信息（命中、未命中、驱逐、过期次数与命中率）
+
+        Returns:
+            Dict[str, Any]: 统计信息
+        """
+        stats = self.resolution_cache.get_stats().to_dict()
+        stats["size"] = self.resolution_cache.size()
+        stats["max_size"] = self.resolution_cache.max_size
+        stats["tree_version"] = getattr(self.tree_manager, "snapshot_version", None)
+        return stats
+
     def _extract_db_table_from_meta(self, meta: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
         """
         Try to extract database/table info from datascope or other metadata.
@@ -328,87 +554,149 @@ class TreeContextResolver(IContextResolverCapbility):
         """
         适配 TreeManager 的层级搜索算法
         """
-        # 1. 初始定位：获取 start_agent 的父节点，以确定初始的"兄弟层"
-        parent_id = self.tree_manager.get_parent(start_agent_id)
-        
-        # 用于防止死循环（虽然 TreeManager 内部有防环，但搜索逻辑层也保留一份保险）
-        visited_layers = set()
-        
-        # 记录当前视角的节点，用于向上回溯时定位
-        current_focus_node = start_agent_id
-
-        while True:
-            # --- 1. 确定当前搜索层 (Layer) ---
-            if parent_id is None:
-                # 核心变更：利用 TreeManager.get_root_agents() 获取根层
-                self.logger.debug(f"Searching Root Layer for: {key}")
-                current_layer = self.tree_manager.get_root_agents()
-                
-                # 如果当前聚焦的节点本身就是根节点，且在根层也找不到，循环通常会在后面 Break
-            else:
-                # 获取父节点的所有子节点（即当前层）
-                current_layer = self.tree_manager.get_children(parent_id)
+        return self._batch_layered_search(start_agent_id, {key: query}).get(key)
 
-            # --- 防死循环检查 ---
-            layer_sig = tuple(sorted(current_layer))
-            if layer_sig in visited_layers:
-                self.logger.warning("Cycle detected in search layer. Stopping.")
-                break
-            visited_layers.add(layer_sig)
+    def _batch_layered_search(
+        self,
+        start_agent_id: str,
+        queries: Dict[str, str],
+        executor: Optional[ThreadPoolExecutor] = None,
+        deadline_at: Optional[float] = None
+    ) -> Dict[str, Optional[Dict]]:
+        """
+        多个键同时进行层级搜索：每一轮把位于同一层的键合并为一次批量语义匹配，
+        各键再按自己的匹配结果向下钻取或向上回溯
 
-            # --- 2. 在当前层进行语义匹配 ---
-            matched_node_id = self._semantic_match_for_layer(query, current_layer)
+        Args:
+            start_agent_id: 起始 Agent ID
+            queries: 上下文变量名 -> 自然语言查询
+            executor: 提供时，同一轮中不同层的匹配并发执行
+            deadline_at: 截止时间（time.monotonic()），超时后仍在搜索的键视为未定位
 
-            # --- 3. 匹配结果处理 ---
-            if matched_node_id:
-                # >> 命中分支 >>
-                # 使用 TreeManager 获取元数据
-                node_meta = self.tree_manager.get_agent_meta(matched_node_id)
-                
-                # 使用 TreeManager 判断是否叶子
-                is_leaf = self.tree_manager.is_leaf_agent(matched_node_id)
-                
-                self.logger.debug(f"Match found: {matched_node_id} (Is Leaf: {is_leaf})")
+        Returns:
+            Dict[str, Optional[Dict]]: 上下文变量名 -> 叶子节点元数据（未定位为 None）
+        """
+        result: Dict[str, Optional[Dict]] = {key: None for key in queries}
 
-                if is_leaf:
-                    # 情况 A: 找到叶子节点 -> 成功
-                    return node_meta
+        # 1. 初始定位：获取 start_agent 的父节点，以确定初始的"兄弟层"
+        start_parent_id = self.tree_manager.get_parent(start_agent_id)
+
+        # 每个键的搜索状态：当前层的父节点，以及已搜索过的层（防止死循环）
+        states = {
+            key: {"parent_id": start_parent_id, "visited_layers": set()}
+            for key in queries
+        }
+
+        while states:
+            if deadline_at is not None and time.monotonic() >= deadline_at:
+                self.logger.warning(f"⏱️ Layered search deadline reached, unresolved keys: {list(states)}")
+                break
+
+            # --- 1. 确定各键的当前搜索层 (Layer)，同一层的键合并匹配 ---
+            layers: Dict[Tuple[str, ...], List[str]] = {}
+            layer_nodes: Dict[Tuple[str, ...], List[str]] = {}
+            for key, state in list(states.items()):
+                parent_id = state["parent_id"]
+                if parent_id is None:
+                    # 核心变更：利用 TreeManager.get_root_agents() 获取根层
+                    self.logger.debug(f"Searching Root Layer for: {key}")
+                    current_layer = self.tree_manager.get_root_agents()
                 else:
-                    # 情况 B: 中间节点 -> 向下钻取 (Drill Down)
-                    children = self.tree_manager.get_children(matched_node_id)
-                    if not children:
-                        break # 死胡同
-                    
-                    # 视角下沉：新的父节点是刚才匹配到的节点
-                    parent_id = matched_node_id
-                    # (current_focus_node 在向下钻取时其实不重要，因为下一轮直接取 parent 的 children)
+                    # 获取父节点的所有子节点（即当前层）
+                    current_layer = self.tree_manager.get_children(parent_id)
+
+                # --- 防死循环检查 ---
+                layer_sig = tuple(sorted(current_layer))
+                if layer_sig in state["visited_layers"]:
+                    self.logger.warning("Cycle detected in search layer. Stopping.")
+                    del states[key]
                     continue
+                state["visited_layers"].add(layer_sig)
+                layers.setdefault(layer_sig, []).append(key)
+                layer_nodes.setdefault(layer_sig, current_layer)
+
+            # --- 2. 在当前层进行语义匹配（不同层之间相互独立，可并发；交给线程池后可受截止时间约束） ---
+            matches: Dict[str, Optional[str]] = {}
+            if executor is not None and (len(layers) > 1 or deadline_at is not None):
+                layer_futures = {
+                    executor.submit(self._match_layer, queries, keys, layer_nodes[layer_sig]): keys
+                    for layer_sig, keys in layers.items()
+                }
+                remaining = max(deadline_at - time.monotonic(), 0.0) if deadline_at is not None else None
+                done, _ = wait(layer_futures, timeout=remaining)
+                for future, keys in layer_futures.items():
+                    if future in done:
+                        matches.update(future.result())
+                    else:
+                        # 超时的层不再等待，其中的键放弃搜索
+                        for key in keys:
+                            del states[key]
             else:
-                # >> 未命中分支 >>
-                # 情况 C: 当前层无匹配 -> 向上回溯 (Bubble Up)
-                if parent_id is None:
-                    # 已经在根层且未命中 -> 搜索全面失败
-                    self.logger.debug("Reached root layer with no match.")
-                    break
-                
-                # 移动视角向上：
-                # 我们要找 parent 的兄弟，所以将视角聚焦到 parent
-                current_focus_node = parent_id
-                # 获取 parent 的 parent
-                parent_id = self.tree_manager.get_parent(current_focus_node)
-                continue
-        
-        return None
+                for layer_sig, keys in layers.items():
+                    matches.update(self._match_layer(queries, keys, layer_nodes[layer_sig]))
+
+            # --- 3. 匹配结果处理 ---
+            for key, matched_node_id in matches.items():
+                state = states[key]
+                if matched_node_id:
+                    # >> 命中分支 >>
+                    # 使用 TreeManager 判断是否叶子
+                    is_leaf = self.tree_manager.is_leaf_agent(matched_node_id)
+                    self.logger.debug(f"Match found for '{key}': {matched_node_id} (Is Leaf: {is_leaf})")
+
+                    if is_leaf:
+                        # 情况 A: 找到叶子节点 -> 成功
+                        result[key] = self.tree_manager.get_agent_meta(matched_node_id)
+                        del states[key]
+                    elif not self.tree_manager.get_children(matched_node_id):
+                        # 死胡同
+                        del states[key]
+                    else:
+                        # 情况 B: 中间节点 -> 向下钻取 (Drill Down)
+                        state["parent_id"] = matched_node_id
+                else:
+                    # >> 未命中分支 >>
+                    # 情况 C: 当前层无匹配 -> 向上回溯 (Bubble Up)
+                    if state["parent_id"] is None:
+                        # 已经在根层且未命中 -> 搜索全面失败
+                        self.logger.debug(f"Reached root layer with no match for '{key}'.")
+                        del states[key]
+                    else:
+                        # 我们要找 parent 的兄弟，所以将视角聚焦到 parent，再取 parent 的 parent
+                        state["parent_id"] = self.tree_manager.get_parent(state["parent_id"])
+
+        return result
+
+    def _match_layer(self, queries: Dict[str, str], keys: List[str], node_ids: List[str]) -> Dict[str, Optional[str]]:
+        """
+        在一层节点中为若干键做语义匹配：单个键走单次匹配，多个键合并为一次批量匹配
+        """
+        if len(keys) == 1:
+            return {keys[0]: self._semantic_match_for_layer(queries[keys[0]], node_ids)}
+        return self._batch_semantic_match_for_layer({key: queries[key] for key in keys}, node_ids)
     
     
     def _resolve_kv_globally(self, query: str) -> Optional[Dict]:
         """
         全局兜底：在所有节点中进行关键词匹配，避免层级搜索无法定位时直接失败。
         """
+        return self._batch_resolve_kv_globally({query: query}).get(query)
+
+    def _batch_resolve_kv_globally(self, queries: Dict[str, str]) -> Dict[str, Optional[Dict]]:
+        """
+        批量全局兜底：所有键共享同一份数据节点候选，一次批量语义匹配
+
+        Args:
+            queries: 上下文变量名 -> 自然语言查询
+
+        Returns:
+            Dict[str, Optional[Dict]]: 上下文变量名 -> 节点元数据（未定位为 None）
+        """
+        result: Dict[str, Optional[Dict]] = {key: None for key in queries}
         try:
             node_service = getattr(self.tree_manager, "node_service", None)
             if not node_service:
-                return None
+                return result
             nodes = node_service.get_all_nodes()
             node_ids = []
             for node in nodes:
@@ -421,32 +709,98 @@ class TreeContextResolver(IContextResolverCapbility):
                 ):
                     node_ids.append(agent_id)
             if not node_ids:
-                return None
-            matched_node_id = self._semantic_match_for_layer(query, node_ids)
-            if not matched_node_id:
-                matched_node_id = self._fallback_keyword_match(query, node_ids)
-            if not matched_node_id:
-                return None
-            return self.tree_manager.get_agent_meta(matched_node_id)
+                return result
+            if len(queries) == 1:
+                matches = {key: self._semantic_match_for_layer(query, node_ids) for key, query in queries.items()}
+            else:
+                matches = self._batch_semantic_match_for_layer(queries, node_ids)
+            for key, query in queries.items():
+                matched_node_id = matches.get(key) or self._fallback_keyword_match(query, node_ids)
+                if matched_node_id:
+                    result[key] = self.tree_manager.get_agent_meta(matched_node_id)
+            return result
         except Exception as e:
             self.logger.warning(f"Global fallback failed: {e}")
+            return result
+
+    def _get_vector_index(self) -> Optional[AgentVectorIndex]:
+        """
+        获取与当前树结构快照版本一致的向量索引，版本变化时增量重建
+        """
+        if not self.prefilter_enabled or not self.llm_client or not self.tree_manager:
+            return None
+        if not hasattr(self.llm_client, "embedding"):
             return None
 
-    def _semantic_match_for_layer(self, query: str, node_ids: List[str]) -> Optional[str]:
+        try:
+            if self.vector_index is None:
+                self.vector_index = AgentVectorIndex(
+                    embed_fn=self.llm_client.embedding,
+                    embed_many_fn=getattr(self.llm_client, "embed_many", None)
+                )
+
+            version = getattr(self.tree_manager, "snapshot_version", None)
+            if version is None or version != self.vector_index.version:
+                if hasattr(self.tree_manager, "get_all_nodes"):
+                    nodes = self.tree_manager.get_all_nodes()
+                else:
+                    nodes = self.tree_manager.node_service.get_all_nodes()
+                self.vector_index.rebuild(nodes, version)
+            return self.vector_index
+        except Exception as e:
+            self.logger.warning(f"Vector index unavailable, skip prefilter: {e}")
+            return None
+
+    def _prefilter_candidates(self, query: str, node_ids: List[str]) -> Tuple[Optional[str], List[str]]:
         """
-        [重构后] 使用 DashScope Qwen 判断当前层中哪个节点匹配 query。
-        
+        基于向量相似度预筛选候选节点
+
         Args:
-            query: 自然语言查询，如 "需查找数据: 'user_id', 业务描述: '当前登录用户'"
-            node_ids: 当前层的节点ID列表 (List[str])
-        
+            query: 自然语言查询
+            node_ids: 当前层的候选节点ID列表
+
         Returns:
-            匹配的 node_id (str)，若无匹配返回 None
+            (直接命中的节点ID 或 None, 需要交给 LLM 判断的候选列表)
         """
-        if not node_ids:
-            return None
+        index = self._get_vector_index()
+        if index is None:
+            return None, node_ids
 
-        # 1. 准备候选节点数据
+        try:
+            ranked, unindexed = index.rank(query, node_ids)
+        except Exception as e:
+            self.logger.warning(f"Vector prefilter failed, sending full layer to LLM: {e}")
+            return None, node_ids
+        if not ranked:
+            return None, node_ids
+
+        top_id, top_score = ranked[0]
+        second_score = ranked[1][1] if len(ranked) > 1 else 0.0
+        if (
+            not unindexed
+            and top_score >= self.prefilter_min_score
+            and top_score - second_score >= self.prefilter_margin
+        ):
+            self.logger.info(
+                f"Vector prefilter matched '{top_id}' (score={top_score:.3f}, "
+                f"margin={top_score - second_score:.3f}), skip LLM for query: '{query}'"
+            )
+            return top_id, [top_id]
+
+        shortlist = [nid for nid, _ in ranked[:self.prefilter_top_k]] + unindexed
+        self.logger.debug(f"Vector prefilter shortlist {len(shortlist)}/{len(node_ids)}: {shortlist}")
+        return None, shortlist
+
+    def _build_candidates_block(self, node_ids: List[str]) -> Tuple[str, List[str]]:
+        """
+        构造语义匹配 Prompt 中的候选节点描述
+
+        Args:
+            node_ids: 候选节点ID列表
+
+        Returns:
+            (候选节点描述文本, 有元数据的合法节点ID列表)
+        """
         candidates_text = []
         valid_node_ids = [] # 用于后续校验 LLM 返回的 ID 是否合法
 
@@ -478,10 +832,31 @@ class TreeContextResolver(IContextResolverCapbility):
             candidates_text.append(node_desc)
             valid_node_ids.append(nid)
 
-        if not candidates_text:
+        return "\n\n".join(candidates_text), valid_node_ids
+
+    def _semantic_match_for_layer(self, query: str, node_ids: List[str]) -> Optional[str]:
+        """
+        [重构后] 使用 DashScope Qwen 判断当前层中哪个节点匹配 query。
+        
+        Args:
+            query: 自然语言查询，如 "需查找数据: 'user_id', 业务描述: '当前登录用户'"
+            node_ids: 当前层的节点ID列表 (List[str])
+        
+        Returns:
+            匹配的 node_id (str)，若无匹配返回 None
+        """
+        if not node_ids:
             return None
 
-        candidates_block = "\n\n".join(candidates_text)
+        # 0. 向量预筛选：高置信度直接命中，否则只把 top-k 候选交给 LLM
+        matched_node_id, node_ids = self._prefilter_candidates(query, node_ids)
+        if matched_node_id:
+            return matched_node_id
+
+        # 1. 准备候选节点数据
+        candidates_block, valid_node_ids = self._build_candidates_block(node_ids)
+        if not valid_node_ids:
+            return None
 
         # 2. 构造 Prompt
         prompt = f"""你是一个分布式系统的数据路由语义匹配引擎。请根据以下数据需求，从候选节点列表中选择**最匹配的一个**。
@@ -533,6 +908,105 @@ class TreeContextResolver(IContextResolverCapbility):
             # 降级策略
             return self._fallback_keyword_match(query, valid_node_ids)
 
+    def _batch_semantic_match_for_layer(
+        self,
+        queries: Dict[str, str],
+        node_ids: List[str]
+    ) -> Dict[str, Optional[str]]:
+        """
+        在同一层上一次性匹配多个数据需求：所有需求共享同一份候选节点列表，
+        由 LLM 返回 键 -> 节点ID 的映射。某个键的结果缺失或不合法时，仅对该键
+        回退到 _semantic_match_for_layer 单独匹配。
+
+        Args:
+            queries: 上下文变量名 -> 自然语言查询
+            node_ids: 当前层的节点ID列表
+
+        Returns:
+            Dict[str, Optional[str]]: 上下文变量名 -> 匹配的 node_id（无匹配为 None）
+        """
+        result: Dict[str, Optional[str]] = {}
+        if not node_ids:
+            return {key: None for key in queries}
+
+        # 0. 向量预筛选：高置信度的键直接命中，其余键的候选取并集
+        pending: Dict[str, str] = {}
+        shortlist: List[str] = []
+        for key, query in queries.items():
+            matched_node_id, candidates = self._prefilter_candidates(query, node_ids)
+            if matched_node_id:
+                result[key] = matched_node_id
+                continue
+            pending[key] = query
+            for nid in candidates:
+                if nid not in shortlist:
+                    shortlist.append(nid)
+
+        if len(pending) <= 1 or not self.llm_client:
+            for key, query in pending.items():
+                result[key] = self._semantic_match_for_layer(query, node_ids)
+            return result
+
+        # 1. 准备候选节点数据
+        candidates_block, valid_node_ids = self._build_candidates_block(shortlist)
+        if not valid_node_ids:
+            result.update({key: None for key in pending})
+            return result
+
+        requirements_block = "\n".join(
+            f"- {key}: {query}" for key, query in pending.items()
+        )
+
+        # 2. 构造 Prompt
+        prompt = f"""你是一个分布式系统的数据路由语义匹配引擎。请为以下每一条数据需求，分别从候选节点列表中选择**最匹配的一个**。
+
+数据需求（变量名: 需求描述）:
+{requirements_block}
+
+候选节点列表:
+---
+{candidates_block}
+---
+
+请严格按照以下规则回答：
+1. 对每条需求，分析哪个节点的"数据范围"或"节点描述"能覆盖该需求。
+2. 如果有匹配项，值为对应的 **节点ID** (例如: user_agent_01)。
+3. 如果没有一个候选能合理满足该需求，或者相关性极低，值为 "none"。
+4. 严格输出 JSON，键为上述变量名，例如: {{"变量名1": "user_agent_01", "变量名2": "none"}}
+5. 只输出 JSON，不要任何解释。
+"""
+
+        # 3. 调用 LLM
+        try:
+            response = self.llm_client.generate(prompt=prompt, parse_json=True)
+        except Exception as e:
+            self.logger.error(f"Batch semantic match failed: {e}", exc_info=True)
+            response = None
+        if not isinstance(response, dict):
+            response = {}
+
+        self.logger.info(f"Qwen batch semantic match result: {response} for keys: {list(pending)}")
+
+        # 4. 逐键校验，缺失或不合法的键单独回退
+        for key, query in pending.items():
+            answer = response.get(key)
+            if isinstance(answer, str):
+                answer = answer.strip().replace("'", "").replace('"', "").replace("`", "")
+                if answer.lower() == "none":
+                    result[key] = None
+                    continue
+                if answer in valid_node_ids:
+                    result[key] = answer
+                    continue
+            elif key in response and answer is None:
+                result[key] = None
+                continue
+
+            self.logger.warning(f"Batch match has no valid answer for '{key}': {answer!r}, matching it alone")
+            result[key] = self._semantic_match_for_layer(query, node_ids)
+
+        return result
+
     def _fallback_keyword_match(self, query: str, node_ids: List[str]) -> Optional[str]:
         """
         简单的关键词匹配兜底策略
@@ -1,6 +1,7 @@
 """连接器管理器抽象基类定义"""
 from abc import ABC, abstractmethod
 from typing import Dict, Any
+from concurrent.futures import Future
 from ..capability_base import CapabilityBase
 
 
@@ -62,3 +63,25 @@ class BaseExecution(CapabilityBase):
             鉴权是否成功
         """
         pass
+
+    def submit(self, connector_name: str, inputs: Dict[str, Any] = None, params: Dict[str, Any] = None) -> Future:
+        """
+        提交连接器操作，返回 Future
+
+        默认实现在调用线程内同步执行，返回已完成的 Future；
+        支持工作线程池的实现可覆盖此方法实现非阻塞执行。
+
+        Args:
+            connector_name: 连接器名称
+            inputs: 输入参数
+            params: 配置参数
+
+        Returns:
+            Future: 结果同 execute
+        """
+        future: Future = Future()
+        try:
+            future.set_result(self.execute(connector_name, inputs, params))
+        except Exception as e:
+            future.set_exception(e)
+        return future
@@ -1,8 +1,10 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import requests
 import json
-from external.clients import DifyClient
+import threading
+from external.clients import DifyClient, HttpClient
 from .base_connector import BaseConnector
+from .schema_cache import SchemaCache, SchemaFetchResult
 
 import logging
 logger = logging.getLogger(__name__)
@@ -12,13 +14,27 @@ class DifyConnector(BaseConnector):
     Dify连接器实现
     """
     
-    def __init__(self, base_url: str = None, api_key: str = None, **kwargs):
+    def __init__(
+        self,
+        base_url: str = None,
+        api_key: str = None,
+        http_client: Optional[HttpClient] = None,
+        timeout: float = 120,
+        schema_timeout: float = 30,
+        schema_cache: Optional[SchemaCache] = None,
+        **kwargs
+    ):
         """
         初始化连接器，存储静态配置
         
         Args:
             base_url: Dify 的 API 地址 (通常来自 config.json)
             api_key: 默认 API Key (可选，通常为空，等待运行时传入)
+            http_client: 共享的连接池客户端（通常由 UniversalExecution 持有），
+                为空时在首次请求时创建自有客户端
+            timeout: 工作流执行请求的超时（秒）
+            schema_timeout: Schema 查询请求的超时（秒）
+            schema_cache: 共享的 Schema 缓存，为空时使用连接器自有缓存
         """
         super().__init__()
         self.static_config = {
@@ -26,6 +42,22 @@ class DifyConnector(BaseConnector):
             "api_key": api_key,
             **kwargs
         }
+        self.timeout = timeout
+        self.schema_timeout = schema_timeout
+        self._http_client = http_client
+        self._client_lock = threading.Lock()
+        self.schema_cache = schema_cache or SchemaCache()
+
+    @property
+    def http_client(self) -> HttpClient:
+        """
+        获取复用的 HTTP 客户端，保持 keep-alive 连接跨调用复用
+        """
+        if self._http_client is None:
+            with self._client_lock:
+                if self._http_client is None:
+                    self._http_client = HttpClient()
+        return self._http_client
 
 
     def _resolve_param(self, key: str, runtime_params: Dict[str, Any]) -> Any:
@@ -184,6 +216,9 @@ class DifyConnector(BaseConnector):
     def _get_required_inputs(self, params: Dict[str, Any]=None) -> Dict[str, Any]:
         """
         获取 Dify Schema
+
+        Schema 只在工作流被编辑时才会变化，按 (base_url, api_key 摘要) 缓存，
+        见 SchemaCache。
         """
         if params is None:
             params = {}
@@ -192,50 +227,92 @@ class DifyConnector(BaseConnector):
         base_url = self._resolve_param("base_url", params)
         if not all([api_key, base_url]):
             raise Exception("Missing required parameters for Dify schema fetch")
-        
+
+        base_url = base_url.rstrip('/')
         try:
-            # 调用Dify API获取Schema（这里简化处理，实际应该根据具体情况调整）
-            # 注意：这里不再使用workflow_id参数
-            url = f"{base_url}/parameters"
-            headers = {
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            response = requests.get(url, headers=headers, timeout=30)
+            required_inputs = self.schema_cache.get(
+                SchemaCache.make_key(base_url, api_key),
+                lambda etag, last_modified: self._fetch_required_inputs(base_url, api_key, etag, last_modified)
+            )
+        except Exception as e:
+            raise Exception(f"Failed to fetch Dify schema: {str(e)}")
+        # 返回副本，避免调用方修改缓存内容
+        return {name: dict(meta) for name, meta in required_inputs.items()}
+
+    def _fetch_required_inputs(
+        self,
+        base_url: str,
+        api_key: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ) -> SchemaFetchResult:
+        """
+        从 Dify 拉取 Schema，带上校验器时发送条件请求
+
+        Args:
+            base_url: Dify API 地址
+            api_key: API Key
+            etag: 上次响应的 ETag
+            last_modified: 上次响应的 Last-Modified
+
+        Returns:
+            SchemaFetchResult: 拉取结果
+        """
+        # 调用Dify API获取Schema（这里简化处理，实际应该根据具体情况调整）
+        # 注意：这里不再使用workflow_id参数
+        url = f"{base_url}/parameters"
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        try:
+            response = self.http_client.get(url, headers=headers, timeout=self.schema_timeout)
+            if response.status_code == 304:
+                return SchemaFetchResult(
+                    "not_modified",
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified")
+                )
             response.raise_for_status()
-            
-            schema = response.json()
-
-            # === 新增：处理返回值，提取 user_input_form 字段 ===
-            user_input_form = schema.get("user_input_form", [])
-            required_inputs = {}
-
-            for item in user_input_form:
-                # 每个 item 是一个 dict，如 {'text-input': {...}} 或 {'paragraph': {...}}
-                field_type, field_meta = next(iter(item.items()))  # 取第一个也是唯一的键值对
-                variable = field_meta.get("variable")
-                if variable:
-                    required_inputs[variable] = {
-                        "label": field_meta.get("label"),
-                        "type": field_type,
-                        "required": field_meta.get("required", False),
-                        "max_length": field_meta.get("max_length"),
-                        "options": field_meta.get("options", []),
-                        "default": field_meta.get("default", ""),
-                        "placeholder": field_meta.get("placeholder", ""),
-                        "hint": field_meta.get("hint", "")
-                    }
-            logger.info(f"Dify schema: {schema}")
-            return required_inputs
         except requests.exceptions.HTTPError as e:
             if getattr(e.response, "status_code", None) == 404:
                 logger.warning("Dify schema endpoint not found; skipping schema fetch.")
-                return {}
-            raise Exception(f"Failed to fetch Dify schema: {str(e)}")
+                return SchemaFetchResult("not_found")
+            raise
 
-        except Exception as e:
-            raise Exception(f"Failed to fetch Dify schema: {str(e)}")
+        schema = response.json()
+
+        # === 新增：处理返回值，提取 user_input_form 字段 ===
+        user_input_form = schema.get("user_input_form", [])
+        required_inputs = {}
+
+        for item in user_input_form:
+            # 每个 item 是一个 dict，如 {'text-input': {...}} 或 {'paragraph': {...}}
+            field_type, field_meta = next(iter(item.items()))  # 取第一个也是唯一的键值对
+            variable = field_meta.get("variable")
+            if variable:
+                required_inputs[variable] = {
+                    "label": field_meta.get("label"),
+                    "type": field_type,
+                    "required": field_meta.get("required", False),
+                    "max_length": field_meta.get("max_length"),
+                    "options": field_meta.get("options", []),
+                    "default": field_meta.get("default", ""),
+                    "placeholder": field_meta.get("placeholder", ""),
+                    "hint": field_meta.get("hint", "")
+                }
+        logger.info(f"Dify schema: {schema}")
+        return SchemaFetchResult(
+            "ok",
+            schema=required_inputs,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified")
+        )
     
     def execute(self, inputs: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -363,7 +440,10 @@ class DifyConnector(BaseConnector):
             }
 
             try:
-                response = requests.post(url, json=payload, headers=headers, timeout=120)
+                # 工作流运行不是幂等的，不能交给连接池自动重试（读超时重试会让工作流重复执行）
+                response = self.http_client.post(
+                    url, json=payload, headers=headers, timeout=self.timeout, retry=False
+                )
                 logger.info(f"Dify response: {response.json()}")
                 content_type = response.headers.get("Content-Type", "")
                 logger.info(
@@ -427,5 +507,5 @@ class DifyConnector(BaseConnector):
         if not api_key:
             return False
         
-        client = DifyClient(api_key, base_url)
+        client = DifyClient(api_key, base_url, http_client=self.http_client)
         return client.health_check()
@@ -1,6 +1,7 @@
 from typing import Dict, Any, List, Optional, Tuple
 import json
 import logging
+import threading
 from external.clients import HttpClient
 from .base_connector import BaseConnector
 
@@ -17,8 +18,30 @@ class HttpConnector(BaseConnector):
     4. resolve_context() - text_to_sql 查询
     """
 
-    def __init__(self):
+    def __init__(self, http_client: Optional[HttpClient] = None, timeout: float = 30):
+        """
+        初始化连接器
+
+        Args:
+            http_client: 共享的连接池客户端（通常由 UniversalExecution 持有），
+                为空时在首次请求时创建自有客户端
+            timeout: 默认请求超时（秒），可被运行时参数 timeout 覆盖
+        """
         super().__init__()
+        self.timeout = timeout
+        self._http_client = http_client
+        self._client_lock = threading.Lock()
+
+    @property
+    def http_client(self) -> HttpClient:
+        """
+        获取复用的 HTTP 客户端，保持 keep-alive 连接跨调用复用
+        """
+        if self._http_client is None:
+            with self._client_lock:
+                if self._http_client is None:
+                    self._http_client = HttpClient()
+        return self._http_client
     
     ##TODO：获取url
     def _check_missing_config_params(self, params: Dict[str, Any]) -> List[str]:
@@ -169,7 +192,7 @@ class HttpConnector(BaseConnector):
         url = params["url"]
         method = params.get("method", "GET").upper()
         headers = params.get("headers", {})
-        timeout = params.get("timeout", 30)
+        timeout = params.get("timeout", self.timeout)
         args_schema = params.get("args_schema", [])
 
         # 提取上下文（关键！）
@@ -246,8 +269,8 @@ class HttpConnector(BaseConnector):
 
         logger.info(f"HTTP {method} {url}, query={query_params}, body={body_data}")
 
-        # 9. 创建 HTTP 客户端并执行请求
-        http_client = HttpClient()
+        # 9. 使用复用的 HTTP 客户端执行请求
+        http_client = self.http_client
 
         try:
             if method == "GET":
@@ -301,8 +324,6 @@ class HttpConnector(BaseConnector):
                 "status": "FAILURE",
                 "error": f"HTTP request failed: {str(e)}"
             }
-        finally:
-            http_client.close()
 
     def health_check(self, params: Dict[str, Any]) -> bool:
         """执行HTTP健康检查"""
@@ -310,9 +331,9 @@ class HttpConnector(BaseConnector):
         if not url:
             return False
 
-        client = HttpClient()
         try:
-            response = client.get(url)
+            response = self.http_client.get(url, timeout=params.get("timeout", self.timeout))
             return response.status_code in [200, 201, 202, 204]
-        finally:
-            client.close()
+        except Exception as e:
+            logger.warning(f"HTTP health check failed: {e}")
+            return False
@@ -0,0 +1,218 @@
+"""连接器参数 Schema 缓存"""
+from typing import Dict, Any, Optional, Callable, Hashable, NamedTuple
+import hashlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaFetchResult(NamedTuple):
+    """
+    一次 Schema 拉取的结果
+
+    status 取值：
+    - "ok": 拉取到新的 Schema
+    - "not_modified": 服务端确认缓存仍然有效（HTTP 304）
+    - "not_found": Schema 接口不存在（HTTP 404），按空 Schema 处理
+    """
+    status: str
+    schema: Optional[Dict[str, Any]] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class _SchemaEntry:
+    """缓存条目"""
+
+    __slots__ = ("schema", "etag", "last_modified", "fetched_at", "negative")
+
+    def __init__(self, schema: Dict[str, Any], etag: Optional[str], last_modified: Optional[str], negative: bool):
+        self.schema = schema
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.monotonic()
+        self.negative = negative
+
+
+class SchemaCache:
+    """
+    连接器参数 Schema 缓存
+    - 新鲜期（ttl）内直接返回缓存
+    - 过期但仍在 stale_ttl 内：立即返回旧 Schema，并在后台线程重新验证
+    - 超过 stale_ttl 或无缓存：同步拉取（同一个键只有一个线程拉取）
+    - 重新验证时携带 ETag / Last-Modified 做条件请求，304 只刷新时间戳
+    - 404 作为空 Schema 负缓存 negative_ttl 秒
+    """
+
+    def __init__(self, ttl: float = 300.0, stale_ttl: float = 3600.0, negative_ttl: float = 60.0):
+        """
+        初始化 Schema 缓存
+
+        Args:
+            ttl: 新鲜期（秒）
+            stale_ttl: 最长可用期（秒），超过后必须同步拉取
+            negative_ttl: 404 结果的缓存时间（秒）
+        """
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.negative_ttl = negative_ttl
+
+        self._entries: Dict[Hashable, _SchemaEntry] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._refreshing = set()
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "not_modified": 0,
+            "refresh_errors": 0,
+        }
+
+    @staticmethod
+    def make_key(base_url: str, api_key: str) -> tuple:
+        """
+        构造缓存键，API Key 只保存摘要
+
+        Args:
+            base_url: 服务地址
+            api_key: API Key
+
+        Returns:
+            tuple: (base_url, api_key 摘要)
+        """
+        digest = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+        return (base_url.rstrip("/"), digest)
+
+    def _incr(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _key_lock(self, key: Hashable) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def get(
+        self,
+        key: Hashable,
+        fetch: Callable[[Optional[str], Optional[str]], SchemaFetchResult]
+    ) -> Dict[str, Any]:
+        """
+        获取 Schema，必要时调用 fetch 拉取
+
+        Args:
+            key: 缓存键，见 make_key
+            fetch: 拉取函数，参数为 (etag, last_modified)，返回 SchemaFetchResult
+
+        Returns:
+            Dict[str, Any]: Schema
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if entry.negative:
+                if age < self.negative_ttl:
+                    self._incr("hits")
+                    return entry.schema
+            elif age < self.ttl:
+                self._incr("hits")
+                return entry.schema
+            elif age < self.stale_ttl:
+                self._incr("stale_hits")
+                self._refresh_in_background(key, fetch)
+                return entry.schema
+
+        self._incr("misses")
+        with self._key_lock(key):
+            # 等锁期间其他线程可能已经完成拉取
+            current = self._entries.get(key)
+            if current is not None and current is not entry:
+                return current.schema
+            try:
+                return self._fetch(key, fetch, entry).schema
+            except Exception:
+                if entry is not None and not entry.negative:
+                    logger.warning(f"Schema fetch failed for {key[0] if isinstance(key, tuple) else key}, serving stale copy")
+                    return entry.schema
+                raise
+
+    def _fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[Optional[str], Optional[str]], SchemaFetchResult],
+        entry: Optional[_SchemaEntry]
+    ) -> _SchemaEntry:
+        """
+        拉取并写入缓存；已有正常缓存时发送条件请求
+        """
+        validators = (entry.etag, entry.last_modified) if entry is not None and not entry.negative else (None, None)
+        result = fetch(*validators)
+
+        if result.status == "not_modified" and entry is not None and not entry.negative:
+            self._incr("not_modified")
+            new_entry = _SchemaEntry(entry.schema, result.etag or entry.etag,
+                                     result.last_modified or entry.last_modified, negative=False)
+        elif result.status == "not_found":
+            new_entry = _SchemaEntry({}, None, None, negative=True)
+        else:
+            new_entry = _SchemaEntry(result.schema or {}, result.etag, result.last_modified, negative=False)
+
+        with self._lock:
+            self._entries[key] = new_entry
+        return new_entry
+
+    def _refresh_in_background(
+        self,
+        key: Hashable,
+        fetch: Callable[[Optional[str], Optional[str]], SchemaFetchResult]
+    ) -> None:
+        """
+        在后台线程重新验证过期缓存，同一个键同时只有一个刷新任务
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                with self._key_lock(key):
+                    self._fetch(key, fetch, self._entries.get(key))
+            except Exception as e:
+                self._incr("refresh_errors")
+                logger.warning(f"Background schema refresh failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """
+        使缓存失效
+
+        Args:
+            key: 缓存键，为空时清空全部缓存
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            Dict[str, Any]: 命中、过期命中、未命中、304 次数等
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        return stats
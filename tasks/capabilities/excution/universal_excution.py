@@ -1,7 +1,15 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from concurrent.futures import Future
+import logging
+import threading
+from external.clients import HttpClient
 from .base_excution import BaseExecution
 from .connect.dify_connector import DifyConnector
 from .connect.http_connector import HttpConnector
+from .connect.schema_cache import SchemaCache
+from .worker_pool import ExecutionWorkerPool
+
+logger = logging.getLogger(__name__)
 
 
 class UniversalExecution(BaseExecution):
@@ -9,43 +17,139 @@ class UniversalExecution(BaseExecution):
     通用连接器管理器，负责管理和执行各种外部连接器操作
     从 UniversalConnectorOrchestrator 迁移而来，去掉了 Thespian 依赖
     现在直接使用 external/clients 下的客户端
+
+    持有一个共享的 HttpClient（按主机划分的 keep-alive 连接池），
+    所有连接器复用同一个连接池，跨 ExecutionActor 消息保持连接。
     """
     
     def __init__(self):
         """初始化连接器管理器"""
+        self._http_client = HttpClient()
         # 连接器实例缓存
-        self._connector_cache = {
-            "dify": DifyConnector(),
-            "dify_workflow": DifyConnector(),
-            "http": HttpConnector(),
-        }
+        self._connector_cache = self._build_connectors({})
+        # 非阻塞执行的工作线程池，配置 worker_pool.enabled 后启用
+        self._worker_pool: Optional[ExecutionWorkerPool] = None
+        # 调用方轮询已完成结果的间隔（秒）
+        self.result_poll_interval = 0.05
     
+    def _build_connectors(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        基于共享连接池创建连接器实例
+
+        Args:
+            config: 连接器配置，结构同 initialize
+
+        Returns:
+            Dict[str, Any]: 连接器名称 -> 连接器实例
+        """
+        dify_config = config.get("dify", {})
+        http_config = config.get("http", {})
+        schema_cache_config = dify_config.get("schema_cache", {})
+
+        # 实例化时只传 base_url (静态), api_key 留空
+        # 如果 config 里真的配了 api_key (比如测试环境)，也传进去作为默认值
+        dify_kwargs = {
+            "base_url": dify_config.get("base_url"),
+            "api_key": dify_config.get("api_key"),
+            "http_client": self._http_client,
+            "timeout": dify_config.get("timeout", 120),
+            "schema_timeout": dify_config.get("schema_timeout", 30),
+            # dify 与 dify_workflow 共享同一份 Schema 缓存
+            "schema_cache": SchemaCache(
+                ttl=schema_cache_config.get("ttl", 300),
+                stale_ttl=schema_cache_config.get("stale_ttl", 3600),
+                negative_ttl=schema_cache_config.get("negative_ttl", 60),
+            ),
+        }
+        return {
+            "dify": DifyConnector(**dify_kwargs),
+            "dify_workflow": DifyConnector(**dify_kwargs),
+            "http": HttpConnector(
+                http_client=self._http_client,
+                timeout=http_config.get("timeout", 30)
+            ),
+        }
+
     def initialize(self, config: Dict[str, Any]) -> None:
         """
         config 示例: 
         {
-            "dify": { "base_url": "http://my-dify-host.com" }, 
-            "http": { "timeout": 30 }
+            "dify": {
+                "base_url": "http://my-dify-host.com",
+                "timeout": 120,
+                "schema_cache": { "ttl": 300, "stale_ttl": 3600, "negative_ttl": 60 }
+            },
+            "http": { "timeout": 30 },
+            "http_pool": {
+                "pool_connections": 10,   # 缓存的主机连接池数量
+                "pool_maxsize": 20,       # 每个主机保持的最大连接数
+                "retries": 3,
+                "backoff_factor": 0.5
+            },
+            "worker_pool": {
+                "enabled": true,          # 启用后 submit() 在工作线程中执行连接器调用
+                "max_workers": 16,
+                "connector_limits": { "dify": 4, "http": 16 },
+                "poll_interval": 0.05     # ExecutionActor 收取已完成结果的间隔（秒）
+            }
         }
         """
-        dify_config = config.get("dify", {})
-        
-        self._connector_cache = {
-            # 实例化时只传 base_url (静态), api_key 留空
-            "dify": DifyConnector(
-                base_url=dify_config.get("base_url"),
-                # 如果 config 里真的配了 api_key (比如测试环境)，也传进去作为默认值
-                api_key=dify_config.get("api_key") 
-            ),
-            # ...
-        }
+        pool_config = config.get("http_pool", {})
+        http_config = config.get("http", {})
+
+        old_client = self._http_client
+        self._http_client = HttpClient(
+            retry_count=pool_config.get("retries", http_config.get("retries", 3)),
+            backoff_factor=pool_config.get("backoff_factor", 0.5),
+            pool_connections=pool_config.get("pool_connections", 10),
+            pool_maxsize=pool_config.get("pool_maxsize", 10),
+        )
+        self._connector_cache = self._build_connectors(config)
+
+        worker_config = config.get("worker_pool", {})
+        self.result_poll_interval = worker_config.get("poll_interval", self.result_poll_interval)
+        old_pool = self._worker_pool
+        self._worker_pool = None
+        if worker_config.get("enabled", False):
+            self._worker_pool = ExecutionWorkerPool(
+                max_workers=worker_config.get("max_workers", 16),
+                connector_limits=worker_config.get("connector_limits", {})
+            )
+        self._retire(old_pool, old_client)
+
+    @staticmethod
+    def _retire(old_pool: Optional[ExecutionWorkerPool], old_client: HttpClient) -> None:
+        """
+        释放重新初始化前的线程池与 HttpClient
+        在途调用持有的旧连接器仍在使用旧连接池，必须等旧线程池排空后再关闭；在后台线程中等待，不阻塞 initialize
+        """
+        def close_client():
+            try:
+                old_client.close()
+            except Exception as e:
+                logger.warning(f"Failed to close previous HTTP client: {e}")
+
+        if old_pool is None:
+            close_client()
+            return
+
+        def drain():
+            old_pool.shutdown(wait=True)
+            close_client()
+
+        threading.Thread(target=drain, name="execution-pool-drain", daemon=True).start()
     
     def shutdown(self) -> None:
         """
-        关闭连接器管理器
+        关闭连接器管理器，释放工作线程池与共享连接池
         """
-        # 可以在这里添加关闭逻辑，例如释放资源
-        pass
+        if self._worker_pool is not None:
+            self._worker_pool.shutdown(wait=False)
+            self._worker_pool = None
+        try:
+            self._http_client.close()
+        except Exception as e:
+            logger.warning(f"Failed to close shared HTTP client: {e}")
     
     def get_capability_type(self) -> str:
         """
@@ -105,6 +209,40 @@ class UniversalExecution(BaseExecution):
         except Exception as e:
             raise Exception(f"Connector execution failed: {str(e)}")
     
+    def submit(self, connector_name: str, inputs: Dict[str, Any] = None, params: Dict[str, Any] = None) -> Future:
+        """
+        提交连接器操作；启用工作线程池时立即返回，调用在工作线程中执行
+
+        同一连接器的并发数受 worker_pool.connector_limits 限制，超出的调用排队等待。
+
+        Args:
+            connector_name: 连接器名称
+            inputs: 输入参数
+            params: 配置参数
+
+        Returns:
+            Future: 结果同 execute
+        """
+        pool = self._worker_pool
+        if pool is None:
+            return super().submit(connector_name, inputs, params)
+        limit_key = connector_name.lower()
+        if limit_key.startswith("http_"):
+            limit_key = "http"
+        return pool.submit(limit_key, self.execute, connector_name, inputs, params)
+
+    def get_worker_pool_stats(self) -> Dict[str, Any]:
+        """
+        获取工作线程池指标（排队深度、各连接器在途数等）
+
+        Returns:
+            Dict[str, Any]: 统计信息，未启用线程池时返回 {"enabled": False}
+        """
+        pool = self._worker_pool
+        if pool is None:
+            return {"enabled": False}
+        return {"enabled": True, **pool.get_stats()}
+
     def health_check(self, connector_name: str, params: Dict[str, Any]) -> bool:
         """
         执行健康检查
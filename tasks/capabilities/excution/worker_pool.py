@@ -0,0 +1,143 @@
+"""连接器调用工作线程池"""
+from typing import Dict, Any, Callable, Optional, Deque, Tuple
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutionWorkerPool:
+    """
+    连接器调用工作线程池
+    - 全局线程数上限 max_workers
+    - 每个连接器单独的并发上限，超出的调用在该连接器的等待队列中排队，
+      不占用工作线程，避免一个慢连接器占满线程池
+    - 提供排队深度与在途数量指标
+    """
+
+    def __init__(self, max_workers: int = 16, connector_limits: Optional[Dict[str, int]] = None):
+        """
+        初始化线程池
+
+        Args:
+            max_workers: 工作线程数上限
+            connector_limits: 连接器名称 -> 并发上限，未配置的连接器只受 max_workers 限制
+        """
+        self.max_workers = max_workers
+        self.connector_limits = dict(connector_limits or {})
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="execution-worker")
+        self._lock = threading.Lock()
+        self._running: Dict[str, int] = {}
+        self._waiting: Dict[str, Deque[Tuple[Future, Callable[[], Any]]]] = {}
+        self._submitted = 0
+        self._completed = 0
+
+    def submit(self, connector: str, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        提交一次连接器调用
+
+        Args:
+            connector: 连接器名称，用于并发限制与统计
+            fn: 实际执行的函数
+            *args, **kwargs: 函数参数
+
+        Returns:
+            Future: 调用结果
+        """
+        future: Future = Future()
+        call = lambda: fn(*args, **kwargs)
+        with self._lock:
+            self._submitted += 1
+            limit = self.connector_limits.get(connector)
+            if limit is not None and self._running.get(connector, 0) >= limit:
+                self._waiting.setdefault(connector, deque()).append((future, call))
+                return future
+            self._running[connector] = self._running.get(connector, 0) + 1
+        self._dispatch(connector, future, call)
+        return future
+
+    def _dispatch(self, connector: str, future: Future, call: Callable[[], Any]) -> None:
+        """
+        把调用交给工作线程；结束后释放该连接器的并发名额并调度下一个等待的调用
+        """
+        def run():
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(call())
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                self._release(connector)
+
+        try:
+            self._executor.submit(run)
+        except RuntimeError as e:
+            # 线程池已关闭
+            future.set_exception(e)
+            self._release(connector)
+
+    def _release(self, connector: str) -> None:
+        next_call = None
+        with self._lock:
+            self._completed += 1
+            queue = self._waiting.get(connector)
+            if queue:
+                next_call = queue.popleft()
+            else:
+                self._running[connector] = max(self._running.get(connector, 1) - 1, 0)
+        if next_call is not None:
+            self._dispatch(connector, *next_call)
+
+    def get_queue_depth(self, connector: Optional[str] = None) -> int:
+        """
+        获取排队等待的调用数（含等待连接器名额与等待工作线程的调用）
+
+        Args:
+            connector: 连接器名称，为空时统计全部
+
+        Returns:
+            int: 排队深度
+        """
+        with self._lock:
+            if connector is not None:
+                return len(self._waiting.get(connector, ()))
+            waiting = sum(len(queue) for queue in self._waiting.values())
+            running = sum(self._running.values())
+        # 已分配名额但还没拿到工作线程的调用
+        return waiting + max(running - self.max_workers, 0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取线程池统计信息
+
+        Returns:
+            Dict[str, Any]: 在途数、排队数、累计提交/完成数
+        """
+        with self._lock:
+            stats = {
+                "max_workers": self.max_workers,
+                "in_flight": dict(self._running),
+                "waiting": {name: len(queue) for name, queue in self._waiting.items() if queue},
+                "submitted": self._submitted,
+                "completed": self._completed,
+            }
+        stats["queue_depth"] = self.get_queue_depth()
+        return stats
+
+    def shutdown(self, wait: bool = False) -> None:
+        """
+        关闭线程池，尚在排队的调用以异常结束
+
+        Args:
+            wait: 是否等待在途调用结束
+        """
+        with self._lock:
+            pending = [item for queue in self._waiting.values() for item in queue]
+            self._waiting.clear()
+        for future, _ in pending:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("Execution worker pool is shut down"))
+        self._executor.shutdown(wait=wait)
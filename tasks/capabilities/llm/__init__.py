@@ -1,5 +1,7 @@
 """LLM适配模块"""
 
 from .qwen_llm import QwenLLM
+from .response_cache import LLMResponseCache
+from .embedding_cache import EmbeddingCache
 
-__all__ = ['QwenLLM']
+__all__ = ['QwenLLM', 'LLMResponseCache', 'EmbeddingCache']
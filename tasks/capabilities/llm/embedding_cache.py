@@ -0,0 +1,90 @@
+"""向量持久化缓存（按文本摘要寻址）"""
+from typing import Dict, List, Iterable
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    基于 SQLite 的向量缓存
+    - 键为 SHA-256(模型名 + 文本)，相同文本在同一模型下只计算一次
+    - 向量以 JSON 存储，进程重启后仍可复用
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化缓存
+
+        Args:
+            path: SQLite 文件路径
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        批量读取
+
+        Args:
+            model: 模型名称
+            texts: 文本列表
+
+        Returns:
+            Dict[str, List[float]]: 命中的 文本 -> 向量
+        """
+        keys = {self.make_key(model, text): text for text in texts}
+        if not keys:
+            return {}
+        found = {}
+        key_list = list(keys)
+        with self._lock:
+            # SQLite 默认最多 999 个参数
+            for i in range(0, len(key_list), 500):
+                chunk = key_list[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, vector in rows:
+                    found[keys[key]] = json.loads(vector)
+        return found
+
+    def set_many(self, model: str, vectors: Dict[str, List[float]]) -> None:
+        """
+        批量写入
+
+        Args:
+            model: 模型名称
+            vectors: 文本 -> 向量
+        """
+        if not vectors:
+            return
+        rows = [(self.make_key(model, text), json.dumps(vector)) for text, vector in vectors.items()]
+        try:
+            with self._lock:
+                self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to persist embeddings: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
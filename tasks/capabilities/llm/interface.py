@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import List, Union, Dict
+from typing import List, Union, Dict, Any
 from ..capability_base import CapabilityBase
 
 
@@ -7,8 +7,8 @@ class ILLMCapability(CapabilityBase):
     """LLM 能力的标准接口"""
     
     @abstractmethod
-    def generate(self, prompt: str, images: List[str] = None) -> str:
-        """统一生成接口，支持纯文本或多模态"""
+    def generate(self, prompt: str, images: List[str] = None, bypass_cache: bool = False, **kwargs) -> str:
+        """统一生成接口，支持纯文本或多模态；bypass_cache=True 时跳过响应缓存"""
         pass
 
     @abstractmethod
@@ -21,5 +21,9 @@ class ILLMCapability(CapabilityBase):
         """生成向量"""
         pass
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """响应缓存统计信息，未实现缓存的适配器返回 {"enabled": False}"""
+        return {"enabled": False}
+
     def get_capability_type(self) -> str:
         return "llm"
\ No newline at end of file
@@ -1,7 +1,13 @@
 """Qwen LLM适配器（基于 DashScope SDK）"""
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Union, Callable
+from concurrent.futures import ThreadPoolExecutor
 import json
+import random
+import time
 from .interface import ILLMCapability
+from .rate_limiter import RateLimiter
+from .response_cache import LLMResponseCache
+from .embedding_cache import EmbeddingCache
 
 
 class QwenLLM(ILLMCapability):
@@ -10,6 +16,9 @@ class QwenLLM(ILLMCapability):
     支持文本生成、多模态（VL）、JSON 解析、对话历史等
     """
 
+    # DashScope text-embedding-v1/v2 单次请求最多 25 条文本
+    MAX_EMBEDDING_BATCH_SIZE = 25
+
     def __init__(
         self,
 
@@ -22,6 +31,19 @@ class QwenLLM(ILLMCapability):
         self.vl_model_name = None
         self.dashscope = None
         self.is_initialized = False
+        # 限流与重试：RPM/TPM 令牌桶在本实例的所有调用（含 batch_generate 的工作线程）间共享
+        self.rate_limiter = RateLimiter()
+        self.batch_max_workers = 4
+        self.backoff_base = 1.0
+        self.backoff_max = 30.0
+        self.acquire_timeout = 120.0
+        # 响应缓存（按需开启）
+        self.response_cache: Optional[LLMResponseCache] = None
+        self.cache_deterministic_only = False
+        # 批量向量化
+        self.embedding_batch_size = self.MAX_EMBEDDING_BATCH_SIZE
+        self.embedding_max_workers = 4
+        self.embedding_cache: Optional[EmbeddingCache] = None
 
     def initialize(self, config: Dict[str, Any]) -> None:
         # 从配置中获取参数（如果提供）
@@ -53,10 +75,36 @@ class QwenLLM(ILLMCapability):
             self.vl_model_name = config['vl_model_name'] or self.vl_model_name
         else:
             self.vl_model_name="qwen-vl-max"
+
+        rate_limit = config.get('rate_limit', {})
+        self.rate_limiter = RateLimiter(rpm=rate_limit.get('rpm'), tpm=rate_limit.get('tpm'))
+        self.batch_max_workers = rate_limit.get('max_workers', self.batch_max_workers)
+        self.backoff_base = rate_limit.get('backoff_base', self.backoff_base)
+        self.backoff_max = rate_limit.get('backoff_max', self.backoff_max)
+        self.acquire_timeout = rate_limit.get('acquire_timeout', self.acquire_timeout)
+
+        cache_config = config.get('response_cache', {})
+        if cache_config.get('enabled', False):
+            self.response_cache = LLMResponseCache(
+                max_size=cache_config.get('max_size', 1000),
+                ttl=cache_config.get('ttl', 3600),
+                disk_dir=cache_config.get('disk_dir'),
+                use_redis=cache_config.get('use_redis', False)
+            )
+            self.cache_deterministic_only = cache_config.get('deterministic_only', False)
+
+        embedding_config = config.get('embedding', {})
+        self.embedding_batch_size = embedding_config.get('batch_size', self.embedding_batch_size)
+        self.embedding_max_workers = embedding_config.get('max_workers', self.embedding_max_workers)
+        if embedding_config.get('cache_path'):
+            self.embedding_cache = EmbeddingCache(embedding_config['cache_path'])
         self.is_initialized = True
 
     def shutdown(self) -> None:
         # 清理资源
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
+            self.embedding_cache = None
         self.is_initialized = False
 
     def get_capability_type(self) -> str:
@@ -69,16 +117,89 @@ class QwenLLM(ILLMCapability):
         parse_json: bool = False,
         json_schema: Optional[Dict[str, Any]] = None,
         max_retries: int = 3,
+        bypass_cache: bool = False,
         **kwargs
     ) -> Union[str, Dict[str, Any], None]:
         """
         统一生成接口：自动根据是否含图片选择文本或 VL 模型
+
+        开启 response_cache 时，相同的模型、参数与提示词直接返回缓存结果；
+        bypass_cache=True 时本次调用既不读也不写缓存。
+        """
+        return self._generate(
+            prompt, images, parse_json, json_schema, max_retries, bypass_cache, **kwargs
+        )
+
+    def _generate(
+        self,
+        prompt: str,
+        images: Optional[List[str]] = None,
+        parse_json: bool = False,
+        json_schema: Optional[Dict[str, Any]] = None,
+        max_retries: int = 3,
+        bypass_cache: bool = False,
+        raise_on_failure: bool = False,
+        **kwargs
+    ) -> Union[str, Dict[str, Any], None]:
+        """
+        generate 的实现；raise_on_failure=True 时重试耗尽后抛出最后一次的错误而不是返回 None
         """
         images = images or []
+        cache_key = self._response_cache_key(prompt, images, parse_json, json_schema, bypass_cache, kwargs)
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         if images:
-            return self._call_vl_model(prompt, images, parse_json, json_schema, max_retries, **kwargs)
+            result = self._call_vl_model(
+                prompt, images, parse_json, json_schema, max_retries,
+                raise_on_failure=raise_on_failure, **kwargs
+            )
         else:
-            return self._call_text_model(prompt, parse_json, json_schema, max_retries, **kwargs)
+            result = self._call_text_model(
+                prompt, parse_json, json_schema, max_retries,
+                raise_on_failure=raise_on_failure, **kwargs
+            )
+
+        if cache_key is not None:
+            self.response_cache.set(cache_key, result)
+        return result
+
+    def _response_cache_key(
+        self,
+        prompt: str,
+        images: List[str],
+        parse_json: bool,
+        json_schema: Optional[Dict[str, Any]],
+        bypass_cache: bool,
+        kwargs: Dict[str, Any]
+    ) -> Optional[str]:
+        """
+        计算本次调用的缓存键；不走缓存时返回 None
+        """
+        if self.response_cache is None:
+            return None
+        if bypass_cache:
+            self.response_cache.record_bypass()
+            return None
+        if self.cache_deterministic_only and kwargs.get('temperature') not in (0, 0.0):
+            return None
+        model = self.vl_model_name if images else self.model_name
+        return LLMResponseCache.make_key(
+            model, prompt, images=images, parse_json=parse_json, json_schema=json_schema, **kwargs
+        )
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        获取响应缓存统计信息
+
+        Returns:
+            Dict[str, Any]: 命中率等统计，未开启缓存时返回 {"enabled": False}
+        """
+        if self.response_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.response_cache.get_stats()}
 
     def _call_text_model(
         self,
@@ -86,16 +207,29 @@ class QwenLLM(ILLMCapability):
         parse_json: bool = False,
         json_schema: Optional[Dict[str, Any]] = None,
         max_retries: int = 3,
+        raise_on_failure: bool = False,
         **kwargs
     ) -> Union[str, Dict[str, Any], None]:
-        for _ in range(max_retries):
+        estimated_tokens = self._estimate_tokens(prompt, kwargs)
+        last_error: Optional[Exception] = None
+        for attempt in range(max_retries):
             try:
-                response = self.dashscope.Generation.call(
+                response = self._rate_limited_call(
+                    self.dashscope.Generation.call,
+                    estimated_tokens,
                     model=self.model_name,
                     prompt=prompt,
                     **kwargs
                 )
+                if self._is_retryable(response):
+                    print(f"[QwenLLM Text Throttled] {getattr(response, 'code', '')}: {getattr(response, 'message', '')}")
+                    last_error = RuntimeError(
+                        f"DashScope throttled: {getattr(response, 'code', '')}: {getattr(response, 'message', '')}"
+                    )
+                    self._backoff(attempt, max_retries)
+                    continue
                 if not response or not hasattr(response, 'output') or not response.output.text:
+                    last_error = RuntimeError(f"Empty response from DashScope: {getattr(response, 'message', '')}")
                     continue
 
                 text = response.output.text.strip()
@@ -104,6 +238,7 @@ class QwenLLM(ILLMCapability):
 
                 json_str = self._extract_json(text)
                 if not json_str:
+                    last_error = ValueError("No JSON object found in model output")
                     continue
 
                 result = json.loads(json_str)
@@ -115,7 +250,11 @@ class QwenLLM(ILLMCapability):
 
             except Exception as e:
                 print(f"[QwenLLM Text Error] {e}")
+                last_error = e
+                self._backoff(attempt, max_retries)
                 continue
+        if raise_on_failure:
+            raise last_error or RuntimeError("DashScope call failed")
         return None
 
     def _call_vl_model(
@@ -125,11 +264,16 @@ class QwenLLM(ILLMCapability):
         parse_json: bool = False,
         json_schema: Optional[Dict[str, Any]] = None,
         max_retries: int = 3,
+        raise_on_failure: bool = False,
         **kwargs
     ) -> Union[str, Dict[str, Any], None]:
-        for _ in range(max_retries):
+        estimated_tokens = self._estimate_tokens(prompt, kwargs)
+        last_error: Optional[Exception] = None
+        for attempt in range(max_retries):
             try:
-                response = self.dashscope.MultiModalConversation.call(
+                response = self._rate_limited_call(
+                    self.dashscope.MultiModalConversation.call,
+                    estimated_tokens,
                     model=self.vl_model_name,
                     messages=[{
                         "role": "user",
@@ -139,8 +283,16 @@ class QwenLLM(ILLMCapability):
                     }],
                     **kwargs
                 )
+                if self._is_retryable(response):
+                    print(f"[QwenLLM VL Throttled] {getattr(response, 'code', '')}: {getattr(response, 'message', '')}")
+                    last_error = RuntimeError(
+                        f"DashScope throttled: {getattr(response, 'code', '')}: {getattr(response, 'message', '')}"
+                    )
+                    self._backoff(attempt, max_retries)
+                    continue
 
                 if not response or not response.output or not response.output.choices:
+                    last_error = RuntimeError(f"Empty response from DashScope: {getattr(response, 'message', '')}")
                     continue
 
                 text = response.output.choices[0].message.content[0].text.strip()
@@ -149,6 +301,7 @@ class QwenLLM(ILLMCapability):
 
                 json_str = self._extract_json(text)
                 if not json_str:
+                    last_error = ValueError("No JSON object found in model output")
                     continue
 
                 result = json.loads(json_str)
@@ -160,7 +313,11 @@ class QwenLLM(ILLMCapability):
 
             except Exception as e:
                 print(f"[QwenLLM VL Error] {e}")
+                last_error = e
+                self._backoff(attempt, max_retries)
                 continue
+        if raise_on_failure:
+            raise last_error or RuntimeError("DashScope call failed")
         return None
 
     def generate_chat(
@@ -172,13 +329,23 @@ class QwenLLM(ILLMCapability):
         支持多轮对话（仅文本，不支持 VL）
         messages 格式: [{"role": "user", "content": "..."}, ...]
         """
+        max_retries = kwargs.pop('max_retries', 3)
+        estimated_tokens = self._estimate_tokens(
+            "".join(str(m.get("content", "")) for m in messages), kwargs
+        )
         try:
             # DashScope 文本模型支持 messages 格式（需 qwen-turbo/max/plus 等）
-            response = self.dashscope.Generation.call(
-                model=self.model_name,
-                messages=messages,
-                **kwargs
-            )
+            for attempt in range(max_retries):
+                response = self._rate_limited_call(
+                    self.dashscope.Generation.call,
+                    estimated_tokens,
+                    model=self.model_name,
+                    messages=messages,
+                    **kwargs
+                )
+                if not self._is_retryable(response) or attempt == max_retries - 1:
+                    break
+                self._backoff(attempt, max_retries)
             print(f"DashScope response: {response}")
             if response and response.output and response.output.text:
                 return {
@@ -194,18 +361,75 @@ class QwenLLM(ILLMCapability):
             return {"content": f"Error: {str(e)}", "error": str(e)}
 
     def embedding(self, text: str, model: str = "text-embedding-v1") -> List[float]:
+        return self.embed_many([text], model=model)[0]
+
+    def embed_many(
+        self,
+        texts: List[str],
+        model: str = "text-embedding-v1",
+        batch_size: Optional[int] = None,
+        max_workers: Optional[int] = None
+    ) -> List[List[float]]:
+        """
+        批量向量化
+        - 相同文本只计算一次，已缓存的文本不再请求
+        - 其余文本按接口单次上限分批，多批并发请求（受 RPM/TPM 限流约束）
+
+        Args:
+            texts: 文本列表
+            model: 向量模型
+            batch_size: 单次请求的文本数，默认使用配置 embedding.batch_size，超过接口上限时按上限处理
+            max_workers: 并发请求数，默认使用配置 embedding.max_workers
+
+        Returns:
+            List[List[float]]: 与 texts 顺序一致的向量；失败的文本返回空列表
+        """
+        unique = list(dict.fromkeys(texts))
+        vectors: Dict[str, List[float]] = {}
+        if self.embedding_cache is not None:
+            vectors.update(self.embedding_cache.get_many(model, unique))
+
+        pending = [text for text in unique if text not in vectors]
+        if pending:
+            size = max(1, min(batch_size or self.embedding_batch_size, self.MAX_EMBEDDING_BATCH_SIZE))
+            chunks = [pending[i:i + size] for i in range(0, len(pending), size)]
+            workers = max(1, min(max_workers or self.embedding_max_workers, len(chunks)))
+            if workers == 1:
+                results = [self._embed_batch(chunk, model) for chunk in chunks]
+            else:
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qwen-embed") as executor:
+                    results = list(executor.map(lambda chunk: self._embed_batch(chunk, model), chunks))
+
+            fetched = {}
+            for result in results:
+                fetched.update(result)
+            vectors.update(fetched)
+            if self.embedding_cache is not None:
+                self.embedding_cache.set_many(model, fetched)
+
+        return [vectors.get(text, []) for text in texts]
+
+    def _embed_batch(self, texts: List[str], model: str) -> Dict[str, List[float]]:
+        """
+        请求一批文本的向量，失败时返回空字典
+        """
+        estimated_tokens = sum(len(text) for text in texts) // 2 + 1
         try:
-            response = self.dashscope.TextEmbedding.call(
+            response = self._rate_limited_call(
+                self.dashscope.TextEmbedding.call,
+                estimated_tokens,
                 model=model,
-                input=[text]
+                input=texts
             )
             if response and response.output and response.output.embeddings:
-                return response.output.embeddings[0].embedding
-            else:
-                return []
+                return {
+                    texts[item.text_index]: item.embedding
+                    for item in response.output.embeddings
+                }
+            print(f"[QwenLLM Embedding Error] {getattr(response, 'code', '')}: {getattr(response, 'message', '')}")
         except Exception as e:
             print(f"[QwenLLM Embedding Error] {e}")
-            return []
+        return {}
 
     def set_api_key(self, api_key: str) -> None:
         self.dashscope.api_key = api_key
@@ -219,9 +443,101 @@ class QwenLLM(ILLMCapability):
             "qwen-vl-max", "qwen-vl-plus"
         ]
 
-    def batch_generate(self, prompts: List[str], **kwargs) -> List[str]:
-        # 简单串行实现（DashScope SDK 本身不提供 batch 接口）
-        return [self.generate(prompt, **kwargs) for prompt in prompts]
+    def batch_generate(
+        self,
+        prompts: List[str],
+        max_workers: Optional[int] = None,
+        return_exceptions: bool = False,
+        **kwargs
+    ) -> List[Union[str, Dict[str, Any], None, Exception]]:
+        """
+        并发批量生成（DashScope SDK 本身不提供 batch 接口）
+
+        各请求共享实例上的 RPM/TPM 令牌桶，并发度只决定同时在途的请求数。
+
+        Args:
+            prompts: 提示词列表
+            max_workers: 并发线程数，默认使用配置 rate_limit.max_workers
+            return_exceptions: 为 True 时失败项返回异常对象，否则返回 None
+            **kwargs: 透传给 generate 的参数
+
+        Returns:
+            List: 与 prompts 顺序一致的结果列表
+        """
+        if not prompts:
+            return []
+
+        workers = max(1, min(max_workers or self.batch_max_workers, len(prompts)))
+        if workers == 1:
+            return [self._safe_generate(prompt, return_exceptions, **kwargs) for prompt in prompts]
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qwen-batch") as executor:
+            futures = [
+                executor.submit(self._safe_generate, prompt, return_exceptions, **kwargs)
+                for prompt in prompts
+            ]
+            return [future.result() for future in futures]
+
+    def _safe_generate(self, prompt: str, return_exceptions: bool, **kwargs):
+        """单条生成，失败（含重试耗尽、限流超时）按 return_exceptions 转换为返回值"""
+        try:
+            return self._generate(prompt, raise_on_failure=True, **kwargs)
+        except Exception as e:
+            print(f"[QwenLLM Batch Error] {e}")
+            return e if return_exceptions else None
+
+    def _rate_limited_call(self, api_call: Callable[..., Any], estimated_tokens: int, **kwargs) -> Any:
+        """
+        获取限流配额后调用 DashScope 接口，并用响应中的实际用量修正 TPM 配额
+
+        Args:
+            api_call: DashScope 调用函数
+            estimated_tokens: 预估 Token 数
+            **kwargs: 调用参数
+
+        Returns:
+            Any: DashScope 响应
+        """
+        if not self.rate_limiter.acquire(estimated_tokens, timeout=self.acquire_timeout):
+            raise TimeoutError(f"Rate limit quota not available within {self.acquire_timeout}s")
+        response = api_call(**kwargs)
+        self.rate_limiter.record_usage(estimated_tokens, self._usage_tokens(response))
+        return response
+
+    @staticmethod
+    def _estimate_tokens(text: str, kwargs: Dict[str, Any]) -> int:
+        """粗略估算一次调用的 Token 数：输入按约 2 字符/Token，加上输出上限"""
+        return len(text or "") // 2 + int(kwargs.get('max_tokens') or 512)
+
+    @staticmethod
+    def _usage_tokens(response: Any) -> Optional[int]:
+        """从响应中读取实际消耗的 Token 数"""
+        usage = getattr(response, 'usage', None)
+        if not usage:
+            return None
+        try:
+            total = usage.get('total_tokens')
+            if total is None:
+                total = (usage.get('input_tokens') or 0) + (usage.get('output_tokens') or 0)
+            return int(total) or None
+        except Exception:
+            return None
+
+    @staticmethod
+    def _is_retryable(response: Any) -> bool:
+        """限流（429 / Throttling.*）或服务端错误（5xx）需要退避后重试"""
+        status_code = getattr(response, 'status_code', None)
+        code = str(getattr(response, 'code', '') or '')
+        if status_code == 429 or code.startswith('Throttling'):
+            return True
+        return isinstance(status_code, int) and status_code >= 500
+
+    def _backoff(self, attempt: int, max_retries: int) -> None:
+        """指数退避 + 全抖动；最后一次尝试后不再等待"""
+        if attempt >= max_retries - 1:
+            return
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        time.sleep(delay)
 
     @staticmethod
     def _extract_json(text: str) -> Optional[str]:
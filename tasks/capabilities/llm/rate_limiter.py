@@ -0,0 +1,119 @@
+"""LLM 调用限流（令牌桶）"""
+from typing import Optional
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    令牌桶：容量为每分钟配额，按秒匀速补充
+    - acquire 阻塞直到令牌足够（或超时）
+    - 允许事后修正（adjust），用实际消耗量替换预估量，余额可以暂时为负
+    """
+
+    def __init__(self, per_minute: float):
+        """
+        初始化令牌桶
+
+        Args:
+            per_minute: 每分钟配额
+        """
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self, amount: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """
+        获取令牌
+
+        Args:
+            amount: 需要的令牌数（超过容量时按容量计，避免永远无法满足）
+            timeout: 最长等待时间（秒），None 表示一直等待
+
+        Returns:
+            bool: 是否获取成功
+        """
+        amount = min(float(amount), self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return True
+                wait = (amount - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def adjust(self, delta: float) -> None:
+        """
+        修正余额：delta > 0 表示多扣，delta < 0 表示退还
+
+        Args:
+            delta: 需要额外扣除的令牌数
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - delta)
+
+
+class RateLimiter:
+    """
+    请求数（RPM）与 Token 数（TPM）双令牌桶限流，进程内所有调用共享
+    """
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        """
+        初始化限流器
+
+        Args:
+            rpm: 每分钟请求数上限，None 或 0 表示不限
+            tpm: 每分钟 Token 数上限，None 或 0 表示不限
+        """
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+
+    def acquire(self, estimated_tokens: int = 0, timeout: Optional[float] = None) -> bool:
+        """
+        为一次调用获取配额
+
+        Args:
+            estimated_tokens: 预估消耗的 Token 数
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            bool: 是否获取成功
+        """
+        start = time.monotonic()
+        if self.requests and not self.requests.acquire(1, timeout):
+            return False
+        if self.tokens and estimated_tokens:
+            remaining = None if timeout is None else max(timeout - (time.monotonic() - start), 0.0)
+            if not self.tokens.acquire(estimated_tokens, remaining):
+                # 退还已获取的请求配额
+                if self.requests:
+                    self.requests.adjust(-1)
+                return False
+        return True
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """
+        用实际消耗修正 Token 配额
+
+        Args:
+            estimated_tokens: 调用前预估的 Token 数
+            actual_tokens: 响应中返回的实际 Token 数
+        """
+        if self.tokens and actual_tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
@@ -0,0 +1,235 @@
+"""LLM 响应缓存（按内容寻址）"""
+from typing import Dict, Any, Optional
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from common.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    """
+    LLM 响应缓存
+    - 键为 (模型, 调用参数, 提示词) 的 SHA-256 摘要，相同请求命中同一条缓存
+    - 一级：进程内 LRU；二级（可选）：本地磁盘目录或 Redis，多进程/重启后仍可复用
+    - 所有层共用同一个 TTL；二级命中会回填一级
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        ttl: Optional[float] = 3600.0,
+        disk_dir: Optional[str] = None,
+        use_redis: bool = False,
+        redis_prefix: str = "llm_cache:"
+    ):
+        """
+        初始化响应缓存
+
+        Args:
+            max_size: 进程内 LRU 容量
+            ttl: 缓存有效期（秒），None 表示不过期
+            disk_dir: 磁盘缓存目录，为空时不启用磁盘层
+            use_redis: 是否启用 Redis 层（连接参数取自 config 中的 REDIS_*）
+            redis_prefix: Redis 键前缀
+        """
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.redis_prefix = redis_prefix
+        self._memory = LRUCache(name="llm_response", max_size=max_size)
+        self._redis = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "bypassed": 0,
+            "errors": 0,
+        }
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        if use_redis:
+            try:
+                from external.database.redis_client import RedisClient
+                self._redis = RedisClient()
+            except Exception as e:
+                logger.warning(f"Redis tier for LLM response cache disabled: {e}")
+
+    @staticmethod
+    def make_key(model: str, prompt: str, **params) -> str:
+        """
+        构造缓存键
+
+        Args:
+            model: 模型名称
+            prompt: 提示词
+            **params: 影响输出的其余参数（图片、temperature、parse_json 等）
+
+        Returns:
+            str: 十六进制摘要
+        """
+        payload = json.dumps(
+            {"model": model, "prompt": prompt, "params": params},
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _incr(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def record_bypass(self) -> None:
+        """记录一次跳过缓存的调用"""
+        self._incr("bypassed")
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            Optional[Any]: 缓存的响应（副本），未命中返回 None
+        """
+        value = self._memory.get(key)
+        if value is not None:
+            self._incr("memory_hits")
+            return copy.deepcopy(value)
+
+        value, remaining = self._get_disk(key)
+        tier = "disk_hits"
+        if value is None:
+            value, remaining = self._get_redis(key)
+            tier = "redis_hits"
+        if value is None:
+            self._incr("misses")
+            return None
+
+        self._incr(tier)
+        self._memory.set(key, value, remaining)
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        写入缓存；None（调用失败）不缓存
+
+        Args:
+            key: 缓存键
+            value: 响应（字符串或可 JSON 序列化的对象）
+        """
+        if value is None:
+            return
+        value = copy.deepcopy(value)
+        self._memory.set(key, value, self.ttl)
+        self._incr("writes")
+
+        if not self.disk_dir and self._redis is None:
+            return
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        try:
+            data = json.dumps({"value": value, "expires_at": expires_at}, ensure_ascii=False)
+        except (TypeError, ValueError):
+            # 不可序列化的结果只保留在进程内
+            return
+        self._set_disk(key, data)
+        self._set_redis(key, data)
+
+    def _get_disk(self, key: str):
+        if not self.disk_dir:
+            return None, None
+        path = os.path.join(self.disk_dir, f"{key}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None, None
+        except Exception as e:
+            self._incr("errors")
+            logger.warning(f"Failed to read LLM cache file {path}: {e}")
+            return None, None
+        return self._unpack(record, lambda: os.remove(path))
+
+    def _set_disk(self, key: str, data: str) -> None:
+        if not self.disk_dir:
+            return
+        path = os.path.join(self.disk_dir, f"{key}.json")
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            self._incr("errors")
+            logger.warning(f"Failed to write LLM cache file {path}: {e}")
+
+    def _get_redis(self, key: str):
+        if self._redis is None:
+            return None, None
+        try:
+            raw = self._redis.get(self.redis_prefix + key)
+            if raw is None:
+                return None, None
+            return self._unpack(json.loads(raw), None)
+        except Exception as e:
+            self._incr("errors")
+            logger.warning(f"Failed to read LLM cache from Redis: {e}")
+            return None, None
+
+    def _set_redis(self, key: str, data: str) -> None:
+        if self._redis is None:
+            return
+        try:
+            self._redis.set(self.redis_prefix + key, data, int(self.ttl) if self.ttl else None)
+        except Exception as e:
+            self._incr("errors")
+            logger.warning(f"Failed to write LLM cache to Redis: {e}")
+
+    @staticmethod
+    def _unpack(record: Dict[str, Any], on_expired):
+        """
+        解析二级缓存记录
+
+        Returns:
+            (value, 剩余有效期)；已过期返回 (None, None)
+        """
+        expires_at = record.get("expires_at")
+        remaining = None
+        if expires_at is not None:
+            remaining = expires_at - time.time()
+            if remaining <= 0:
+                if on_expired is not None:
+                    try:
+                        on_expired()
+                    except OSError:
+                        pass
+                return None, None
+        return record.get("value"), remaining
+
+    def clear(self) -> None:
+        """清空进程内缓存（磁盘与 Redis 层按 TTL 自然过期）"""
+        self._memory.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            Dict[str, Any]: 各层命中数、未命中数、命中率等
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        hits = stats["memory_hits"] + stats["disk_hits"] + stats["redis_hits"]
+        total = hits + stats["misses"]
+        stats["hit_ratio"] = hits / total if total else 0.0
+        stats["memory_size"] = self._memory.size()
+        return stats
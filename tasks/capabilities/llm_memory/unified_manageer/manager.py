@@ -1,5 +1,7 @@
 """统一记忆管理器模块"""
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import logging
 import time  # 用于测试时等待 embedding 完成
 
 # 使用相对导入
@@ -7,19 +9,63 @@ from ...capability_base import CapabilityBase
 from .short_term import ShortTermMemory
 
 
-# 导入 mem0
-from mem0 import Memory
-from config import MEM0_CONFIG
+# mem0 客户端在首次使用时创建（见 mem0_client），导入本模块不再初始化向量库与 embedder
+from .mem0_client import get_mem0_client
 
-# === 全局共享的重量级资源（只初始化一次）===
-SHARED_MEM0_CLIENT = Memory.from_config(MEM0_CONFIG)
+
+def __getattr__(name: str):
+    # 兼容旧代码的 SHARED_MEM0_CLIENT 引用，访问时才创建
+    if name == "SHARED_MEM0_CLIENT":
+        return get_mem0_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 from datetime import datetime
 import json
 import os
 import re
+import uuid
 from .memory_interfaces import IVaultRepository, IProceduralRepository, IResourceRepository
+from common.utils.cache import LRUCache, TTLCache
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import MEMORY_RETRIEVAL_TIMEOUTS
+except ImportError:
+    MEMORY_RETRIEVAL_TIMEOUTS = {}
+
+try:
+    from config import MEMORY_FAST_PLAN_MAX_CHARS, MEMORY_SYNTHESIS_MIN_CHARS, MEMORY_CONTEXT_CACHE_TTL
+except ImportError:
+    MEMORY_FAST_PLAN_MAX_CHARS = 6
+    MEMORY_SYNTHESIS_MIN_CHARS = 300
+    MEMORY_CONTEXT_CACHE_TTL = 30
+
+try:
+    from config import CORE_MEMORY_CACHE_SIZE, CORE_MEMORY_CACHE_TTL
+except ImportError:
+    CORE_MEMORY_CACHE_SIZE = 1000
+    CORE_MEMORY_CACHE_TTL = 300
+
+# 未单独配置超时的记忆来源使用该值（秒）
+DEFAULT_RETRIEVAL_TIMEOUT = 3.0
+
+# 本地检索规划：寒暄类输入只查核心记忆；命中关键词的输入直接确定检索来源
+_SMALL_TALK_PATTERN = re.compile(
+    r"^(你好|您好|嗨|哈喽|早上好|下午好|晚上好|谢谢|多谢|好的|好|嗯|在吗|再见|拜拜|"
+    r"hi|hello|hey|ok|okay|thanks|thank you|bye)[\s!！。.,，~～?？]*$",
+    re.IGNORECASE
+)
+_SOURCE_KEYWORDS = {
+    "episodic": ("上次", "之前", "以前", "昨天", "前天", "最近", "那次", "刚才", "last time", "yesterday"),
+    "procedural": ("流程", "步骤", "怎么", "如何", "方法", "操作", "how to", "steps"),
+    "semantic": ("是什么", "什么是", "定义", "概念", "含义", "what is"),
+    "resource": ("文件", "文档", "附件", "报告", "链接", "pdf", "excel", "document"),
+}
+
+# 各类记忆检索共用的线程池：超时的检索继续在后台跑完，不阻塞本轮上下文构建
+_RETRIEVAL_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="memory-retrieval")
 
 
 class UnifiedMemoryManager():
@@ -32,14 +78,31 @@ class UnifiedMemoryManager():
                 qwen_client=None
                 ):
         # self.user_id = user_id
-        self.mem0 = mem0_client or SHARED_MEM0_CLIENT
+        self._mem0 = mem0_client  # 仅保存注入的客户端；未注入时每次访问都取共享客户端
         self.stm = ShortTermMemory(max_history=10)  # 仍保留短期对话历史
         self.qwen = qwen_client # ← 关键！
         # 各专用存储（可 lazy init）
         self.vault_repo = vault_repo or create_vault_repo(config["vault"])
         self.procedural_repo = procedural_repo or create_procedural_repo(config["procedural"])
         self.resource_repo = resource_repo or create_resource_repo(config["resource"])
-        self._core_cache = None
+        # 按用户缓存核心记忆：容量有上限（LRU）且带 TTL，写入核心记忆时立即失效
+        self._core_cache = LRUCache(name="core_memory", max_size=CORE_MEMORY_CACHE_SIZE)
+        # 检索计划按 (场景, 归一化输入) 缓存，合成上下文按用户缓存；用户记忆写入后通过代数失效
+        self._plan_cache = TTLCache(name="memory_plan", default_ttl=MEMORY_CONTEXT_CACHE_TTL, max_size=1000)
+        self._context_cache = TTLCache(name="memory_context", default_ttl=MEMORY_CONTEXT_CACHE_TTL, max_size=1000)
+        # 每个用户的上下文代数令牌，与核心记忆缓存同样有容量上限；被驱逐的用户再次访问时拿到新令牌，旧缓存自然不再命中
+        self._context_generation = LRUCache(name="memory_context_generation", max_size=CORE_MEMORY_CACHE_SIZE)
+
+    @property
+    def mem0(self):
+        # 不缓存共享客户端：get_mem0_client 负责健康检查与重建，快路径只是一次时间戳比较
+        if self._mem0 is not None:
+            return self._mem0
+        return get_mem0_client()
+
+    @mem0.setter
+    def mem0(self, client):
+        self._mem0 = client
 
     # ======================
     # 1. 六类记忆写入接口
@@ -162,7 +225,8 @@ class UnifiedMemoryManager():
             user_id=user_id,
             metadata={"type": "core", "updated_at": datetime.now().isoformat()}
         )
-        self._core_memory_cache = None  # 失效缓存
+        self._invalidate_context(user_id)
+        self.invalidate_core_memory(user_id)  # 失效缓存
 
     def add_episodic_memory(self, user_id,content: str, timestamp: str = None):
         """情景记忆：具体事件"""
@@ -171,21 +235,38 @@ class UnifiedMemoryManager():
             "timestamp": timestamp or datetime.now().isoformat()
         }
         self.mem0.add(content, user_id=user_id, metadata=meta)
+        self._invalidate_context(user_id)
 
     def add_vault_memory(self,user_id, category: str, key_name: str, value: str):
         self.vault_repo.store(user_id, category, key_name, value)
+        self._invalidate_context(user_id)
 
     def add_procedural_memory(self, user_id: str, domain: str, task_type: str, title: str, steps: List[str]):
         self.procedural_repo.add_procedure(user_id, domain, task_type, title, steps)
+        self._invalidate_context(user_id)
 
     def add_resource_memory(self, user_id: str, file_path: str, summary: str, doc_type: str = "pdf"):
         self.resource_repo.add_document(user_id, file_path, summary, doc_type)
+        self._invalidate_context(user_id)
 
     def add_semantic_memory(self, user_id: str, content: str, category: str = ""):
         """语义记忆：事实性知识"""
         meta = {"type": "semantic"}
         if category: meta["category"] = category
         self.mem0.add(content, user_id=user_id, metadata=meta)
+        self._invalidate_context(user_id)
+
+    def _invalidate_context(self, user_id: str) -> None:
+        """用户记忆有写入时，使其已缓存的合成上下文失效"""
+        self._context_generation.set(user_id, uuid.uuid4().hex)
+
+    def _get_context_generation(self, user_id: str) -> str:
+        """获取用户当前的上下文代数令牌；不存在（或已被驱逐）时生成新令牌"""
+        generation = self._context_generation.get(user_id)
+        if generation is None:
+            generation = uuid.uuid4().hex
+            self._context_generation.set(user_id, generation)
+        return generation
 
     # ======================
     # 2. 记忆检索接口（按类型）
@@ -204,13 +285,43 @@ class UnifiedMemoryManager():
         return [r.get("memory", "") for r in results.get("results", [])]
 
     def get_core_memory(self, user_id: str) -> str:
-        """获取核心记忆（缓存优化）"""
-        print(f"Retrieving core memory for user {user_id}")
-        if self._core_cache is None:
-            print(f"Cache miss for core memory, fetching from Mem0 for user {user_id}")
-            memories = self._search_by_type(user_id, "core", limit=10)
-            self._core_cache = "\n".join(memories) if memories else ""
-        return self._core_cache
+        """获取核心记忆（按用户缓存）"""
+        cached = self._core_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        logger.debug(f"Core memory cache miss, fetching from Mem0 for user {user_id}")
+        generation = self._get_context_generation(user_id)
+        memories = self._search_by_type(user_id, "core", limit=10)
+        core = "\n".join(memories) if memories else ""
+        # 读取期间有写入时不回填，避免把旧数据写回缓存
+        if self._context_generation.get(user_id) == generation:
+            self._core_cache.set(user_id, core, CORE_MEMORY_CACHE_TTL)
+        return core
+
+    def invalidate_core_memory(self, user_id: Optional[str] = None) -> None:
+        """
+        使核心记忆缓存失效
+
+        Args:
+            user_id: 用户ID，为空时清空所有用户的缓存
+        """
+        if user_id is None:
+            self._core_cache.clear()
+        else:
+            self._core_cache.delete(user_id)
+
+    def get_core_cache_stats(self) -> Dict[str, Any]:
+        """
+        获取核心记忆缓存统计
+
+        Returns:
+            Dict[str, Any]: 命中、未命中、淘汰、过期次数及当前大小
+        """
+        stats = self._core_cache.get_stats().to_dict()
+        stats["size"] = self._core_cache.size()
+        stats["max_size"] = self._core_cache.max_size
+        return stats
 
     def get_episodic_memory(self, user_id: str, query: str, limit: int = 3) -> str:
         return "\n".join(self._search_by_type(user_id, "episodic", query, limit))
@@ -234,7 +345,51 @@ class UnifiedMemoryManager():
     # 3. 上下文构建（供 LLM 使用）
     # ======================
 
+    @staticmethod
+    def _normalize_query(text: str) -> str:
+        """归一化输入，用作缓存键"""
+        return re.sub(r"\s+", " ", (text or "").strip().lower()).rstrip("!！。.?？~～")
+
+    def _plan_locally(self, goal: str) -> Optional[Dict[str, str]]:
+        """
+        基于规则的本地检索规划
+
+        Args:
+            goal: 检索目标（通常是用户输入）
+
+        Returns:
+            Optional[Dict[str, str]]: 检索计划；规则无法判断时返回 None，交给 LLM 规划
+        """
+        text = (goal or "").strip()
+        # 先做关键词匹配：短句也可能明确指向某类记忆（如“上次的报告”“怎么操作”）
+        lowered = text.lower()
+        sources = [source for source, words in _SOURCE_KEYWORDS.items() if any(w in lowered for w in words)]
+        if not sources:
+            if len(text) <= MEMORY_FAST_PLAN_MAX_CHARS or _SMALL_TALK_PATTERN.match(text):
+                return {"core": text}
+            return None
+        plan = {"core": text}
+        plan.update({source: text for source in sources})
+        return plan
+
     def _generate_retrieval_plan(self, goal: str, scene: str) -> Dict[str, str]:
+        """
+        生成多类型记忆的检索查询：先走本地规则与缓存，规则无法判断时由 Qwen 动态生成
+        """
+        plan = self._plan_locally(goal)
+        if plan is not None:
+            return plan
+
+        cache_key = (scene, self._normalize_query(goal))
+        cached = self._plan_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+
+        plan = self._generate_retrieval_plan_with_qwen(goal, scene)
+        self._plan_cache.set(cache_key, dict(plan))
+        return plan
+
+    def _generate_retrieval_plan_with_qwen(self, goal: str, scene: str) -> Dict[str, str]:
         """使用 Qwen 动态生成多类型记忆的检索查询"""
         prompt = f"""你是一个高级记忆系统调度器。请根据以下场景和目标，为六类记忆生成最相关的检索关键词或短句。
     仅输出 JSON，包含需要检索的类别及其查询语句。不要解释，不要多余字段。
@@ -261,37 +416,47 @@ class UnifiedMemoryManager():
             }
 
     def _execute_retrieval_plan(self, user_id: str, plan: Dict[str, str]) -> Dict[str, str]:
-        """执行检索计划，返回原始记忆片段字典"""
-        results = {}
+        """
+        执行检索计划，返回原始记忆片段字典
+
+        各类记忆并行检索，每类有独立超时（MEMORY_RETRIEVAL_TIMEOUTS）；
+        超时或出错的来源按空结果处理，不拖慢整体上下文构建。
+        """
+        lookups: Dict[str, Callable[[], str]] = {}
 
         if "core" in plan:
-            core = self.get_core_memory(user_id)
-            if core:
-                results["core"] = core
+            lookups["core"] = lambda: self.get_core_memory(user_id)
 
         if "episodic" in plan:
-            episodic = self.get_episodic_memory(user_id, plan["episodic"], limit=3)
-            if episodic:
-                results["episodic"] = episodic
+            lookups["episodic"] = lambda: self.get_episodic_memory(user_id, plan["episodic"], limit=3)
 
         if "semantic" in plan:
-            semantic = "\n".join(self._search_by_type(user_id, "semantic", plan["semantic"], limit=3))
-            if semantic:
-                results["semantic"] = semantic
+            lookups["semantic"] = lambda: "\n".join(self._search_by_type(user_id, "semantic", plan["semantic"], limit=3))
 
         if "procedural" in plan:
-            procedural = self.get_procedural_memory(user_id, plan["procedural"], domain=None, limit=3)
-            if procedural:
-                results["procedural"] = procedural
-
-        if "resource" in plan:
-            return
-            resource = self.get_resource_memory(user_id, plan["resource"], limit=3)
-            if resource:
-                results["resource"] = resource
+            lookups["procedural"] = lambda: self.get_procedural_memory(user_id, plan["procedural"], domain=None, limit=3)
 
+        # resource 检索暂不启用（原实现在此处提前返回）
         # vault 不在此处自动检索（安全原因），由 build_execution_context 显式控制
 
+        start = time.monotonic()
+        futures = {source: _RETRIEVAL_EXECUTOR.submit(lookup) for source, lookup in lookups.items()}
+
+        results = {}
+        for source, future in futures.items():
+            timeout = MEMORY_RETRIEVAL_TIMEOUTS.get(source, DEFAULT_RETRIEVAL_TIMEOUT)
+            remaining = max(0.0, start + timeout - time.monotonic())
+            try:
+                value = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                logger.warning(f"Memory retrieval '{source}' timed out after {timeout}s for user {user_id}")
+                continue
+            except Exception as e:
+                logger.warning(f"Memory retrieval '{source}' failed for user {user_id}: {e}")
+                continue
+            if value:
+                results[source] = value
+
         return results
 
     def _synthesize_context_with_qwen(self, user_id: str, raw_memories: Dict[str, str], scene: str, include_vault: bool = False) -> str:
@@ -307,6 +472,10 @@ class UnifiedMemoryManager():
         if not raw_memories:
             return "无相关记忆可用。"
 
+        # 片段很少时直接拼接，省去一次 LLM 合成；含 vault 时必须经过 LLM 脱敏，不走快速路径
+        if "vault" not in raw_memories and sum(len(v) for v in raw_memories.values()) <= MEMORY_SYNTHESIS_MIN_CHARS:
+            return "\n\n".join(raw_memories.values())
+
         memory_blocks = "\n\n".join(f"[{k.upper()} MEMORY]\n{v}" for k, v in raw_memories.items())
 
         prompt = f"""你是一个 AI 助手的记忆整合模块。请将以下记忆片段整合成一段简洁、连贯、适合用于「{scene}」的上下文描述。
@@ -336,6 +505,45 @@ class UnifiedMemoryManager():
     # 3. 智能上下文构建（按场景，Qwen 全程驱动）
     # ======================
 
+    def _build_context(
+        self,
+        user_id: str,
+        goal: str,
+        plan_scene: str,
+        scene: str,
+        include_vault: bool = False,
+        short_term: str = ""
+    ) -> str:
+        """
+        检索 + 合成的公共流程，结果按 (用户, 场景, 归一化输入) 短时缓存
+
+        Args:
+            user_id: 用户ID
+            goal: 检索目标
+            plan_scene: 检索规划使用的场景描述
+            scene: 上下文合成使用的场景描述
+            include_vault: 是否包含 vault（自动脱敏）
+            short_term: 近期对话（参与缓存键，对话推进后自然失效）
+
+        Returns:
+            str: 合成后的上下文
+        """
+        cache_key = (
+            user_id, scene, self._normalize_query(goal), include_vault,
+            short_term, self._get_context_generation(user_id)
+        )
+        cached = self._context_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        plan = self._generate_retrieval_plan(goal, scene=plan_scene)
+        raw = self._execute_retrieval_plan(user_id, plan)
+        if short_term:
+            raw["short_term"] = short_term
+        context = self._synthesize_context_with_qwen(user_id, raw, scene=scene, include_vault=include_vault)
+        self._context_cache.set(cache_key, context)
+        return context
+
     def build_conversation_context(self, user_id: str, current_input: str = "") -> str:
         """
         场景1：对话理解 & 任务选择
@@ -343,19 +551,17 @@ class UnifiedMemoryManager():
         - 合成自然语言上下文供 LLM 理解用户意图
         """
         goal = current_input or "当前对话上下文"
-        plan = self._generate_retrieval_plan(goal, scene="对话理解与任务选择")
-        raw = self._execute_retrieval_plan(user_id, plan)
-        
         
         chat_hist = ""
         if user_id and user_id.count(":") == 1:
             chat_hist = self.stm.format_history_by_scope(user_id, n=6)
         else:
             chat_hist = self.stm.format_history(user_id,n=6)
-        if chat_hist.strip():
-            raw["short_term"] = f"[近期对话]\n{chat_hist}"
+        short_term = f"[近期对话]\n{chat_hist}" if chat_hist.strip() else ""
 
-        return self._synthesize_context_with_qwen(user_id, raw, scene="对话理解")
+        return self._build_context(
+            user_id, goal, plan_scene="对话理解与任务选择", scene="对话理解", short_term=short_term
+        )
 
 
     def build_planning_context(self, user_id: str, planning_goal: str) -> str:
@@ -364,9 +570,7 @@ class UnifiedMemoryManager():
         - 重点获取 procedural、episodic、resource
         - 合成后用于任务分解与排序
         """
-        plan = self._generate_retrieval_plan(planning_goal, scene="多任务规划与调度")
-        raw = self._execute_retrieval_plan(user_id, plan)
-        return self._synthesize_context_with_qwen(user_id, raw, scene="任务规划")
+        return self._build_context(user_id, planning_goal, plan_scene="多任务规划与调度", scene="任务规划")
 
 
     def build_execution_context(self, user_id: str, task_description: str, include_sensitive: bool = False) -> str:
@@ -375,12 +579,11 @@ class UnifiedMemoryManager():
         - 补充历史经验、标准流程、参考资料
         - 可选包含 vault（自动脱敏）
         """
-        plan = self._generate_retrieval_plan(task_description, scene="具体任务执行准备")
-        raw = self._execute_retrieval_plan(user_id, plan)
-        return self._synthesize_context_with_qwen(
+        return self._build_context(
             user_id,
-            raw, 
-            scene="任务执行", 
+            task_description,
+            plan_scene="具体任务执行准备",
+            scene="任务执行",
             include_vault=include_sensitive
         )
 
@@ -0,0 +1,100 @@
+"""进程内共享的 mem0 客户端（懒加载）"""
+from typing import Any, Optional
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 距上次健康检查超过该时间（秒）后，下一次获取客户端时重新检查
+HEALTH_CHECK_INTERVAL = 300.0
+
+_client: Optional[Any] = None
+_client_lock = threading.Lock()
+_last_health_check = 0.0
+_warm_up_thread: Optional[threading.Thread] = None
+
+
+def _build_client() -> Any:
+    """按 config.MEM0_CONFIG 创建 mem0 客户端（向量库与 embedder 在此初始化）"""
+    from mem0 import Memory
+    from config import MEM0_CONFIG
+
+    start = time.monotonic()
+    client = Memory.from_config(MEM0_CONFIG)
+    logger.info(f"mem0 client initialized in {time.monotonic() - start:.2f}s")
+    return client
+
+
+def _is_healthy(client: Any) -> bool:
+    """用一次最小查询探测客户端是否可用"""
+    try:
+        client.get_all(user_id="__health_check__", limit=1)
+        return True
+    except Exception as e:
+        logger.warning(f"mem0 health check failed: {e}")
+        return False
+
+
+def get_mem0_client() -> Any:
+    """
+    获取共享的 mem0 客户端；首次调用时创建，之后定期做健康检查，异常时重建
+
+    Returns:
+        Any: mem0 Memory 实例
+    """
+    global _client, _last_health_check
+    client = _client
+    if client is not None and time.monotonic() - _last_health_check < HEALTH_CHECK_INTERVAL:
+        return client
+
+    with _client_lock:
+        if _client is not None and time.monotonic() - _last_health_check < HEALTH_CHECK_INTERVAL:
+            return _client
+        if _client is not None and _is_healthy(_client):
+            _last_health_check = time.monotonic()
+            return _client
+        if _client is not None:
+            logger.warning("Rebuilding unhealthy mem0 client")
+        _client = _build_client()
+        _last_health_check = time.monotonic()
+        return _client
+
+
+def warm_up_mem0_client(background: bool = True) -> Optional[threading.Thread]:
+    """
+    预热 mem0 客户端，建议在服务启动时调用
+
+    Args:
+        background: 是否在后台线程中预热
+
+    Returns:
+        Optional[threading.Thread]: 后台预热线程；同步预热时返回 None
+    """
+    global _warm_up_thread
+
+    def warm_up():
+        try:
+            get_mem0_client()
+        except Exception as e:
+            logger.error(f"mem0 warm-up failed: {e}")
+
+    if not background:
+        warm_up()
+        return None
+
+    with _client_lock:
+        if _client is not None:
+            return None
+        if _warm_up_thread is None or not _warm_up_thread.is_alive():
+            _warm_up_thread = threading.Thread(target=warm_up, name="mem0-warm-up", daemon=True)
+            _warm_up_thread.start()
+        return _warm_up_thread
+
+
+def reset_mem0_client() -> None:
+    """丢弃当前客户端，下次获取时重新创建（测试或配置变更时使用）"""
+    global _client, _last_health_check
+    with _client_lock:
+        _client = None
+        _last_health_check = 0.0
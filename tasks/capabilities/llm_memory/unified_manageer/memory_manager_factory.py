@@ -1,10 +1,12 @@
 # memory_factory.py
 
 import threading
-from functools import lru_cache, wraps
 from typing import Optional, Any, Dict
 
+from common.utils.cache import LRUCache
+
 from .manager import UnifiedMemoryManager  # 替换为你的实际路径
+from .mem0_client import warm_up_mem0_client
 from ...capbility_config import CapabilityConfig
 
 # 避免循环导入，将导入移到函数内部
@@ -20,47 +22,40 @@ _SHARED_RESOURCE_REPO = None
 
 class MemoryManagerFactory:
     """
-    用户级 UnifiedMemoryManager 工厂，带 LRU 缓存和懒加载。
+    用户级 UnifiedMemoryManager 工厂，带容量上限、TTL 的 LRU 缓存和懒加载。
     
     使用示例：
-        factory = MemoryManagerFactory(maxsize=1000)
+        factory = MemoryManagerFactory(maxsize=1000, ttl=3600)
         manager = factory.get_manager("user_123")
     """
 
-    def __init__(self, maxsize: int = 1000):
+    def __init__(self, maxsize: int = 1000, ttl: Optional[float] = 3600):
         if maxsize <= 0:
             raise ValueError("maxsize must be positive")
         self.maxsize = maxsize
-        self._cache_lock = threading.RLock()  # 支持重入，兼容 lru_cache
-        self._init_lru_cache()
-
-    def _init_lru_cache(self):
-        """动态创建带指定 maxsize 的 LRU 缓存方法"""
-        
-        def _init_shared_repos():
-            """初始化共享仓库"""
-            global _SHARED_VAULT_REPO, _SHARED_PROCEDURAL_REPO, _SHARED_RESOURCE_REPO
-            if _SHARED_VAULT_REPO is None:
-                from external.memory_store.memory_repos import (
-                    build_procedural_repo,
-                    build_resource_repo,
-                    build_vault_repo
-                )
-                _SHARED_VAULT_REPO = build_vault_repo()
-                _SHARED_PROCEDURAL_REPO = build_procedural_repo()
-                _SHARED_RESOURCE_REPO = build_resource_repo()
-        
-        @lru_cache(maxsize=self.maxsize)
-        def _get_manager_cached(user_id: str) -> UnifiedMemoryManager:
-            # 在创建管理器之前确保共享仓库已初始化
-            _init_shared_repos()
-            return UnifiedMemoryManager(
-                user_id=user_id,
-                vault_repo=_SHARED_VAULT_REPO,
-                procedural_repo=_SHARED_PROCEDURAL_REPO,
-                resource_repo=_SHARED_RESOURCE_REPO,
+        self.ttl = ttl
+        self._cache_lock = threading.RLock()
+        self._managers = LRUCache(name="memory_manager", max_size=maxsize)
+
+    @staticmethod
+    def _init_shared_repos():
+        """初始化共享仓库"""
+        global _SHARED_VAULT_REPO, _SHARED_PROCEDURAL_REPO, _SHARED_RESOURCE_REPO
+        if _SHARED_VAULT_REPO is None:
+            from external.memory_store.memory_repos import (
+                build_procedural_repo,
+                build_resource_repo,
+                build_vault_repo
             )
-        self._get_manager_cached = _get_manager_cached
+            _SHARED_VAULT_REPO = build_vault_repo()
+            _SHARED_PROCEDURAL_REPO = build_procedural_repo()
+            _SHARED_RESOURCE_REPO = build_resource_repo()
+
+    def warm_up(self, background: bool = True):
+        """
+        服务启动时预热共享的 mem0 客户端
+        """
+        return warm_up_mem0_client(background=background)
 
     def get_manager(self, user_id: str) -> UnifiedMemoryManager:
         """
@@ -71,7 +66,18 @@ class MemoryManagerFactory:
         user_id = user_id.strip()
         
         with self._cache_lock:
-            return self._get_manager_cached(user_id)
+            manager = self._managers.get(user_id)
+            if manager is None:
+                # 在创建管理器之前确保共享仓库已初始化
+                self._init_shared_repos()
+                # mem0 客户端由 UnifiedMemoryManager 从进程级共享实例懒加载，所有工厂共用
+                manager = UnifiedMemoryManager(
+                    vault_repo=_SHARED_VAULT_REPO,
+                    procedural_repo=_SHARED_PROCEDURAL_REPO,
+                    resource_repo=_SHARED_RESOURCE_REPO,
+                )
+                self._managers.set(user_id, manager, self.ttl)
+            return manager
 
     def evict_user(self, user_id: str) -> bool:
         """
@@ -79,27 +85,25 @@ class MemoryManagerFactory:
         返回是否成功移除
         """
         with self._cache_lock:
-            try:
-                self._get_manager_cached.cache_clear()  # lru_cache 不支持单 key 清除
-                return True
-            except Exception:
-                return False
+            return self._managers.delete(user_id)
 
     def cache_info(self) -> dict:
         """返回缓存统计信息"""
         with self._cache_lock:
-            info = self._get_manager_cached.cache_info()
+            stats = self._managers.get_stats().to_dict()
             return {
-                "hits": info.hits,
-                "misses": info.misses,
-                "maxsize": info.maxsize,
-                "currsize": info.currsize,
+                "hits": stats["hits"],
+                "misses": stats["misses"],
+                "evictions": stats["evictions"],
+                "expirations": stats["expirations"],
+                "maxsize": self.maxsize,
+                "currsize": self._managers.size(),
             }
 
     def clear_cache(self):
         """清空整个缓存（谨慎使用）"""
         with self._cache_lock:
-            self._get_manager_cached.cache_clear()
+            self._managers.clear()
 
 
 # ======================
@@ -9,7 +9,8 @@ from abc import ABC
 from cachetools import TTLCache
 
 from .interface import IMemoryCapability
-from .unified_manageer.manager import UnifiedMemoryManager, SHARED_MEM0_CLIENT
+from .unified_manageer.manager import UnifiedMemoryManager
+from .unified_manageer.mem0_client import warm_up_mem0_client
 from .unified_manageer.memory_interfaces import (
     IVaultRepository,
     IProceduralRepository,
@@ -114,11 +115,15 @@ class UnifiedMemory(IMemoryCapability):
                     vault_repo=self._vault_repo or _SHARED_VAULT_REPO,
                     procedural_repo=self._procedural_repo or _SHARED_PROCEDURAL_REPO,
                     resource_repo=self._resource_repo or _SHARED_RESOURCE_REPO,
-                    mem0_client=self._mem0_client or SHARED_MEM0_CLIENT,
+                    mem0_client=self._mem0_client,
                     qwen_client=self._qwen_client 
                 )
                 
 
+            # mem0 客户端首次使用时才创建；配置 warm_up 时在后台提前创建，避免首个请求承担冷启动
+            if self._mem0_client is None and config.get("warm_up", False):
+                warm_up_mem0_client(background=True)
+
             self.is_initialized = True
 
         except Exception as e:
@@ -74,8 +74,8 @@ class CommonTaskPlanning(ITaskPlanningCapability):
                 "main_intent": user_input,
                 "global_memory": memory_context or ""  # <--- 注入点
             }
-            final_plan = base_plan
-            # final_plan = self._expand_plan_with_dependencies(base_plan, context=expansion_context)
+            final_plan = self._normalize_dependencies(base_plan)
+            # final_plan = self._expand_plan_with_dependencies(final_plan, context=expansion_context)
             
             self.logger.info(f"Final plan generated with {len(final_plan)} steps (expanded from {len(base_plan)}).")
             return final_plan
@@ -136,6 +136,7 @@ class CommonTaskPlanning(ITaskPlanningCapability):
 3. **字段定义**：
    - `content`：**面向执行 Agent 的自然语言指令**，应完整、自包含，无需额外上下文即可理解。
    - `description`：**面向系统的简洁任务摘要**，说明“做什么”，不包含细节或引用。
+   - `depends_on`：本步骤依赖的前序 `step` 编号列表（需要用到其输出或必须在其之后执行）；与其他步骤无关时填 `[]`，互不依赖的步骤会被并行执行。
 4. **输出格式**：纯 JSON 列表，不要任何额外文本。
 
 ### ✅ 示例输出
@@ -145,14 +146,16 @@ class CommonTaskPlanning(ITaskPlanningCapability):
     "type": "AGENT",
     "executor": "doc_writer",
     "content": "根据用户历史偏好，撰写一份关于新功能的 Markdown 格式用户文档。",
-    "description": "生成用户文档"
+    "description": "生成用户文档",
+    "depends_on": []
   }},
   {{
     "step": 2,
     "type": "MCP",
     "executor": "dingtalk_bot",
     "content": "将上一步生成的 Markdown 文档通过钉钉发送给小张（用户常联系人）。",
-    "description": "钉钉通知"
+    "description": "钉钉通知",
+    "depends_on": [1]
   }}
 ]
 """
@@ -230,17 +233,20 @@ class CommonTaskPlanning(ITaskPlanningCapability):
 
         # Step 6: 按原始顺序构建最终计划
         final_plan = []
+        origins = []  # 与 final_plan 对应：每一项来源的原始步骤
         expanded_cache = set()  # 已加入 plan 的节点 ID
 
         for orig_step in base_plan:
             if orig_step.get("type") == "MCP":
                 final_plan.append(orig_step)
+                origins.append(orig_step)
             elif orig_step.get("type") == "AGENT":
                 executor = orig_step["executor"]
 
                 # 如果该 executor 本身不在图中（孤立节点），则直接保留
                 if executor not in global_dg:
                     final_plan.append(orig_step)
+                    origins.append(orig_step)
                     expanded_cache.add(executor)
                     continue
 
@@ -270,12 +276,97 @@ class CommonTaskPlanning(ITaskPlanningCapability):
                             "is_dependency_expanded": True,
                             "original_parent": executor
                         })
+                        origins.append(orig_step)
                 else:
                     # 所有依赖都已执行过，跳过（或保留原步骤？）
                     # 通常不会发生，但为安全起见，保留原步骤
                     final_plan.append(orig_step)
+                    origins.append(orig_step)
 
-        return self._reindex_steps(final_plan)
+        return self._remap_dependencies(final_plan, origins, global_dg)
+
+    def _normalize_dependencies(self, plan: List[Dict]) -> List[Dict]:
+        """
+        校验每个步骤的 depends_on：只保留指向更早步骤的编号，保证依赖图无环。
+        未给出 depends_on 的步骤保持原样，由执行方按串行顺序处理。
+
+        Args:
+            plan: 执行计划
+
+        Returns:
+            List[Dict]: 校验后的执行计划
+        """
+        steps = set()
+        for item in plan:
+            try:
+                steps.add(int(item.get("step", 0)))
+            except (TypeError, ValueError):
+                pass
+
+        for item in plan:
+            deps = item.get("depends_on")
+            if deps is None:
+                continue
+            if not isinstance(deps, list):
+                deps = [deps]
+            try:
+                step = int(item.get("step", 0))
+            except (TypeError, ValueError):
+                item.pop("depends_on", None)
+                continue
+            valid = []
+            for dep in deps:
+                try:
+                    dep = int(dep)
+                except (TypeError, ValueError):
+                    continue
+                if dep in steps and dep < step and dep not in valid:
+                    valid.append(dep)
+                elif dep != step:
+                    self.logger.warning(f"Dropping invalid dependency {dep} of step {step}")
+            item["depends_on"] = sorted(valid)
+        return plan
+
+    def _remap_dependencies(self, final_plan: List[Dict], origins: List[Dict], graph: nx.DiGraph) -> List[Dict]:
+        """
+        依赖扩充后重排 step，并把 depends_on 映射到新的编号：
+        - 原始步骤的依赖展开为这些原始步骤产生的全部新步骤；
+        - 扩充出的 Agent 节点额外依赖其在依赖图中已排在前面的前驱节点。
+        原始步骤未给出 depends_on 时保持缺省（串行）。
+
+        Args:
+            final_plan: 扩充后的执行计划
+            origins: 与 final_plan 一一对应的来源原始步骤
+            graph: 全局依赖图（边 u -> v 表示 v 依赖 u）
+
+        Returns:
+            List[Dict]: 重排后的执行计划
+        """
+        origin_steps = [orig.get("step") for orig in origins]
+        origin_deps = [orig.get("depends_on") for orig in origins]
+        self._reindex_steps(final_plan)
+
+        new_steps_by_origin: Dict[Any, List[int]] = {}
+        executor_step: Dict[str, int] = {}
+        for item, origin_step in zip(final_plan, origin_steps):
+            new_steps_by_origin.setdefault(origin_step, []).append(item["step"])
+            if item.get("is_dependency_expanded"):
+                executor_step[item["executor"]] = item["step"]
+
+        for item, deps in zip(final_plan, origin_deps):
+            if deps is None:
+                item.pop("depends_on", None)
+                continue
+            new_deps = set()
+            for dep in deps:
+                new_deps.update(new_steps_by_origin.get(dep, []))
+            if item.get("is_dependency_expanded") and item["executor"] in graph:
+                for pred in graph.predecessors(item["executor"]):
+                    pred_step = executor_step.get(pred)
+                    if pred_step is not None and pred_step < item["step"]:
+                        new_deps.add(pred_step)
+            item["depends_on"] = sorted(d for d in new_deps if d < item["step"])
+        return final_plan
 
 
     def _fetch_combined_subgraph(self, root_agent_ids: set, context: Dict) -> Tuple[List, List]:
@@ -6,10 +6,11 @@
 - 调用内部能力函数
 - 返回执行结果
 """
-from typing import Dict, Any, Optional, List, Union
-from thespian.actors import Actor
+from typing import Dict, Any, Optional, List, Union, Callable
+from concurrent.futures import Future
+from datetime import timedelta
+from thespian.actors import Actor, WakeupMessage
 import logging
-from typing import Dict, Any, Optional, List, Union
 
 from common.messages.task_messages import ExecuteTaskMessage, ExecutionResultMessage
 from capabilities import get_capability
@@ -29,6 +30,9 @@ class ExecutionActor(Actor):
     """
     ⑪ 具体执行器
     负责实际调用外部系统和内部函数
+
+    连接器调用通过 execution 能力的 submit() 提交：启用工作线程池时调用在工作线程中执行，
+    Actor 不再阻塞在网络 I/O 上，而是通过 WakeupMessage 定期收取已完成的结果并回复。
     """
 
     def __init__(self):
@@ -42,6 +46,9 @@ class ExecutionActor(Actor):
         self.reply_to=None
         self.global_context:Dict[str, Any] = {}
         self.enriched_context:Dict[str, Any] = {}
+        # 在工作线程中执行的调用：task_id -> {future, handler, on_error, reply_to, trace_id, task_path}
+        self._inflight: Dict[str, Dict[str, Any]] = {}
+        self._wakeup_scheduled = False
 
     def receiveMessage(self, msg: Any, sender: str) -> None:
         """
@@ -55,6 +62,10 @@ class ExecutionActor(Actor):
             if isinstance(msg, ExecuteTaskMessage):
                 # 处理执行任务消息
                 self._handle_execute_message(msg, sender)
+            elif isinstance(msg, WakeupMessage):
+                # 收取工作线程中已完成的连接器调用
+                self._wakeup_scheduled = False
+                self._collect_finished()
             else:
                 self.logger.warning(f"Unknown message format: {type(msg)}")
                 # 如果不是预期的消息类型，不处理
@@ -222,30 +233,38 @@ class ExecutionActor(Actor):
                 "enriched_context": self.enriched_context,
             }
 
-            result = self._excution.execute(
+            future = self._excution.submit(
                 connector_name="dify",
                 inputs=inputs,
                 params=params
             )
-
-            status = result.get("status")
-            if status == "NEED_INPUT":
-                missing_params = result["missing"]
-                missing_params_descriptions = [str({"name": k, "description": v}) for k, v in missing_params.items()]
-                completed_params = result["completed"]
-                self._send_missing_parameters(task_id, missing_params_descriptions, completed_params, reply_to)
-            elif status == "SUCCESS":
-                self._send_success(task_id, result["result"], reply_to)
-            elif status == "FAILURE":
-                self._send_failure(task_id, result["error"], reply_to)
-            elif status == "ERROR":
-                self._send_error(task_id, result["error"], reply_to)
-            else:
-                self._send_error(task_id, f"Unknown status from connector: {status}", reply_to)
+            self._track(task_id, future, self._handle_dify_result, self._handle_dify_error, reply_to)
 
         except Exception as e:
-            self.logger.exception(f"Dify execution failed: {e}")
-            self._send_error(task_id, str(e), reply_to)
+            self._handle_dify_error(task_id, e, reply_to)
+
+    def _handle_dify_result(self, task_id: str, result: Dict[str, Any], reply_to: str) -> None:
+        """
+        处理 Dify 连接器的返回结果
+        """
+        status = result.get("status")
+        if status == "NEED_INPUT":
+            missing_params = result["missing"]
+            missing_params_descriptions = [str({"name": k, "description": v}) for k, v in missing_params.items()]
+            completed_params = result["completed"]
+            self._send_missing_parameters(task_id, missing_params_descriptions, completed_params, reply_to)
+        elif status == "SUCCESS":
+            self._send_success(task_id, result["result"], reply_to)
+        elif status == "FAILURE":
+            self._send_failure(task_id, result["error"], reply_to)
+        elif status == "ERROR":
+            self._send_error(task_id, result["error"], reply_to)
+        else:
+            self._send_error(task_id, f"Unknown status from connector: {status}", reply_to)
+
+    def _handle_dify_error(self, task_id: str, error: Exception, reply_to: str) -> None:
+        self.logger.exception(f"Dify execution failed: {error}")
+        self._send_error(task_id, str(error), reply_to)
 
     def _execute_http(self, task_id: str, running_config: Dict[str, Any], reply_to: str) -> None:
         """
@@ -267,40 +286,128 @@ class ExecutionActor(Actor):
             inputs = running_config.get("inputs", {})
 
             # 执行 HTTP 请求
-            result = self._excution.execute(
+            future = self._excution.submit(
                 connector_name="http",
                 inputs=inputs,
                 params=running_config  # 整个 running_config 作为 params 传入
             )
+            self._track(task_id, future, self._handle_http_result, self._handle_http_error, reply_to)
 
-            # 检查返回状态
-            status = result.get("status")
+        except Exception as e:
+            self._handle_http_error(task_id, e, reply_to)
 
-            if status == "NEED_INPUT":
-                # 缺少必填参数
-                missing = result.get("missing", {})
-                completed = result.get("completed", {})
-                # 将 missing dict 转换为描述列表
+    def _handle_http_result(self, task_id: str, result: Dict[str, Any], reply_to: str) -> None:
+        """
+        处理 HTTP 连接器的返回结果
+        """
+        # 检查返回状态
+        status = result.get("status")
+
+        if status == "NEED_INPUT":
+            # 缺少必填参数
+            missing = result.get("missing", {})
+            completed = result.get("completed", {})
+            # 将 missing dict 转换为描述列表
+            missing_list = [f"{k}: {v}" for k, v in missing.items()] if isinstance(missing, dict) else missing
+            self._send_missing_parameters(task_id, missing_list, completed, reply_to)
+        elif status == "SUCCESS":
+            self._send_success(task_id, result.get("result", result), reply_to)
+        elif status == "ERROR":
+            self._send_error(task_id, result.get("error", "Unknown error"), reply_to)
+        else:
+            # 没有明确状态，视为成功（兼容旧格式）
+            exec_result = result.get("result", result)
+            if isinstance(exec_result, dict) and exec_result.get("status") == "NEED_INPUT":
+                missing = exec_result.get("missing", {})
+                completed = exec_result.get("completed", {})
                 missing_list = [f"{k}: {v}" for k, v in missing.items()] if isinstance(missing, dict) else missing
                 self._send_missing_parameters(task_id, missing_list, completed, reply_to)
-            elif status == "SUCCESS":
-                self._send_success(task_id, result.get("result", result), reply_to)
-            elif status == "ERROR":
-                self._send_error(task_id, result.get("error", "Unknown error"), reply_to)
             else:
-                # 没有明确状态，视为成功（兼容旧格式）
-                exec_result = result.get("result", result)
-                if isinstance(exec_result, dict) and exec_result.get("status") == "NEED_INPUT":
-                    missing = exec_result.get("missing", {})
-                    completed = exec_result.get("completed", {})
-                    missing_list = [f"{k}: {v}" for k, v in missing.items()] if isinstance(missing, dict) else missing
-                    self._send_missing_parameters(task_id, missing_list, completed, reply_to)
-                else:
-                    self._send_success(task_id, exec_result, reply_to)
+                self._send_success(task_id, exec_result, reply_to)
+
+    def _handle_http_error(self, task_id: str, error: Exception, reply_to: str) -> None:
+        self.logger.error(f"HTTP request failed: {error}")
+        self._send_error(task_id, f"HTTP request failed: {str(error)}", reply_to)
+
+    def _track(
+        self,
+        task_id: str,
+        future: Future,
+        handler: Callable[[str, Dict[str, Any], str], None],
+        on_error: Callable[[str, Exception, str], None],
+        reply_to: str
+    ) -> None:
+        """
+        跟踪一次连接器调用：已完成（同步执行）时立即处理，否则登记后等待 WakeupMessage 收取
+
+        Args:
+            task_id: 任务ID
+            future: submit() 返回的 Future
+            handler: 结果处理函数
+            on_error: 异常处理函数
+            reply_to: 回复地址
+        """
+        if future.done():
+            self._finish(task_id, future, handler, on_error, reply_to)
+            return
 
+        self._inflight[task_id] = {
+            "future": future,
+            "handler": handler,
+            "on_error": on_error,
+            "reply_to": reply_to,
+            "trace_id": self.trace_id,
+            "task_path": self.task_path,
+        }
+        stats_fn = getattr(self._excution, "get_worker_pool_stats", None)
+        if stats_fn:
+            self.logger.info(
+                f"Task {task_id} submitted to worker pool "
+                f"(in flight: {len(self._inflight)}, queue depth: {stats_fn().get('queue_depth', 0)})"
+            )
+        self._schedule_wakeup()
+
+    def _schedule_wakeup(self) -> None:
+        if self._wakeup_scheduled:
+            return
+        interval = getattr(self._excution, "result_poll_interval", 0.05)
+        self.wakeupAfter(timedelta(seconds=interval))
+        self._wakeup_scheduled = True
+
+    def _collect_finished(self) -> None:
+        """
+        处理所有已完成的调用，仍有在途调用时继续安排下一次收取
+        """
+        for task_id, info in list(self._inflight.items()):
+            if not info["future"].done():
+                continue
+            del self._inflight[task_id]
+            # 回复消息使用该任务自己的 trace_id / task_path
+            self.task_id = task_id
+            self.trace_id = info["trace_id"]
+            self.task_path = info["task_path"]
+            self._finish(task_id, info["future"], info["handler"], info["on_error"], info["reply_to"])
+
+        if self._inflight:
+            self._schedule_wakeup()
+
+    def _finish(
+        self,
+        task_id: str,
+        future: Future,
+        handler: Callable[[str, Dict[str, Any], str], None],
+        on_error: Callable[[str, Exception, str], None],
+        reply_to: str
+    ) -> None:
+        try:
+            result = future.result()
+        except Exception as e:
+            on_error(task_id, e, reply_to)
+            return
+        try:
+            handler(task_id, result, reply_to)
         except Exception as e:
-            self.logger.error(f"HTTP request failed: {e}")
-            self._send_error(task_id, f"HTTP request failed: {str(e)}", reply_to)
+            on_error(task_id, e, reply_to)
     
     
     
@@ -1,5 +1,5 @@
 # capability_actors/task_group_aggregator_actor.py
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Set
 from thespian.actors import Actor, ActorExitRequest,ChildActorExited
 import uuid
 import time
@@ -26,6 +26,11 @@ from .parallel_task_aggregator_actor import ParallelTaskAggregatorActor
 from .result_aggregator_actor import ResultAggregatorActor
 from .mcp_actor import MCPCapabilityActor
 
+try:
+    from config import TASK_GROUP_MAX_PARALLEL_STEPS
+except ImportError:
+    TASK_GROUP_MAX_PARALLEL_STEPS = 4
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -37,8 +42,9 @@ class TaskGroupAggregatorActor(Actor):
     任务组聚合器Actor (Workflow Orchestrator)
     
     核心职责：
-    1. 串行编排：严格按 Step 顺序执行。
-    2. 数据流转：自动将上一步结果注入 Context，供下一步使用。
+    1. 依赖编排：按 TaskSpec.depends_on 构成的 DAG 执行，依赖全部完成的步骤同时下发
+       （最多 TASK_GROUP_MAX_PARALLEL_STEPS 个）；未声明 depends_on 的步骤依赖上一步，保持串行。
+    2. 数据流转：自动将已完成步骤的结果注入 Context，供后续步骤使用。
     3. 动态路由：
        - is_parallel=True -> ParallelTaskAggregatorActor (生成多个方案/优化)
        - Type=AGENT -> ResultAggregatorActor (重试与监管)
@@ -50,7 +56,15 @@ class TaskGroupAggregatorActor(Actor):
         # 流程控制
         self.request_msg: Optional[TaskGroupRequest] = None
         self.sorted_subtasks: List[TaskSpec] = []
-        self.current_step_index: int = 0
+        self.current_step_index: int = 0  # 已完成的步骤数
+        # 依赖调度（以 sorted_subtasks 下标标识步骤）
+        self.max_parallel_steps: int = TASK_GROUP_MAX_PARALLEL_STEPS
+        self._step_deps: Dict[int, Set[int]] = {}
+        self._completed_steps: Set[int] = set()
+        self._dispatched_steps: Set[int] = set()
+        self._running: Dict[Any, int] = {}  # worker 地址 -> 步骤下标
+        self._failed_step: Optional[int] = None
+        self._finished: bool = False
         self.current_user_id=None
         # 数据上下文 - 统一上下文传播与富集方案
         self.step_results: Dict[str, Any] = {}  # step_id -> result
@@ -89,10 +103,14 @@ class TaskGroupAggregatorActor(Actor):
 
             # 2. 处理标准对象类型的完成消息 (来自 ResultAggregator 或 MCP)
             elif isinstance(msg, TaskCompletedMessage):
+                if self._finished:
+                    # 工作流已结束（例如其他步骤已失败），忽略迟到的结果
+                    logger.info(f"Ignoring late completion from {sender}, workflow already finished.")
+                    return
                 # 检查 status 属性判断任务是否成功
                 if msg.status in ["SUCCESS"]:
                     result_data = msg.result
-                    self._handle_step_success(result_data, sender)
+                    self._handle_step_success(result_data, sender, msg)
                 elif msg.status in ["FAILED", "ERROR", "CANCELLED"]:
                     # 处理失败情况
                     self._handle_step_failure(msg, sender)
@@ -180,9 +198,47 @@ class TaskGroupAggregatorActor(Actor):
             key=lambda x: x.step
         )
         self.current_step_index = 0
+        self._step_deps = self._build_step_dependencies(self.sorted_subtasks)
+        self._completed_steps = set()
+        self._dispatched_steps = set()
+        self._running = {}
+        self._finished = False
         
-        # 执行第一步
-        self._execute_next_step()
+        # 下发所有无依赖的步骤
+        self._dispatch_ready_steps()
+
+    @staticmethod
+    def _build_step_dependencies(subtasks: List[TaskSpec]) -> Dict[int, Set[int]]:
+        """
+        根据 depends_on 构建步骤依赖（以 subtasks 下标表示）
+
+        - depends_on 为 None：依赖排序后的上一步（与原串行行为一致）
+        - 只接受指向更小 step 的依赖，保证无环
+
+        Args:
+            subtasks: 按 step 排序后的子任务
+
+        Returns:
+            Dict[int, Set[int]]: 步骤下标 -> 依赖的步骤下标集合
+        """
+        indices_by_step: Dict[int, List[int]] = {}
+        for index, task in enumerate(subtasks):
+            indices_by_step.setdefault(task.step, []).append(index)
+
+        deps: Dict[int, Set[int]] = {}
+        for index, task in enumerate(subtasks):
+            depends_on = getattr(task, "depends_on", None)
+            if depends_on is None:
+                deps[index] = {index - 1} if index > 0 else set()
+                continue
+            required = set()
+            for dep_step in depends_on:
+                if dep_step >= task.step or dep_step not in indices_by_step:
+                    logger.warning(f"Step {task.step}: ignoring invalid dependency on step {dep_step}")
+                    continue
+                required.update(indices_by_step[dep_step])
+            deps[index] = required
+        return deps
 
     @staticmethod
     def _extract_root_agent_id(task_path: Optional[str]) -> str:
@@ -192,24 +248,44 @@ class TaskGroupAggregatorActor(Actor):
         return parts[0] if parts else ""
 
 
-    def _has_current_step(self) -> bool:
-        """判断是否还有未执行的步骤"""
-        return 0 <= self.current_step_index < len(self.sorted_subtasks)
-
-    def _get_current_step(self) -> TaskSpec:
-        """安全获取当前步骤的 TaskSpec"""
-        if not self._has_current_step():
-            raise IndexError("No current step available")
-        return self.sorted_subtasks[self.current_step_index]
-    
-
-
-    def _execute_next_step(self) -> None:
-        if not self._has_current_step():
+    def _dispatch_ready_steps(self) -> None:
+        """
+        下发所有依赖已完成的步骤，同时运行的步骤数不超过 max_parallel_steps；
+        全部步骤完成后结束工作流
+        """
+        if self._finished:
+            return
+        if len(self._completed_steps) == len(self.sorted_subtasks):
             self._finish_workflow()
             return
 
-        current_task: TaskSpec = self._get_current_step()
+        for index, task in enumerate(self.sorted_subtasks):
+            if len(self._running) >= max(self.max_parallel_steps, 1):
+                break
+            if index in self._dispatched_steps:
+                continue
+            if not self._step_deps.get(index, set()) <= self._completed_steps:
+                continue
+            self._dispatched_steps.add(index)
+            self._execute_step(index, task)
+
+    def _find_running_step(self, sender: Actor, msg: TaskCompletedMessage) -> Optional[int]:
+        """
+        根据回复来源定位对应的步骤下标（优先按 worker 地址，其次按 task_id）
+        """
+        if sender in self._running:
+            return self._running.pop(sender)
+        task_id = getattr(msg, "task_id", None)
+        for worker, index in list(self._running.items()):
+            if task_id and self.sorted_subtasks[index].task_id == task_id:
+                del self._running[worker]
+                return index
+        if len(self._running) == 1:
+            _, index = self._running.popitem()
+            return index
+        return None
+
+    def _execute_step(self, index: int, current_task: TaskSpec) -> None:
         logger.info(f"Executing Step {current_task.step}: '{current_task.description}' (type={current_task.type})")
         
         # 发布任务步骤执行事件
@@ -251,6 +327,9 @@ class TaskGroupAggregatorActor(Actor):
                 logger.warning(f"Unknown type {task_type}, defaulting to MCP.")
                 self._dispatch_to_mcp_executor(current_task)
 
+        # 记录 worker -> 步骤，用于把回复对应到步骤
+        self._running[self.current_worker] = index
+
     def _dispatch_to_parallel_optimizer(self, task: TaskSpec) -> None:
         """
         分发给 ParallelTaskAggregatorActor
@@ -331,9 +410,13 @@ class TaskGroupAggregatorActor(Actor):
 
 
 
-    def _handle_step_success(self, result: Any, sender: Actor) -> None:
+    def _handle_step_success(self, result: Any, sender: Actor, msg: TaskCompletedMessage = None) -> None:
         """通用步骤成功回调"""
-        current_task = self._get_current_step()
+        index = self._find_running_step(sender, msg)
+        if index is None:
+            logger.warning(f"Received completion from unknown worker {sender}, ignoring.")
+            return
+        current_task = self.sorted_subtasks[index]
         step = current_task.step
         logger.info(f"Step {step} succeeded.")
 
@@ -374,9 +457,10 @@ class TaskGroupAggregatorActor(Actor):
         
         self._enrich_context_from_result(result, task_path_key,source=str(sender),task_path=self._task_path)
         
-        # 3. 推进
-        self.current_step_index += 1
-        self._execute_next_step()
+        # 3. 推进：释放依赖该步骤的后续步骤
+        self._completed_steps.add(index)
+        self.current_step_index = len(self._completed_steps)
+        self._dispatch_ready_steps()
 
     def _enrich_context_from_result(self, result: Any, prefix: str, source: str = "tool_output", task_path: str = "") -> None:
         """
@@ -413,9 +497,11 @@ class TaskGroupAggregatorActor(Actor):
 
 
     def _handle_step_failure(self, msg: TaskCompletedMessage, sender: Actor) -> None:
-        """通用步骤失败回调"""
-        if self._has_current_step():
-            current_task = self._get_current_step()
+        """通用步骤失败回调：任一步骤失败即终止整个工作流"""
+        index = self._find_running_step(sender, msg)
+        if index is not None:
+            current_task = self.sorted_subtasks[index]
+            self._failed_step = current_task.step
             # 从 TaskCompletedMessage 中提取错误信息
             error_msg = f"Step {current_task} failed with status: {msg.status}"
             if hasattr(msg, 'error') and msg.error:
@@ -487,6 +573,7 @@ class TaskGroupAggregatorActor(Actor):
             step=None,
         )
         
+        self._finished = True
         target = self.source 
         self.send(target, final_msg)
         self.send(self.myAddress, ActorExitRequest())
@@ -513,7 +600,8 @@ class TaskGroupAggregatorActor(Actor):
         #     error=error_msg
         # )
         
-        current_step = self._get_current_step().step if self._has_current_step() else None
+        self._finished = True
+        current_step = self._failed_step
         fail_msg = TaskCompletedMessage(
             message_type=MessageType.TASK_COMPLETED,
             status="FAILED",
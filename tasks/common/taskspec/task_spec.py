@@ -74,7 +74,7 @@
 
 
 """任务规范定义"""
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from pydantic import BaseModel, Field, ConfigDict
 
 
@@ -146,5 +146,7 @@ class TaskSpec(BaseModel):
     strategy_reasoning: str = ""
     is_dependency_expanded: bool = False
     original_parent: Optional[str] = None
+    # 依赖的前序 step 编号；None 表示未声明，按串行顺序依赖上一步
+    depends_on: Optional[List[int]] = None
 
 
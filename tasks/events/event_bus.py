@@ -3,6 +3,7 @@
  - 对外提供同步接口（如 publish_task_event） 
  - 内部通过后台线程 + asyncio loop 异步发送 HTTP 请求 
  - 支持缓冲、重试、解耦 
+ - 状态事件按批量合并上报，队列满时对入队方施加背压 
  - 队列可未来替换为 Redis（只需改 queue 实现） 
  """
 
@@ -42,7 +43,7 @@ class QueuedEvent:
 class EventPublisher: 
     """ 
     轻量级事件发布 SDK 
-    - 同步方法仅入队，非阻塞 
+    - 同步方法仅入队，队列未满时不阻塞 
     - 后台线程异步消费并发送 HTTP 请求 
     """
 
@@ -52,11 +53,34 @@ class EventPublisher:
         logger: Optional[logging.Logger] = None, 
         max_queue_size: int = 10_000, 
         shutdown_timeout: float = 5.0, 
+        batch_size: int = 100,
+        linger: float = 0.05,
+        enqueue_timeout: Optional[float] = 30.0,
+        max_connections: int = 10,
+        request_timeout: float = 10.0,
     ): 
-        """初始化事件总线""" 
+        """
+        初始化事件总线
+
+        Args:
+            lifecycle_base_url: Lifecycle 服务地址
+            logger: 日志对象
+            max_queue_size: 队列容量，写满后入队方阻塞等待（背压）
+            shutdown_timeout: 关闭时等待后台线程结束的秒数
+            batch_size: 单次批量上报的最大事件数
+            linger: 凑批的最长等待时间（秒），到时即使未满也发送
+            enqueue_timeout: 队列满时入队的最长阻塞时间（秒），None 表示一直等待
+            max_connections: HTTP 连接池大小
+            request_timeout: 单次 HTTP 请求超时（秒）
+        """
         self.base_url = lifecycle_base_url.rstrip("/") 
         self.log = logger or logging.getLogger(f"{__name__}.{self.__class__.__name__}") 
         self.shutdown_timeout = shutdown_timeout 
+        self.batch_size = max(1, batch_size)
+        self.linger = linger
+        self.enqueue_timeout = enqueue_timeout
+        self.max_connections = max_connections
+        self.request_timeout = request_timeout
 
         # 内存队列（未来可替换为 RedisQueue） 
         self._queue: queue.Queue[QueuedEvent] = queue.Queue(maxsize=max_queue_size) 
@@ -89,40 +113,97 @@ class EventPublisher:
         self._running.wait()  # 等待 loop 就绪 
 
     async def _consume_queue(self): 
-        """异步消费队列中的事件""" 
-        client = httpx.AsyncClient(timeout=10.0) 
+        """
+        异步消费队列中的事件
+        - 连续的 TASK_EVENT 按 batch_size / linger 合并为一批，走批量接口
+        - SPLIT_REQUEST 单独发送；遇到时先把已攒的批次发出，保证事件顺序
+        """
+        client = httpx.AsyncClient(
+            timeout=self.request_timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+        )
+        loop = asyncio.get_running_loop()
+        pending: Optional[QueuedEvent] = None
         try: 
             while True: 
-                try: 
-                    # 使用 asyncio 的方式从 queue 中取（需包装） 
-                    item = await asyncio.get_event_loop().run_in_executor(None, self._queue.get, True, 1.0) 
-                    if item is None:  # 用于触发退出 
-                        break 
-                except queue.Empty: 
-                    continue 
-
-                try: 
-                    if item.event_type == EventType.TASK_EVENT: 
-                        await self._send_event_request_internal(client, item.payload) 
-                    elif item.event_type == EventType.SPLIT_REQUEST: 
-                        await self._send_split_request_internal(client, item.payload) 
-                    self._queue.task_done() 
-                except Exception as e: 
-                    self.log.error(f"Failed to process queued event: {e}", exc_info=True) 
-                    # 重试机制 
-                    if item.retry_count < item.max_retries: 
-                        item.retry_count += 1 
-                        delay = (2 ** item.retry_count) * 0.5  # 指数退避 
-                        await asyncio.sleep(delay) 
-                        self._queue.put_nowait(item) 
-                    else: 
-                        self.log.error(f"Event dropped after {item.max_retries} retries: {item.payload}") 
-                        self._queue.task_done() 
+                if pending is not None:
+                    item, pending = pending, None
+                else:
+                    try: 
+                        # 使用 asyncio 的方式从 queue 中取（需包装） 
+                        item = await loop.run_in_executor(None, self._queue.get, True, 1.0) 
+                    except queue.Empty: 
+                        continue 
+                if item is None:  # 用于触发退出 
+                    break 
+
+                if item.event_type == EventType.SPLIT_REQUEST:
+                    await self._deliver(client, [item], self._send_split_request_internal, item.payload)
+                    continue
+
+                batch = [item]
+                stopping = False
+                deadline = time.monotonic() + self.linger
+                while len(batch) < self.batch_size:
+                    try:
+                        nxt = self._queue.get_nowait()
+                    except queue.Empty:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        try:
+                            nxt = await loop.run_in_executor(None, self._queue.get, True, remaining)
+                        except queue.Empty:
+                            break
+                    if nxt is None:
+                        stopping = True
+                        break
+                    if nxt.event_type != EventType.TASK_EVENT:
+                        pending = nxt
+                        break
+                    batch.append(nxt)
+
+                await self._deliver(client, batch, self._send_event_batch_internal, [e.payload for e in batch])
+                if stopping:
+                    break
         except asyncio.CancelledError: 
             pass 
         finally: 
             await client.aclose() 
 
+    async def _deliver(self, client: httpx.AsyncClient, items: List[QueuedEvent], sender, payload) -> None:
+        """
+        发送一次请求，失败时原地指数退避重试（不重新入队，避免打乱顺序或在满队列上阻塞消费者）
+
+        Args:
+            client: 共享的 HTTP 客户端
+            items: 本次请求对应的队列元素
+            sender: 实际发送的协程函数
+            payload: 传给 sender 的请求数据；重试时传入同一个对象，sender 可移除已送达的部分
+        """
+        max_retries = max(item.max_retries for item in items)
+        try:
+            while True:
+                try:
+                    await sender(client, payload)
+                    return
+                except Exception as e:
+                    retry_count = items[0].retry_count
+                    if retry_count >= max_retries:
+                        self.log.error(f"{len(items)} event(s) dropped after {max_retries} retries: {e}")
+                        return
+                    for item in items:
+                        item.retry_count += 1
+                    delay = (2 ** (retry_count + 1)) * 0.5  # 指数退避 
+                    self.log.warning(f"Event delivery failed ({e}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+        finally:
+            for _ in items:
+                self._queue.task_done()
+
     # ======================== 
     # 内部 async 方法（仅供后台使用） 
     # ======================== 
@@ -165,6 +246,25 @@ class EventPublisher:
             self.log.error(f"Failed to send event: {str(e)}") 
             raise 
 
+    async def _send_event_batch_internal(self, client: httpx.AsyncClient, payloads: List[Dict]):
+        """
+        批量通道：一次请求上报多条状态事件（服务端在同一事务中按序应用）
+        - 429 / 网关类错误抛出，由 _deliver 退避后整批重发
+        - 其余 4xx/5xx 多为个别事件本身的问题，退回逐条发送，避免一条坏数据拖累整批
+        - 逐条发送时每成功一条就从 payloads 中移除（原地修改），中途失败由 _deliver 重试时只会重发剩余的事件
+        """
+        url = f"{self.base_url}/api/v1/traces/events/batch"
+        resp = await client.post(url, json={"events": self.serialize_payload(payloads)})
+        if resp.status_code in (429, 502, 503, 504):
+            raise RuntimeError(f"Batch event report throttled: {resp.status_code} - {resp.text}")
+        if resp.status_code >= 400:
+            self.log.warning(f"Batch event report failed: {resp.status_code} - {resp.text}, falling back to single events")
+            while payloads:
+                await self._send_event_request_internal(client, payloads[0])
+                payloads.pop(0)
+            return
+        self.log.debug(f"Lifecycle events sent in batch: {len(payloads)}")
+
     # ======================== 
     # 同步入口（对外 API） 
     # ======================== 
@@ -249,11 +349,18 @@ class EventPublisher:
             self.log.error(f"Failed to enqueue event: {e}", exc_info=True) 
 
     def _enqueue(self, event: QueuedEvent): 
-        """安全入队，丢弃策略：如果队列满则记录警告并丢弃""" 
+        """
+        入队；队列满时阻塞调用方（背压），最多等待 enqueue_timeout 秒，超时仍满才丢弃
+        """
         try: 
             self._queue.put_nowait(event) 
+            return
         except queue.Full: 
-            self.log.warning("Event queue is full. Dropping event.") 
+            self.log.warning("Event queue is full, waiting for the consumer to catch up.")
+        try:
+            self._queue.put(event, timeout=self.enqueue_timeout)
+        except queue.Full:
+            self.log.error(f"Event queue still full after {self.enqueue_timeout}s. Dropping event.")
 
     # ======================== 
     # 保留原有 async 接口（供内部或测试使用） 
@@ -17,6 +17,9 @@ REDIS_PASSWORD='your-redis-password'
 
 MAX_TASK_DURATION = 300
 
+# TaskGroupAggregatorActor 同时执行的最大步骤数（互不依赖的步骤并行执行）
+TASK_GROUP_MAX_PARALLEL_STEPS = 4
+
 # DashScope (Qwen)
 DASHSCOPE_API_KEY = os.getenv("DASHSCOPE_API_KEY")
 
@@ -112,6 +115,22 @@ MEM0_CONFIG = {
 
 env = os.getenv("ENV", "dev")
 MEMORY_CONFIG ={}
+
+# UnifiedMemoryManager 并行检索：每类记忆的超时（秒），超时的来源按空结果处理
+MEMORY_RETRIEVAL_TIMEOUTS = {
+    "core": 2.0,
+    "episodic": 3.0,
+    "semantic": 3.0,
+    "procedural": 2.0,
+    "resource": 3.0,
+}
+
+# UnifiedMemoryManager 快速路径
+MEMORY_FAST_PLAN_MAX_CHARS = 6       # 不超过该长度的输入只检索核心记忆，不调用 LLM 生成检索计划
+MEMORY_SYNTHESIS_MIN_CHARS = 300     # 记忆片段总长度不超过该值时直接拼接返回，不调用 LLM 合成
+MEMORY_CONTEXT_CACHE_TTL = 30        # 检索计划与合成上下文的缓存时间（秒）
+CORE_MEMORY_CACHE_SIZE = 1000        # 核心记忆缓存的最大用户数（LRU 淘汰）
+CORE_MEMORY_CACHE_TTL = 300          # 核心记忆缓存时间（秒），写入核心记忆时立即失效
 # 日志配置
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 if env == "prod":
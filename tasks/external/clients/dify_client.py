@@ -8,17 +8,19 @@ class DifyClient:
     Dify API客户端，负责与Dify API进行交互
     """
     
-    def __init__(self, api_key: str, base_url: str = "https://api.dify.ai/v1"):
+    def __init__(self, api_key: str, base_url: str = "https://api.dify.ai/v1", http_client: Optional[HttpClient] = None):
         """
         初始化Dify客户端
         
         Args:
             api_key: Dify API密钥
             base_url: Dify API基础URL
+            http_client: 共享的HTTP客户端（可选），为空时创建自有客户端
         """
         self.api_key = api_key
         self.base_url = base_url
-        self.http_client = HttpClient()
+        self._owns_http_client = http_client is None
+        self.http_client = http_client or HttpClient()
         self.headers = {
             'Authorization': f'Bearer {self.api_key}',
             'Content-Type': 'application/json'
@@ -42,7 +44,8 @@ class DifyClient:
         }
         
         url = f"{self.base_url}/chat-messages"
-        response = self.http_client.post(url, json=payload, headers=self.headers)
+        # 发送消息会触发一次运行，不自动重试
+        response = self.http_client.post(url, json=payload, headers=self.headers, retry=False)
         
         if response.status_code == 200:
             return response.json()
@@ -65,6 +68,7 @@ class DifyClient:
     
     def close(self) -> None:
         """
-        关闭HTTP客户端
+        关闭HTTP客户端（共享客户端由其持有者负责关闭）
         """
-        self.http_client.close()
+        if self._owns_http_client:
+            self.http_client.close()
@@ -8,88 +8,175 @@ from typing import Dict, Any, Optional
 class HttpClient:
     """
     通用HTTP客户端，带有重试机制
+
+    底层的 requests.Session 维护按主机划分的 keep-alive 连接池，
+    同一个客户端实例可在多个线程间共享复用，避免每次请求重新建立 DNS/TCP/TLS 连接。
+    非幂等请求（如触发工作流运行）可传 retry=False，走不带重试的连接池，避免被重复执行。
     """
-    
-    def __init__(self, retry_count: int = 3, backoff_factor: float = 0.5):
+
+    def __init__(
+        self,
+        retry_count: int = 3,
+        backoff_factor: float = 0.5,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        timeout: Optional[float] = None
+    ):
         """
         初始化HTTP客户端
-        
+
         Args:
             retry_count: 重试次数
             backoff_factor: 重试退避因子
+            pool_connections: 缓存的主机连接池数量
+            pool_maxsize: 每个主机连接池保持的最大连接数
+            timeout: 默认请求超时（秒），单次请求可覆盖；None 表示不超时
         """
+        self.timeout = timeout
         self.session = requests.Session()
-        
-        # 配置重试策略
+
+        # 配置重试策略；重试耗尽后返回最后一次响应，由调用方按状态码处理
         retry_strategy = Retry(
             total=retry_count,
             status_forcelist=[429, 500, 502, 503, 504],
             backoff_factor=backoff_factor,
-            allowed_methods=["HEAD", "GET", "PUT", "DELETE", "OPTIONS", "TRACE", "POST"]
+            allowed_methods=["HEAD", "GET", "PUT", "DELETE", "OPTIONS", "TRACE", "POST"],
+            raise_on_status=False
+        )
+
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry_strategy
         )
-        
-        adapter = HTTPAdapter(max_retries=retry_strategy)
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
-    
-    def get(self, url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+
+        # 不重试的会话：连接错误、读超时和 5xx 都直接交给调用方处理
+        self._once_session = requests.Session()
+        once_adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=0
+        )
+        self._once_session.mount("http://", once_adapter)
+        self._once_session.mount("https://", once_adapter)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        timeout: Optional[float] = None,
+        retry: bool = True,
+        **kwargs
+    ) -> requests.Response:
+        """
+        发送任意方法的请求
+
+        Args:
+            method: HTTP 方法
+            url: 请求URL
+            timeout: 请求超时（秒），默认使用客户端配置
+            retry: 是否按重试策略重试；非幂等请求应传 False
+            **kwargs: 透传给 requests.Session.request 的参数
+
+        Returns:
+            requests.Response: 响应对象
+        """
+        if timeout is None:
+            timeout = self.timeout
+        session = self.session if retry else self._once_session
+        return session.request(method, url, timeout=timeout, **kwargs)
+
+    def get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None
+    ) -> requests.Response:
         """
         发送GET请求
-        
+
         Args:
             url: 请求URL
             params: 查询参数
             headers: 请求头
-            
+            timeout: 请求超时（秒）
+
         Returns:
             requests.Response: 响应对象
         """
-        return self.session.get(url, params=params, headers=headers)
-    
-    def post(self, url: str, json: Optional[Dict[str, Any]] = None, data: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        return self.request("GET", url, params=params, headers=headers, timeout=timeout)
+
+    def post(
+        self,
+        url: str,
+        json: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        retry: bool = True
+    ) -> requests.Response:
         """
         发送POST请求
-        
+
         Args:
             url: 请求URL
             json: JSON请求体
             data: 表单数据
             headers: 请求头
-            
+            timeout: 请求超时（秒）
+            retry: 是否按重试策略重试；非幂等请求应传 False
+
         Returns:
             requests.Response: 响应对象
         """
-        return self.session.post(url, json=json, data=data, headers=headers)
-    
-    def put(self, url: str, json: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        return self.request("POST", url, json=json, data=data, headers=headers, timeout=timeout, retry=retry)
+
+    def put(
+        self,
+        url: str,
+        json: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None
+    ) -> requests.Response:
         """
         发送PUT请求
-        
+
         Args:
             url: 请求URL
             json: JSON请求体
             headers: 请求头
-            
+            timeout: 请求超时（秒）
+
         Returns:
             requests.Response: 响应对象
         """
-        return self.session.put(url, json=json, headers=headers)
-    
-    def delete(self, url: str, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        return self.request("PUT", url, json=json, headers=headers, timeout=timeout)
+
+    def delete(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None
+    ) -> requests.Response:
         """
         发送DELETE请求
-        
+
         Args:
             url: 请求URL
             headers: 请求头
-            
+            timeout: 请求超时（秒）
+
         Returns:
             requests.Response: 响应对象
         """
-        return self.session.delete(url, headers=headers)
-    
+        return self.request("DELETE", url, headers=headers, timeout=timeout)
+
     def close(self) -> None:
         """
         关闭HTTP会话
         """
         self.session.close()
+        self._once_session.close()
@@ -1,5 +1,8 @@
 from pathlib import Path
-from typing import List, Optional, TYPE_CHECKING
+from typing import Dict, List, Optional, TYPE_CHECKING
+import hashlib
+import json
+import logging
 
 # 只在类型检查时导入，避免运行时循环导入
 if TYPE_CHECKING:
@@ -9,34 +12,137 @@ import yaml
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+
 class FileBasedProceduralRepository:
+    """
+    基于 YAML 文件的程序性记忆仓库
+
+    向量索引持久化在 <procedures_dir>/.index 下：
+    - embeddings.npy：按 manifest 顺序排列的向量矩阵
+    - manifest.json：模型名与每一行对应的 {id, hash}（hash 为检索文本的摘要）
+    启动时只对新增或内容变化的 YAML 重新编码；新增一条程序时只编码这一条。
+    内存中按 user_id 划分向量分区，检索只对当前用户的分区打分。
+    """
+
     def __init__(self, procedures_dir: str):
         self.dir = Path(procedures_dir)
         self.dir.mkdir(exist_ok=True)
+        self.index_dir = self.dir / ".index"
         ##TODO:从本地加载模型，后续待调整
-        self.model = SentenceTransformer( "sentence-transformers/all-MiniLM-L6-v2",
+        self.model = SentenceTransformer( MODEL_NAME,
             local_files_only=True  # 👈 确保不联网
         )
         self._load()
 
+    @staticmethod
+    def _search_text(proc: dict) -> str:
+        return f"{proc.get('title', '')}\n{proc.get('description', '')}\n{' '.join(proc.get('steps', []))}"
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _read_procedure(self, path: Path) -> dict:
+        with open(path, "r", encoding="utf-8") as fp:
+            proc = yaml.safe_load(fp)
+        proc["id"] = path.stem
+        # 确保有 user_id 字段（兼容旧数据）
+        if "user_id" not in proc:
+            proc["user_id"] = "default"  # 或跳过？根据需求
+        proc["search_text"] = self._search_text(proc)
+        return proc
+
     def _load(self):
-        self.procedures = []
-        self.embeddings = []
+        """读取全部 YAML，复用已持久化的向量，只编码新增或变化的条目"""
+        self._procs: Dict[str, dict] = {}
         for f in self.dir.glob("*.yaml"):
-            with open(f, "r", encoding="utf-8") as fp:
-                proc = yaml.safe_load(fp)
-                proc["id"] = f.stem
-                # 确保有 user_id 字段（兼容旧数据）
-                if "user_id" not in proc:
-                    proc["user_id"] = "default"  # 或跳过？根据需求
-                text = f"{proc.get('title', '')}\n{proc.get('description', '')}\n{' '.join(proc.get('steps', []))}"
-                proc["search_text"] = text
-                self.procedures.append(proc)
-        if self.procedures:
-            texts = [p["search_text"] for p in self.procedures]
-            self.embeddings = self.model.encode(texts)
+            proc = self._read_procedure(f)
+            self._procs[proc["id"]] = proc
+
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._hashes: Dict[str, str] = {}
+        cached = self._read_index()
+
+        stale = []
+        for proc_id, proc in self._procs.items():
+            digest = self._hash(proc["search_text"])
+            hit = cached.get(proc_id)
+            if hit is not None and hit[0] == digest:
+                self._vectors[proc_id] = hit[1]
+                self._hashes[proc_id] = digest
+            else:
+                stale.append(proc_id)
+
+        if stale:
+            encoded = self.model.encode([self._procs[proc_id]["search_text"] for proc_id in stale])
+            for proc_id, vector in zip(stale, encoded):
+                self._vectors[proc_id] = np.asarray(vector, dtype=np.float32)
+                self._hashes[proc_id] = self._hash(self._procs[proc_id]["search_text"])
+
+        if stale or len(cached) != len(self._vectors):
+            self._write_index()
+        logger.info(f"Procedural index loaded: {len(self._procs)} procedures, {len(stale)} re-encoded")
+
+        self._partitions: Dict[str, tuple] = {}
+        for user_id in {proc["user_id"] for proc in self._procs.values()}:
+            self._rebuild_partition(user_id)
+
+    def _read_index(self) -> Dict[str, tuple]:
+        """
+        读取持久化索引
+
+        Returns:
+            Dict[str, tuple]: 程序 id -> (hash, 向量)；索引不存在、损坏或模型不一致时为空
+        """
+        manifest_path = self.index_dir / "manifest.json"
+        vectors_path = self.index_dir / "embeddings.npy"
+        if not manifest_path.exists() or not vectors_path.exists():
+            return {}
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as fp:
+                manifest = json.load(fp)
+            matrix = np.load(vectors_path)
+            entries = manifest.get("entries", [])
+            if manifest.get("model") != MODEL_NAME or len(entries) != len(matrix):
+                return {}
+            return {entry["id"]: (entry["hash"], matrix[i]) for i, entry in enumerate(entries)}
+        except Exception as e:
+            logger.warning(f"Failed to read procedural index, rebuilding: {e}")
+            return {}
+
+    def _write_index(self) -> None:
+        """持久化向量矩阵与 manifest（先写临时文件再替换）"""
+        self.index_dir.mkdir(exist_ok=True)
+        ids = sorted(self._vectors)
+        manifest = {
+            "model": MODEL_NAME,
+            "entries": [{"id": proc_id, "hash": self._hashes[proc_id]} for proc_id in ids],
+        }
+        matrix = np.stack([self._vectors[proc_id] for proc_id in ids]) if ids else np.zeros((0, 0), dtype=np.float32)
+
+        vectors_tmp = self.index_dir / "embeddings.tmp.npy"
+        manifest_tmp = self.index_dir / "manifest.json.tmp"
+        np.save(vectors_tmp, matrix)
+        with open(manifest_tmp, "w", encoding="utf-8") as fp:
+            json.dump(manifest, fp, ensure_ascii=False)
+        vectors_tmp.replace(self.index_dir / "embeddings.npy")
+        manifest_tmp.replace(self.index_dir / "manifest.json")
+
+    def _rebuild_partition(self, user_id: str) -> None:
+        """重建单个用户的向量分区"""
+        ids = [proc_id for proc_id, proc in self._procs.items() if proc["user_id"] == user_id]
+        if ids:
+            self._partitions[user_id] = (ids, np.stack([self._vectors[proc_id] for proc_id in ids]))
         else:
-            self.embeddings = np.array([])
+            self._partitions.pop(user_id, None)
+
+    @property
+    def procedures(self) -> List[dict]:
+        return list(self._procs.values())
 
     def add_procedure(self, user_id: str, domain: str, task_type: str, title: str, steps: List[str], description: str = "", tags: List[str] = None):
         # 建议用 user_id + domain + task_type 组合作为文件名，避免冲突
@@ -53,22 +159,33 @@ class FileBasedProceduralRepository:
         }
         with open(path, "w", encoding="utf-8") as f:
             yaml.dump(data, f, allow_unicode=True, indent=2)
-        self._load()  # 热重载
+
+        # 增量更新：只编码这一条（内容未变化时跳过编码）
+        proc = self._read_procedure(path)
+        previous = self._procs.get(proc_id)
+        digest = self._hash(proc["search_text"])
+        self._procs[proc_id] = proc
+        if self._hashes.get(proc_id) != digest:
+            self._vectors[proc_id] = np.asarray(self.model.encode([proc["search_text"]])[0], dtype=np.float32)
+            self._hashes[proc_id] = digest
+            self._write_index()
+        if previous is not None and previous["user_id"] != proc["user_id"]:
+            self._rebuild_partition(previous["user_id"])
+        self._rebuild_partition(proc["user_id"])
 
     def search(self, user_id: str, query: str, domain: Optional[str] = None, limit: int = 3) -> List[str]:
-        if not self.procedures:
+        partition = self._partitions.get(user_id)
+        if partition is None:
             return []
-        
+        ids, matrix = partition
+
         query_emb = self.model.encode([query])[0]
-        scores = np.dot(self.embeddings, query_emb)
-        
+        scores = np.dot(matrix, query_emb)
+
         results = []
-        # 遍历所有条目，按得分从高到低筛选
+        # 遍历当前用户的条目，按得分从高到低筛选
         for idx in np.argsort(scores)[::-1]:
-            proc = self.procedures[idx]
-            # 按 user_id 过滤
-            if proc.get("user_id") != user_id:
-                continue
+            proc = self._procs[ids[idx]]
             # 按 domain 过滤（如果指定了）
             if domain is not None and proc.get("domain") != domain:
                 continue
@@ -80,5 +197,5 @@ class FileBasedProceduralRepository:
             results.append(formatted)
             if len(results) >= limit:
                 break
-        
-        return results
\ No newline at end of file
+
+        return results
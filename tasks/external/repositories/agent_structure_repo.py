@@ -3,6 +3,7 @@ from typing import Dict, List, Any, Optional, Callable, TypeVar
 import logging
 import time
 import functools
+from datetime import datetime
 import networkx as nx
 from ..database.neo4j_client import Neo4jClient
 
@@ -59,6 +60,13 @@ class AgentStructureRepository:
         else:
             self.neo4j_client = neo4j_client
     
+    @staticmethod
+    def _now() -> str:
+        """
+        生成 updated_at 时间戳，格式与现有节点数据一致，用于增量刷新水位线
+        """
+        return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
     @retry_decorator()
     def get_agent_relationship(self, agent_id: str) -> Dict[str, Any]:
         """
@@ -131,6 +139,69 @@ class AgentStructureRepository:
             agents.append(agent)
         return agents
     
+    @retry_decorator()
+    def load_all_relationships(self) -> List[Dict[str, Any]]:
+        """
+        一次性加载所有未隐藏的父子关系
+
+        Returns:
+            关系列表，格式为 [{'parent_id': ..., 'child_id': ..., 'updated_at': ...}]
+        """
+        query = """
+        MATCH (parent)-[r:HAS_CHILD]->(child)
+        WHERE r.hidden IS NULL
+        RETURN parent.id as parent_id, child.id as child_id, r.updated_at as updated_at
+        """
+        return self.neo4j_client.execute_query(query)
+
+    @retry_decorator()
+    def load_agents_updated_since(self, since: Any) -> List[Dict[str, Any]]:
+        """
+        加载 updated_at 不早于水位线的Agent节点（增量刷新）
+
+        Args:
+            since: 水位线，与节点 updated_at 属性同类型
+
+        Returns:
+            Agent节点信息列表，格式同 load_all_agents
+        """
+        query = """
+        MATCH (a:Agent)
+        WHERE a.updated_at >= $since
+        RETURN a.id as agent_id, properties(a) as all_props
+        """
+        results = self.neo4j_client.execute_query(query, {'since': since})
+
+        agents = []
+        for record in results:
+            props = record['all_props']
+            if 'id' in props:
+                del props['id']
+
+            agent = {'agent_id': record['agent_id']}
+            agent.update(props)
+            agents.append(agent)
+        return agents
+
+    @retry_decorator()
+    def load_relationships_updated_since(self, since: Any) -> List[Dict[str, Any]]:
+        """
+        加载 updated_at 不早于水位线的父子关系（增量刷新），包含已隐藏的关系
+
+        Args:
+            since: 水位线，与关系 updated_at 属性同类型
+
+        Returns:
+            关系列表，格式为 [{'parent_id': ..., 'child_id': ..., 'hidden': bool, 'updated_at': ...}]
+        """
+        query = """
+        MATCH (parent)-[r:HAS_CHILD]->(child)
+        WHERE r.updated_at >= $since
+        RETURN parent.id as parent_id, child.id as child_id,
+               r.hidden IS NOT NULL as hidden, r.updated_at as updated_at
+        """
+        return self.neo4j_client.execute_query(query, {'since': since})
+
     @retry_decorator()
     def add_agent_relationship(self, parent_id: str, child_id: str, relationship_type: str = 'HAS_CHILD') -> bool:
         """
@@ -148,11 +219,13 @@ class AgentStructureRepository:
             query = """
             MATCH (parent {id: $parent_id})
             MATCH (child {id: $child_id})
-            MERGE (parent)-[:HAS_CHILD]->(child)
+            MERGE (parent)-[r:HAS_CHILD]->(child)
+            SET r.updated_at = $updated_at
             """
             self.neo4j_client.execute_write(query, {
                 'parent_id': parent_id,
-                'child_id': child_id
+                'child_id': child_id,
+                'updated_at': self._now()
             })
             return True
         except Exception:
@@ -232,6 +305,7 @@ class AgentStructureRepository:
             
             # 提取meta数据（除了agent_id之外的所有字段）
             meta_data = {k: v for k, v in node_data.items() if k != 'agent_id'}
+            meta_data['updated_at'] = self._now()
             
             # 修改查询：直接设置属性
             query = """
@@ -269,6 +343,7 @@ class AgentStructureRepository:
             current_meta = {k: v for k, v in existing_node.items() if k != 'agent_id'}
             # 更新meta数据
             current_meta.update(updates)
+            current_meta['updated_at'] = self._now()
             
             # 修改查询：使用 += 操作符来更新平铺的属性
             query = """